@@ -0,0 +1,265 @@
+import json
+import os
+import threading
+import time
+
+
+class AuditSpool:
+    """
+    Spool local, somente de acréscimo, para eventos de auditoria que não
+    puderam ser publicados no broker.
+
+    Os eventos são gravados como JSON (um por linha) em segmentos de tamanho
+    limitado. O ``fsync`` é feito em lotes (a cada ``fsync_batch`` eventos ou
+    ``fsync_interval`` segundos) e o total em disco é limitado por
+    ``max_total_bytes``; acima disso novos eventos são descartados.
+
+    Cada processo grava nos próprios segmentos (o pid faz parte do nome) e
+    ``replay`` drena os segmentos do processo atual e os deixados por
+    processos que já terminaram, depois de renomeá-los para o próprio pid.
+    """
+
+    SEGMENT_PREFIX = 'audit-'
+    SEGMENT_SUFFIX = '.jsonl'
+
+    def __init__(self, directory, segment_max_bytes=4 * 1024 * 1024,
+                 max_total_bytes=256 * 1024 * 1024, fsync_batch=64, fsync_interval=1.0):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.max_total_bytes = max_total_bytes
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._file_pid = None
+        self._unsynced = 0
+        self._last_fsync = time.monotonic()
+        self._total_bytes = None
+        self._ignored_names = set()
+
+    # --- escrita ---
+
+    def append(self, events):
+        """
+        Grava os eventos no spool e retorna quantos foram aceitos. Nunca
+        levanta exceção: falhas de disco descartam (e contam) os eventos.
+        """
+        lines = [(json.dumps(event) + '\n').encode() for event in events]
+        written = 0
+        with self._lock:
+            try:
+                if self._total_bytes is None:
+                    self._total_bytes = self._disk_usage()
+                for line in lines:
+                    if self._total_bytes + len(line) > self.max_total_bytes:
+                        self.dropped += len(lines) - written
+                        print(
+                            f"ERRO DE AUDITORIA: Spool cheio ({self.max_total_bytes} bytes). "
+                            f"{len(lines) - written} evento(s) descartado(s).")
+                        break
+                    segment = self._active_segment(len(line))
+                    segment.write(line)
+                    self._total_bytes += len(line)
+                    self._unsynced += 1
+                    written += 1
+                self._maybe_fsync()
+            except OSError as exc:
+                # Diretório inexistente ou sem permissão, disco cheio etc.
+                self.dropped += len(lines) - written
+                self._discard_active()
+                print(
+                    f"ERRO DE AUDITORIA: Falha ao gravar no spool {self.directory}. "
+                    f"{len(lines) - written} evento(s) descartado(s). Erro: {exc}")
+        return written
+
+    def flush(self):
+        with self._lock:
+            self._fsync()
+
+    def close(self):
+        with self._lock:
+            self._close_active()
+
+    def _active_segment(self, incoming_bytes):
+        if self._file is not None and self._file_pid != os.getpid():
+            # Processo filho (fork): não reaproveita o arquivo do processo pai.
+            self._file = None
+        if self._file is not None and self._file.tell() + incoming_bytes > self.segment_max_bytes:
+            self._close_active()
+        if self._file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            name = f"{self.SEGMENT_PREFIX}{os.getpid()}-{time.time_ns():020d}{self.SEGMENT_SUFFIX}"
+            self._file = open(os.path.join(self.directory, name), 'ab')
+            self._file_pid = os.getpid()
+        return self._file
+
+    def _maybe_fsync(self):
+        if self._unsynced >= self.fsync_batch or (
+                self._unsynced and time.monotonic() - self._last_fsync >= self.fsync_interval):
+            self._fsync()
+
+    def _fsync(self):
+        if self._file is not None and self._unsynced:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_fsync = time.monotonic()
+
+    def _close_active(self):
+        if self._file is not None:
+            self._fsync()
+            self._file.close()
+            self._file = None
+
+    def _discard_active(self):
+        # Depois de uma escrita com erro, a próxima vai para um segmento novo
+        # em vez de continuar uma linha possivelmente parcial.
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+        self._unsynced = 0
+
+    # --- leitura / replay ---
+
+    def pending_bytes(self):
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._disk_usage()
+            return self._total_bytes
+
+    def has_pending(self):
+        return self.pending_bytes() > 0
+
+    def replay(self, publish_batch, batch_size=500):
+        """
+        Reenvia os eventos do spool, do segmento mais antigo para o mais novo,
+        chamando ``publish_batch(eventos)`` em lotes. Um segmento só é apagado
+        depois que todos os seus eventos foram publicados; se a publicação
+        falhar, o restante do segmento é mantido e a exceção é propagada. Uma
+        exceção com o atributo ``sent`` indica quantos eventos do lote já
+        foram publicados antes da falha; eles não ficam no segmento.
+        Retorna o número de eventos reenviados.
+        """
+        with self._lock:
+            # Sela o segmento ativo para que novas falhas caiam em outro arquivo.
+            self._close_active()
+            segments = [
+                path for path in self._segments() if self._is_replayable(path)]
+
+        replayed = 0
+        for path in segments:
+            path = self._claim(path)
+            if path is None:
+                continue
+            events = self._read_segment(path)
+            sent = 0
+            try:
+                while sent < len(events):
+                    chunk = events[sent:sent + batch_size]
+                    try:
+                        publish_batch(chunk)
+                    except Exception as exc:
+                        sent += getattr(exc, 'sent', 0)
+                        raise
+                    sent += len(chunk)
+                    replayed += len(chunk)
+            finally:
+                self._finish_segment(path, events[sent:])
+        return replayed
+
+    def _segments(self):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            # Diretório ainda não criado (ou inutilizável): nada a reenviar.
+            return []
+        names = [
+            name for name in names
+            if name.startswith(self.SEGMENT_PREFIX) and name.endswith(self.SEGMENT_SUFFIX)
+            and self._is_segment_name(name)
+        ]
+        # Ordena pelo timestamp do nome (ordem de escrita)
+        names.sort(key=lambda name: name.rsplit('-', 1)[-1])
+        return [os.path.join(self.directory, name) for name in names]
+
+    def _is_replayable(self, path):
+        pid = int(os.path.basename(path)[len(self.SEGMENT_PREFIX):].split('-', 1)[0])
+        if pid == os.getpid():
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            return False
+        return False
+
+    def _is_segment_name(self, name):
+        # audit-<pid>-<timestamp>.jsonl. Um arquivo estranho no diretório é
+        # ignorado (com um aviso por arquivo) em vez de travar o replay.
+        pid, _, timestamp = name[len(self.SEGMENT_PREFIX):-len(self.SEGMENT_SUFFIX)].partition('-')
+        if pid.isdigit() and timestamp.isdigit():
+            return True
+        if name not in self._ignored_names:
+            self._ignored_names.add(name)
+            print(f"AVISO: Ignorando arquivo do spool com nome inesperado: {name}")
+        return False
+
+    def _claim(self, path):
+        """
+        Toma posse de um segmento deixado por outro processo renomeando-o
+        para o pid atual. O rename é atômico: quando vários workers começam
+        juntos, só um deles reenvia o segmento; os demais recebem ``None``.
+        """
+        name = os.path.basename(path)
+        pid, rest = name[len(self.SEGMENT_PREFIX):].split('-', 1)
+        if int(pid) == os.getpid():
+            return path
+        claimed = os.path.join(self.directory, f"{self.SEGMENT_PREFIX}{os.getpid()}-{rest}")
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            return None
+        return claimed
+
+    def _read_segment(self, path):
+        events = []
+        with open(path, 'rb') as segment:
+            for line in segment:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    # Linha parcial de uma escrita interrompida
+                    continue
+        return events
+
+    def _finish_segment(self, path, remaining):
+        with self._lock:
+            size = os.path.getsize(path)
+            if remaining:
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, 'wb') as segment:
+                    for event in remaining:
+                        segment.write((json.dumps(event) + '\n').encode())
+                    segment.flush()
+                    os.fsync(segment.fileno())
+                os.replace(tmp_path, path)
+                new_size = os.path.getsize(path)
+            else:
+                os.remove(path)
+                new_size = 0
+            if self._total_bytes is not None:
+                self._total_bytes = max(0, self._total_bytes - size + new_size)
+
+    def _disk_usage(self):
+        total = 0
+        for path in self._segments():
+            try:
+                total += os.path.getsize(path)
+            except FileNotFoundError:
+                pass
+        return total
@@ -0,0 +1,80 @@
+"""
+Roteamento de leituras para a réplica (alias ``replica``, quando configurado).
+
+Só leem da réplica os trechos marcados com ``replica_reads()`` (as views
+somente leitura de usuários). Dentro deles, a primeira escrita devolve as
+leituras seguintes ao primário, e ``pin_to_primary`` mantém as leituras de
+uma matrícula no primário por ``REPLICA_PIN_SECONDS`` depois de uma escrita
+(ex.: o upsert do login pelo SUAP), cobrindo o atraso de replicação.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+REPLICA_ALIAS = 'replica'
+PIN_CACHE_KEY = "db:pin:{key}"
+
+_replica_state = contextvars.ContextVar('replica_state', default=None)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    state = {'enabled': enabled and replica_configured()}
+    token = _replica_state.set(state)
+    try:
+        yield state
+    finally:
+        _replica_state.reset(token)
+
+
+def use_primary():
+    """Manda para o primário as leituras restantes do trecho atual."""
+    state = _replica_state.get()
+    if state is not None:
+        state['enabled'] = False
+
+
+def _pin_timeout():
+    return getattr(settings, "REPLICA_PIN_SECONDS", 5)
+
+
+def pin_to_primary(*keys):
+    if replica_configured() and keys:
+        cache.set_many({PIN_CACHE_KEY.format(key=key): True for key in keys}, _pin_timeout())
+
+
+def is_pinned(*keys):
+    if not replica_configured() or not keys:
+        return False
+    return bool(cache.get_many([PIN_CACHE_KEY.format(key=key) for key in keys]))
+
+
+async def ais_pinned(*keys):
+    if not replica_configured() or not keys:
+        return False
+    return bool(await cache.aget_many([PIN_CACHE_KEY.format(key=key) for key in keys]))
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _replica_state.get()
+        if state is not None and state['enabled']:
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        use_primary()
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplica e primário têm os mesmos dados.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_ALIAS
@@ -0,0 +1,188 @@
+"""
+Métricas do serviço no formato do Prometheus, expostas em ``/metrics``.
+
+- latência por view (``MetricsMiddleware``), com o número de consultas e o
+  tempo gasto no banco em cada requisição;
+- latência, erros e estado do circuit breaker das chamadas ao SUAP, por URL;
+- latência de publicação, falhas e profundidade da fila da auditoria, e se a
+  thread de publicação de cada processo está viva.
+
+Com vários workers, defina ``PROMETHEUS_MULTIPROC_DIR`` (um diretório vazio a
+cada início do serviço): cada processo grava seus valores em arquivos mmap
+nesse diretório e ``/metrics`` agrega todos eles, qualquer que seja o worker
+que atenda a coleta.
+"""
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+    multiprocess,
+)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Latência das requisições por view.',
+    ['view', 'method', 'status'])
+REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries', 'Consultas ao banco por requisição.', ['view'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, float('inf')))
+REQUEST_DB_DURATION = Histogram(
+    'http_request_db_duration_seconds', 'Tempo gasto no banco por requisição.', ['view'],
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, float('inf')))
+
+SUAP_LATENCY = Histogram(
+    'suap_request_duration_seconds', 'Latência das chamadas ao SUAP.', ['url'])
+SUAP_ERRORS = Counter(
+    'suap_request_errors_total', 'Chamadas ao SUAP com erro de conexão ou status >= 400.', ['url'])
+SUAP_CIRCUIT_STATE = Gauge(
+    'suap_circuit_state', 'Circuito de cada endpoint do SUAP (0 fechado, 1 aberto, 2 meio aberto).',
+    ['url'], multiprocess_mode='liveall')
+
+AUDIT_PUBLISH_LATENCY = Histogram(
+    'audit_publish_duration_seconds', 'Tempo de publicação de um lote de eventos de auditoria.')
+AUDIT_PUBLISH_FAILURES = Counter(
+    'audit_publish_failures_total', 'Eventos de auditoria cuja publicação no broker falhou.')
+AUDIT_DROPPED = Counter(
+    'audit_events_dropped_total', 'Eventos de auditoria descartados.')
+AUDIT_QUEUE_DEPTH = Gauge(
+    'audit_queue_depth', 'Eventos de auditoria aguardando publicação.',
+    multiprocess_mode='livesum')
+AUDIT_PUBLISHER_ALIVE = Gauge(
+    'audit_publisher_threads_alive', 'Threads de publicação da auditoria em execução (uma por processo).',
+    multiprocess_mode='livesum')
+AUDIT_PUBLISHER_ERRORS = Counter(
+    'audit_publisher_errors_total', 'Falhas inesperadas no laço da thread de publicação da auditoria.')
+
+UNMATCHED_VIEW = '<sem rota>'
+
+_request_queries = contextvars.ContextVar('request_queries', default=None)
+
+
+class QueryStats:
+    """Consultas feitas durante a requisição atual."""
+
+    __slots__ = ('count', 'duration', 'slowest_sql', 'slowest_duration')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_sql = None
+        self.slowest_duration = 0.0
+
+
+def _record_query(execute, sql, params, many, context):
+    stats = _request_queries.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        stats.count += 1
+        stats.duration += elapsed
+        if elapsed >= stats.slowest_duration:
+            stats.slowest_sql = sql
+            stats.slowest_duration = elapsed
+
+
+@contextmanager
+def collect_queries():
+    """
+    Contabiliza as consultas feitas dentro do bloco. Se um bloco externo já
+    está contando (ex.: o ``MetricsMiddleware``), reaproveita a mesma contagem.
+    """
+    stats = _request_queries.get()
+    if stats is not None:
+        yield stats
+        return
+    stats = QueryStats()
+    token = _request_queries.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_queries.reset(token)
+
+
+def _install_query_recorder(sender=None, connection=None, **kwargs):
+    # Fica no início da lista, a mais interna: mede só a execução da consulta
+    # e não desalinha os ``connection.execute_wrapper()`` abertos por outros.
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record_query)
+
+
+connection_created.connect(_install_query_recorder)
+
+
+def install_query_recorders():
+    """Instala o contador nas conexões já abertas nesta thread."""
+    for connection in connections.all(initialized_only=True):
+        _install_query_recorder(connection=connection)
+
+
+def observe_suap_request(url, duration, error=False):
+    SUAP_LATENCY.labels(url).observe(duration)
+    if error:
+        SUAP_ERRORS.labels(url).inc()
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.route if match is not None else UNMATCHED_VIEW
+
+
+class MetricsMiddleware:
+    """
+    Mede a latência de cada requisição e as consultas feitas nela. Fica no
+    topo do ``MIDDLEWARE``; o corpo de respostas em streaming é gerado depois
+    e não entra na medição.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        install_query_recorders()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with collect_queries() as stats:
+            start = time.perf_counter()
+            response = self.get_response(request)
+        self._observe(request, response, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        # As consultas do ORM assíncrono rodam em threads com uma cópia do
+        # contexto, que aponta para o mesmo ``QueryStats``.
+        with collect_queries() as stats:
+            start = time.perf_counter()
+            response = await self.get_response(request)
+        self._observe(request, response, stats, time.perf_counter() - start)
+        return response
+
+    def _observe(self, request, response, stats, duration):
+        view = _view_name(request)
+        REQUEST_LATENCY.labels(view, request.method, response.status_code).observe(duration)
+        REQUEST_DB_QUERIES.labels(view).observe(stats.count)
+        REQUEST_DB_DURATION.labels(view).observe(stats.duration)
+
+
+def metrics_view(request):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
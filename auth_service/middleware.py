@@ -0,0 +1,49 @@
+"""
+Middlewares de sessão, CSRF, autenticação do Django e mensagens que só
+trabalham fora das rotas sem estado.
+
+A API autentica por JWT e não usa sessão, cookies de CSRF nem mensagens:
+isso só serve ao ``admin/``. Nas requisições cujo caminho começa com um dos
+``STATELESS_PATH_PREFIXES``, estas versões passam a requisição adiante sem
+fazer nada (nem no ``process_view`` do CSRF); nas demais, se comportam como
+os middlewares originais do Django.
+"""
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.middleware.csrf import CsrfViewMiddleware
+
+DEFAULT_STATELESS_PATH_PREFIXES = ('/api/', '/auth/', '/.well-known/', '/metrics')
+
+
+class StatelessRouteMixin:
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.stateless_prefixes = tuple(
+            getattr(settings, 'STATELESS_PATH_PREFIXES', DEFAULT_STATELESS_PATH_PREFIXES))
+
+    def __call__(self, request):
+        # Sob ASGI, get_response devolve a corotina, que o chamador aguarda.
+        if request.path_info.startswith(self.stateless_prefixes):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class BrowserSessionMiddleware(StatelessRouteMixin, SessionMiddleware):
+    pass
+
+
+class BrowserCsrfViewMiddleware(StatelessRouteMixin, CsrfViewMiddleware):
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if request.path_info.startswith(self.stateless_prefixes):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class BrowserAuthenticationMiddleware(StatelessRouteMixin, AuthenticationMiddleware):
+    pass
+
+
+class BrowserMessageMiddleware(StatelessRouteMixin, MessageMiddleware):
+    pass
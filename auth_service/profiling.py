@@ -0,0 +1,74 @@
+"""
+Perfil de consultas por requisição, ligado com ``QUERY_PROFILING`` (por
+padrão, só com ``DEBUG``).
+
+Para cada requisição, registra no log ``auth_service.profiling`` uma linha
+JSON com o número de consultas, o tempo total no banco e a consulta mais
+lenta, e devolve os mesmos números nos cabeçalhos ``X-DB-Query-Count``,
+``X-DB-Time-Ms`` e ``X-DB-Slowest-Ms``.
+"""
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .metrics import collect_queries, install_query_recorders
+
+logger = logging.getLogger('auth_service.profiling')
+
+SLOWEST_SQL_MAX_CHARS = 500
+
+
+class QueryProfilingMiddleware:
+    """
+    Fica logo depois do ``MetricsMiddleware``, cuja contagem de consultas é
+    reaproveitada.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_PROFILING', settings.DEBUG):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        install_query_recorders()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with collect_queries() as stats:
+            start = time.perf_counter()
+            response = self.get_response(request)
+        self._report(request, response, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        with collect_queries() as stats:
+            start = time.perf_counter()
+            response = await self.get_response(request)
+        self._report(request, response, stats, time.perf_counter() - start)
+        return response
+
+    def _report(self, request, response, stats, elapsed):
+        db_ms = stats.duration * 1000
+        slowest_ms = stats.slowest_duration * 1000
+        response['X-DB-Query-Count'] = str(stats.count)
+        response['X-DB-Time-Ms'] = f"{db_ms:.2f}"
+        response['X-DB-Slowest-Ms'] = f"{slowest_ms:.2f}"
+        logger.info(json.dumps({
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round(elapsed * 1000, 2),
+            "db_queries": stats.count,
+            "db_time_ms": round(db_ms, 2),
+            "slowest_query_ms": round(slowest_ms, 2),
+            "slowest_query": stats.slowest_sql and stats.slowest_sql[:SLOWEST_SQL_MAX_CHARS],
+        }, ensure_ascii=False))
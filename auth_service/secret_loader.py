@@ -0,0 +1,103 @@
+"""
+Carregamento dos segredos do AWS Parameter Store.
+
+Todos os parâmetros de ``/auth-service/`` são buscados de uma vez com
+``get_parameters_by_path`` (em vez de um ``get_parameter`` por segredo) e o
+``boto3`` só é importado quando realmente é preciso ir à AWS.
+
+O resultado pode ser reaproveitado pelos outros workers do mesmo host por
+``SECRETS_CACHE_TTL`` segundos, em um arquivo legível apenas pelo usuário
+do processo (por padrão em ``/dev/shm``, que fica em memória).
+"""
+import json
+import os
+import tempfile
+import time
+from stat import S_ISREG
+
+SECRETS_PATH = '/auth-service/'
+
+
+def _default_cache_path():
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, f'auth-service-secrets-{os.getuid()}.json')
+
+
+def _read_cache(cache_path, ttl):
+    try:
+        stat = os.lstat(cache_path)
+    except FileNotFoundError:
+        return None
+    # Só confia em um arquivo comum recente, do próprio usuário e não
+    # legível por outros (nunca em um link simbólico).
+    if not S_ISREG(stat.st_mode) or stat.st_uid != os.getuid() or stat.st_mode & 0o077:
+        return None
+    if time.time() - stat.st_mtime > ttl:
+        return None
+    try:
+        with open(cache_path) as cache_file:
+            secrets = json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+    # Cache corrompido: os segredos são buscados de novo na AWS.
+    if not isinstance(secrets, dict) or not all(
+            isinstance(value, str) for value in secrets.values()):
+        return None
+    return secrets
+
+
+def _write_cache(cache_path, secrets):
+    tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+    try:
+        # O diretório (ex.: /dev/shm) é compartilhado: o arquivo temporário é
+        # sempre novo (O_EXCL) e nunca um link plantado por outro usuário.
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        fd = os.open(
+            tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_NOFOLLOW', 0), 0o600)
+        with os.fdopen(fd, 'w') as cache_file:
+            json.dump(secrets, cache_file)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"AVISO: Não foi possível gravar o cache de segredos em '{cache_path}'. {e}")
+
+
+def fetch_parameters(path=SECRETS_PATH, region=None):
+    import boto3
+
+    client = boto3.client('ssm', region_name=region)
+    secrets = {}
+    kwargs = {'Path': path, 'WithDecryption': True}
+    while True:
+        response = client.get_parameters_by_path(**kwargs)
+        for parameter in response['Parameters']:
+            secrets[parameter['Name'][len(path):]] = parameter['Value']
+        next_token = response.get('NextToken')
+        if not next_token:
+            return secrets
+        kwargs['NextToken'] = next_token
+
+
+def load_secrets(path=SECRETS_PATH, region=None, cache_ttl=300, cache_path=None):
+    """
+    Retorna um dicionário ``{nome: valor}`` com os parâmetros de ``path``.
+    Em caso de falha na AWS, retorna um dicionário vazio.
+    """
+    cache_path = cache_path or _default_cache_path()
+    if cache_ttl > 0:
+        secrets = _read_cache(cache_path, cache_ttl)
+        if secrets is not None:
+            return secrets
+
+    try:
+        secrets = fetch_parameters(path, region)
+    except Exception as e:
+        print(
+            f"ERRO: Não foi possível buscar os segredos de '{path}' do AWS Parameter Store. {e}")
+        return {}
+
+    if cache_ttl > 0:
+        _write_cache(cache_path, secrets)
+    return secrets
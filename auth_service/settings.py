@@ -1,29 +1,30 @@
 from datetime import timedelta
 from pathlib import Path
 import os
-import boto3
+
+from .secret_loader import load_secrets
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-SSM_CLIENT = None
 IS_AWS_ENVIRONMENT = 'AWS_EXECUTION_ENV' in os.environ
 
+# Na AWS, todos os segredos de /auth-service/ são buscados em uma única chamada
+# (e reaproveitados entre workers do mesmo host por SECRETS_CACHE_TTL segundos).
+_aws_secrets = {}
 if IS_AWS_ENVIRONMENT:
-    region = os.environ.get('AWS_REGION', 'us-east-1')
-    SSM_CLIENT = boto3.client('ssm', region_name=region)
+    _aws_secrets = load_secrets(
+        region=os.environ.get('AWS_REGION', 'us-east-1'),
+        cache_ttl=int(os.environ.get('SECRETS_CACHE_TTL', '300')),
+        cache_path=os.environ.get('SECRETS_CACHE_PATH'),
+    )
 
 
 def get_secret(secret_name, default=None):
-    if SSM_CLIENT:
-        param_name = f"/auth-service/{secret_name}"
-        try:
-            response = SSM_CLIENT.get_parameter(
-                Name=param_name, WithDecryption=True)
-            return response['Parameter']['Value']
-        except Exception as e:
+    if IS_AWS_ENVIRONMENT:
+        if secret_name not in _aws_secrets:
             print(
-                f"ERRO: Não foi possível buscar o segredo '{param_name}' do AWS Parameter Store. {e}")
-            return default
+                f"ERRO: O segredo '/auth-service/{secret_name}' não foi encontrado no AWS Parameter Store.")
+        return _aws_secrets.get(secret_name, default)
     else:
         # Fallback para desenvolvimento local
         return os.environ.get(secret_name, default)
@@ -33,6 +34,9 @@ SECRET_KEY = get_secret('SECRET_KEY')
 DB_PASSWORD = get_secret('DB_PASSWORD')
 SUAP_CLIENT_SECRET = get_secret('SUAP_CLIENT_SECRET')
 JWT_SIGNING_KEY = get_secret('JWT_SECRET_KEY')
+# Chaves privadas PEM (concatenadas) para assinar os tokens com RS256/EdDSA;
+# a primeira assina e as demais só validam (rotação). Vazio = HS256.
+JWT_PRIVATE_KEYS = get_secret('JWT_PRIVATE_KEYS', '')
 
 DEBUG = os.environ.get('DEBUG', 'False').lower() == 'true'
 
@@ -56,11 +60,17 @@ INSTALLED_APPS = [
     'drf_spectacular',
 ]
 
+# Sessão, CSRF, auth do Django e mensagens só servem ao admin: as versões de
+# auth_service/middleware.py não fazem nada nas rotas de STATELESS_PATH_PREFIXES.
+STATELESS_PATH_PREFIXES = tuple(os.environ.get(
+    'STATELESS_PATH_PREFIXES', '/api/,/auth/,/.well-known/,/metrics').split(','))
+
 MIDDLEWARE = [
+    "auth_service.metrics.MetricsMiddleware", "auth_service.profiling.QueryProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware", "corsheaders.middleware.CorsMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware", "django.middleware.common.CommonMiddleware",
-    "django.middleware.csrf.CsrfViewMiddleware", "django.contrib.auth.middleware.AuthenticationMiddleware",
-    "django.contrib.messages.middleware.MessageMiddleware", "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "auth_service.middleware.BrowserSessionMiddleware", "django.middleware.common.CommonMiddleware",
+    "auth_service.middleware.BrowserCsrfViewMiddleware", "auth_service.middleware.BrowserAuthenticationMiddleware",
+    "auth_service.middleware.BrowserMessageMiddleware", "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
 ROOT_URLCONF = "auth_service.urls"
@@ -82,9 +92,38 @@ DATABASES = {
         'PASSWORD': DB_PASSWORD,  # Usando a variável segura que buscamos acima
         'HOST': os.environ.get('DB_HOST'),
         'PORT': os.environ.get('DB_PORT'),
+        # Conexões persistentes por worker, verificadas antes de reaproveitar
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', 'True').lower() == 'true',
     }
 }
 
+# Pool de conexões nativo do Django (psycopg_pool, instalado pelo extra "pool"
+# do psycopg em requirements.txt); não pode ser combinado com CONN_MAX_AGE.
+if os.environ.get('DB_POOL', 'False').lower() == 'true':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+        },
+    }
+
+# Réplica de leitura opcional: as views somente leitura de usuários leem dela
+# (ver auth_service/db_router.py). Usa as mesmas credenciais do primário.
+DB_REPLICA_HOST = os.environ.get('DB_REPLICA_HOST')
+if DB_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': DB_REPLICA_HOST,
+        'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+    }
+
+DATABASE_ROUTERS = ['auth_service.db_router.PrimaryReplicaRouter']
+
+# Tempo (s) em que as leituras de um usuário ficam no primário após uma escrita
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', '5'))
+
 AUTH_USER_MODEL = 'user.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -94,6 +133,37 @@ AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.NumericPasswordValidator"},
 ]
 
+# Cache compartilhado entre workers quando REDIS_URL está definido;
+# caso contrário, cada processo usa um cache em memória local.
+# O alias 'revocation' guarda os tokens revogados (user/revocation.py) e nunca
+# pode descartar entradas para abrir espaço: no Redis, use uma política de
+# memória que não remova chaves (ex.: noeviction).
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+        'revocation': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'revocation': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'revocation',
+            # Sem limite de entradas: as revogações só saem do cache ao expirar
+            # (o RevocationStore apaga as expiradas, que o LocMemCache manteria).
+            'OPTIONS': {'MAX_ENTRIES': 2 ** 63 - 1},
+        },
+    }
+
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "UTC"
 USE_I18N = True
@@ -103,12 +173,49 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # --- SUAP ---
 SUAP_CLIENT_ID = os.environ.get("SUAP_CLIENT_ID")
+SUAP_BASE_URL = os.environ.get("SUAP_BASE_URL", "https://suap.ifrn.edu.br")
+# Conexões keep-alive mantidas por processo e threads para as buscas paralelas de perfil
+SUAP_HTTP_POOL_SIZE = int(os.environ.get("SUAP_HTTP_POOL_SIZE", "20"))
+SUAP_HTTP_MAX_WORKERS = int(os.environ.get("SUAP_HTTP_MAX_WORKERS", "8"))
+# Circuit breaker por endpoint do SUAP: abre quando, na janela, a fração de erros
+# (rede/5xx) ou de chamadas lentas passa do limite, e recusa chamadas por OPEN_SECONDS
+SUAP_BREAKER_WINDOW_SECONDS = float(os.environ.get("SUAP_BREAKER_WINDOW_SECONDS", "30"))
+SUAP_BREAKER_MIN_CALLS = int(os.environ.get("SUAP_BREAKER_MIN_CALLS", "10"))
+SUAP_BREAKER_ERROR_RATE = float(os.environ.get("SUAP_BREAKER_ERROR_RATE", "0.5"))
+SUAP_BREAKER_SLOW_CALL_SECONDS = float(os.environ.get("SUAP_BREAKER_SLOW_CALL_SECONDS", "5"))
+SUAP_BREAKER_SLOW_CALL_RATE = float(os.environ.get("SUAP_BREAKER_SLOW_CALL_RATE", "0.5"))
+SUAP_BREAKER_OPEN_SECONDS = float(os.environ.get("SUAP_BREAKER_OPEN_SECONDS", "30"))
+# Usa o callback assíncrono do SUAP (recomendado apenas quando servido via ASGI)
+SUAP_CALLBACK_ASYNC = os.environ.get(
+    "SUAP_CALLBACK_ASYNC", "False").lower() == 'true'
+# Sob ASGI, usa as versões assíncronas (ORM assíncrono) das views de leitura de usuários
+USER_READ_VIEWS_ASYNC = os.environ.get(
+    "USER_READ_VIEWS_ASYNC", "False").lower() == 'true'
+
+# --- Perfil de consultas por requisição (cabeçalhos X-DB-* e log JSON) ---
+QUERY_PROFILING = os.environ.get(
+    "QUERY_PROFILING", str(DEBUG)).lower() == 'true'
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {
+        "auth_service.profiling": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
 
 # --- JWT ---
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': ('rest_framework_simplejwt.authentication.JWTAuthentication',),
+    # Monta o request.user a partir das claims do token, sem consultar o banco
+    'DEFAULT_AUTHENTICATION_CLASSES': ('user.authentication.ClaimsJWTAuthentication',),
     'DEFAULT_PERMISSION_CLASSES': ('rest_framework.permissions.IsAuthenticated',),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Proxies confiáveis na frente do serviço: o IP do cliente (usado no
+    # throttling do login) é lido do X-Forwarded-For só até esse ponto. Com 0
+    # (padrão), vale o IP da conexão e o cabeçalho, que o cliente pode forjar,
+    # é ignorado; atrás de proxies, configure quantos são.
+    'NUM_PROXIES': int(os.environ.get('DRF_NUM_PROXIES') or '0'),
 }
 
 
@@ -123,13 +230,18 @@ SPECTACULAR_SETTINGS = {
     },
 }
 
+# Com JWT_PRIVATE_KEYS, o backend do simplejwt é trocado pelo de user/signing.py
+# e as chaves públicas ficam em /.well-known/jwks.json (cache de JWKS_MAX_AGE s).
+JWT_ALGORITHM = os.environ.get('JWT_ALGORITHM', 'RS256') if JWT_PRIVATE_KEYS else 'HS256'
+JWKS_MAX_AGE = int(os.environ.get('JWKS_MAX_AGE', '3600'))
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "ROTATE_REFRESH_TOKENS": False,
     "BLACKLIST_AFTER_ROTATION": True,
     "UPDATE_LAST_LOGIN": True,
-    "ALGORITHM": "HS256",
+    "ALGORITHM": JWT_ALGORITHM,
     "SIGNING_KEY": JWT_SIGNING_KEY,
     "VERIFYING_KEY": None, "AUDIENCE": None, "ISSUER": None, "JWK_URL": None, "LEEWAY": 0,
     "AUTH_HEADER_TYPES": ("Bearer",), "AUTH_HEADER_NAME": "HTTP_AUTHORIZATION",
@@ -137,8 +249,45 @@ SIMPLE_JWT = {
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
     "TOKEN_TYPE_CLAIM": "token_type", "TOKEN_USER_CLASS": "rest_framework_simplejwt.models.TokenUser",
     "JTI_CLAIM": "jti",
+    "TOKEN_REFRESH_SERIALIZER": "user.serializers.ClaimsTokenRefreshSerializer",
 }
 
+# Revogação de tokens (logout) por jti: Bloom filters por processo na frente
+# do cache compartilhado, sincronizados a cada TOKEN_REVOCATION_SYNC_INTERVAL s.
+TOKEN_REVOCATION_SYNC_INTERVAL = float(
+    os.environ.get('TOKEN_REVOCATION_SYNC_INTERVAL', '1.0'))
+TOKEN_REVOCATION_BLOOM_CAPACITY = int(
+    os.environ.get('TOKEN_REVOCATION_BLOOM_CAPACITY', '10000'))
+
+# Throttling do login por senha (token buckets por IP e por matrícula),
+# aplicado antes do hash da senha. Compartilhado via Redis quando REDIS_URL existe.
+LOGIN_THROTTLE_IP_BURST = int(os.environ.get('LOGIN_THROTTLE_IP_BURST', '20'))
+LOGIN_THROTTLE_IP_PER_MINUTE = float(
+    os.environ.get('LOGIN_THROTTLE_IP_PER_MINUTE', '30'))
+LOGIN_THROTTLE_MATRICULA_BURST = int(
+    os.environ.get('LOGIN_THROTTLE_MATRICULA_BURST', '5'))
+LOGIN_THROTTLE_MATRICULA_PER_MINUTE = float(
+    os.environ.get('LOGIN_THROTTLE_MATRICULA_PER_MINUTE', '5'))
+
+# Tempo (s) do snapshot de claims usado no login e no refresh
+USER_CLAIMS_CACHE_TIMEOUT = int(
+    os.environ.get('USER_CLAIMS_CACHE_TIMEOUT', '300'))
+
+# LRU por processo das linhas completas de User (ex.: /users/me/)
+USER_ROW_CACHE_MAXSIZE = int(os.environ.get('USER_ROW_CACHE_MAXSIZE', '1024'))
+USER_ROW_CACHE_TTL = int(os.environ.get('USER_ROW_CACHE_TTL', '60'))
+
+# Tempo (s) do cache dos dados serializados em /users/<matrícula>/ (com ETag)
+USER_DETAIL_CACHE_TIMEOUT = int(
+    os.environ.get('USER_DETAIL_CACHE_TIMEOUT', '300'))
+
+# Índice em memória das matrículas existentes (validação de matrículas),
+# reconstruído a cada MATRICULA_INDEX_TTL s e sincronizado entre os workers
+# pelo log no cache a cada MATRICULA_INDEX_SYNC_INTERVAL s.
+MATRICULA_INDEX_TTL = int(os.environ.get('MATRICULA_INDEX_TTL', '300'))
+MATRICULA_INDEX_SYNC_INTERVAL = float(
+    os.environ.get('MATRICULA_INDEX_SYNC_INTERVAL', '1.0'))
+
 # --- Frontend URLs ---
 FRONTEND_APP_URL = os.environ.get("FRONTEND_APP_URL", "http://localhost:3000")
 FRONTEND_LOGIN_SUCCESS_PATH = os.environ.get(
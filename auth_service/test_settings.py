@@ -0,0 +1,30 @@
+"""
+Configurações para rodar os testes sem um Postgres externo:
+
+    python manage.py test --settings=auth_service.test_settings
+
+Usa SQLite e declara o alias ``replica`` como espelho do ``default``, para
+exercitar o roteamento de leituras (auth_service/db_router.py).
+
+Os testes que dependem do PostgreSQL (ex.: o upsert do login SUAP) são pulados
+aqui; rode-os contra o banco do docker-compose com as configurações normais:
+
+    python manage.py test --settings=auth_service.settings
+"""
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test_db.sqlite3',  # noqa: F405
+        # Em arquivo: o espelho abre outra conexão e precisa ver os mesmos dados.
+        'TEST': {'NAME': BASE_DIR / 'test_db_test.sqlite3'},  # noqa: F405
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test_db.sqlite3',  # noqa: F405
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
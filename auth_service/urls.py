@@ -18,9 +18,12 @@ from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
 
+from auth_service.metrics import metrics_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("", include("user.urls")),
+    path("metrics", metrics_view, name="metrics"),
 
     # Rota que serve o arquivo openapi.json
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
@@ -0,0 +1,341 @@
+"""
+Teste de carga reproduzível do serviço com SUAP e broker locais.
+
+Sobe um SUAP falso (``benchmarks.suap_stub``) e o serviço em um processo
+separado, servido por HTTP (``wsgiref`` com threads, ou o comando passado em
+``--server-cmd``) com o Celery no broker em memória. Em seguida dispara
+tráfego misto, com pesos configuráveis, contra:
+
+- ``callback``: ``GET /auth/suap/callback/?code=...`` (login pelo SUAP);
+- ``login``: ``POST /api/v1/auth/token/`` (organizador com senha);
+- ``refresh``: ``POST /api/v1/auth/token/refresh/``;
+- ``me``: ``GET /api/v1/auth/users/me/``;
+- ``by_ids``: ``POST /api/v1/auth/users/by-ids/``;
+- ``validate``: ``POST /api/v1/auth/users/``.
+
+O resultado (vazão e latências p50/p95/p99 por endpoint, além do commit
+testado) é impresso em JSON, para comparar execuções entre commits. Os
+usuários criados (prefixo ``loadtest_``) são apagados ao final.
+
+Uso (com o banco configurado como para o serviço):
+    python -m benchmarks.loadtest --duration 30 --concurrency 16 --output carga.json
+    python -m benchmarks.loadtest --server-cmd "gunicorn auth_service.wsgi -b {host}:{port} -w 4"
+"""
+import argparse
+import json
+import os
+import random
+import shlex
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+
+from benchmarks.suap_stub import SuapStub
+
+PREFIX = "loadtest_"
+ORGANIZER = f"{PREFIX}organizador"
+ORGANIZER_PASSWORD = "senha-do-teste-de-carga"
+DEFAULT_WEIGHTS = "callback=2,login=1,refresh=2,me=6,by_ids=3,validate=3"
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(samples, pct):
+    return samples[max(0, int(round(len(samples) * pct / 100)) - 1)]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# --- servidor ---
+
+def _serve(host, port):
+    """Serve o ``auth_service.wsgi`` com uma thread por requisição."""
+    from socketserver import ThreadingMixIn
+    from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+    from auth_service.wsgi import application
+
+    class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+        daemon_threads = True
+        request_queue_size = 128
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+    with make_server(host, port, application, ThreadingWSGIServer, QuietHandler) as server:
+        server.serve_forever()
+
+
+def _start_service(args, stub_url, host, port):
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "auth_service.settings"),
+        SUAP_BASE_URL=stub_url,
+        RABBITMQ_URL="memory://",
+        DJANGO_ALLOWED_HOSTS=",".join(filter(None, [os.environ.get("DJANGO_ALLOWED_HOSTS"), host])),
+    )
+    if not args.keep_throttle:
+        # Todo o tráfego sai do mesmo IP: o throttling do login mediria só os 429.
+        env.update(LOGIN_THROTTLE_IP_BURST="1000000", LOGIN_THROTTLE_IP_PER_MINUTE="1000000",
+                   LOGIN_THROTTLE_MATRICULA_BURST="1000000",
+                   LOGIN_THROTTLE_MATRICULA_PER_MINUTE="1000000")
+    if args.server_cmd:
+        command = shlex.split(args.server_cmd.format(host=host, port=port))
+    else:
+        command = [sys.executable, "-m", "benchmarks.loadtest", "--serve", f"{host}:{port}"]
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + args.startup_timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"ERRO: o serviço terminou durante a inicialização (código {process.returncode}).")
+        try:
+            requests.get(f"http://{host}:{port}/api/v1/auth/users/{ORGANIZER}/", timeout=1)
+            return process
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("ERRO: o serviço não respondeu a tempo.")
+
+
+# --- dados ---
+
+def _seed(size):
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import Group
+
+    from user.models import User
+
+    Group.objects.get_or_create(name="Jogador")
+    _cleanup()
+    hashed = make_password(ORGANIZER_PASSWORD)
+    User.objects.bulk_create([
+        User(matricula=ORGANIZER, email=f"{ORGANIZER}@ifrn.edu.br", nome="Organizador", password=hashed),
+        *(
+            User(matricula=f"{PREFIX}{i:06d}", email=f"{PREFIX}{i}@escolar.ifrn.edu.br",
+                 nome=f"Usuário {i}", campus="CN", tipo_usuario="Aluno")
+            for i in range(size)
+        ),
+    ])
+    return [f"{PREFIX}{i:06d}" for i in range(size)]
+
+
+def _cleanup():
+    from user.models import User
+
+    User.objects.filter(matricula__startswith=PREFIX).delete()
+
+
+# --- tráfego ---
+
+class Traffic:
+    def __init__(self, base_url, matriculas, tokens, rng, ids_per_request, callback_users):
+        self.base_url = base_url
+        self.matriculas = matriculas
+        self.tokens = tokens
+        self.rng = rng
+        self.ids_per_request = ids_per_request
+        self.callback_users = callback_users
+        self.session = requests.Session()
+
+    def _ids(self):
+        return self.rng.sample(self.matriculas, min(self.ids_per_request, len(self.matriculas)))
+
+    def callback(self):
+        code = f"{PREFIX}suap_{self.rng.randrange(self.callback_users):05d}"
+        return self.session.get(
+            f"{self.base_url}/auth/suap/callback/", params={"code": code},
+            allow_redirects=False, timeout=30)
+
+    def login(self):
+        return self.session.post(
+            f"{self.base_url}/api/v1/auth/token/",
+            json={"matricula": ORGANIZER, "password": ORGANIZER_PASSWORD}, timeout=30)
+
+    def refresh(self):
+        return self.session.post(
+            f"{self.base_url}/api/v1/auth/token/refresh/",
+            json={"refresh": self.tokens["refresh"]}, timeout=30)
+
+    def me(self):
+        return self.session.get(
+            f"{self.base_url}/api/v1/auth/users/me/",
+            headers={"Authorization": f"Bearer {self.tokens['access']}"}, timeout=30)
+
+    def by_ids(self):
+        return self.session.post(
+            f"{self.base_url}/api/v1/auth/users/by-ids/", json={"ids": self._ids()}, timeout=30)
+
+    def validate(self):
+        return self.session.post(
+            f"{self.base_url}/api/v1/auth/users/", json={"user_ids": self._ids()}, timeout=30)
+
+
+EXPECTED_STATUS = {"callback": (302,)}
+
+
+def _worker(traffic, endpoints, weights, stop, results, lock):
+    local = []
+    while not stop.is_set():
+        endpoint = traffic.rng.choices(endpoints, weights)[0]
+        start = time.perf_counter()
+        try:
+            status_code = getattr(traffic, endpoint)().status_code
+        except requests.RequestException:
+            status_code = "erro_conexao"
+        local.append((endpoint, time.perf_counter() - start, status_code))
+    with lock:
+        results.extend(local)
+
+
+def _summarize(results, elapsed):
+    summary = {}
+    for endpoint in sorted({endpoint for endpoint, _, _ in results}):
+        samples = sorted(latency for name, latency, _ in results if name == endpoint)
+        statuses = {}
+        for name, _, status_code in results:
+            if name == endpoint:
+                statuses[str(status_code)] = statuses.get(str(status_code), 0) + 1
+        expected = EXPECTED_STATUS.get(endpoint, (200,))
+        summary[endpoint] = {
+            "requests": len(samples),
+            "throughput_rps": round(len(samples) / elapsed, 2),
+            "p50_ms": round(_percentile(samples, 50) * 1000, 2),
+            "p95_ms": round(_percentile(samples, 95) * 1000, 2),
+            "p99_ms": round(_percentile(samples, 99) * 1000, 2),
+            "error_rate": round(
+                sum(count for code, count in statuses.items() if code not in map(str, expected))
+                / len(samples), 4),
+            "status": statuses,
+        }
+    return summary
+
+
+def _parse_weights(raw):
+    weights = {}
+    for item in raw.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in Traffic.__dict__:
+            raise SystemExit(f"ERRO: endpoint desconhecido em --weights: {name!r}")
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=30.0, help="Duração da carga (s).")
+    parser.add_argument("--concurrency", type=int, default=16, help="Clientes simultâneos.")
+    parser.add_argument("--weights", default=DEFAULT_WEIGHTS,
+                        help=f"Pesos do tráfego por endpoint (padrão: {DEFAULT_WEIGHTS}).")
+    parser.add_argument("--seed", type=int, default=42, help="Semente do gerador de tráfego.")
+    parser.add_argument("--users", type=int, default=2000, help="Usuários pré-cadastrados.")
+    parser.add_argument("--ids-per-request", type=int, default=50,
+                        help="Matrículas por requisição de by-ids/validação.")
+    parser.add_argument("--callback-users", type=int, default=500,
+                        help="Matrículas distintas usadas nos logins pelo SUAP.")
+    parser.add_argument("--suap-latency", type=float, default=0.05,
+                        help="Latência de cada endpoint do SUAP falso (s).")
+    parser.add_argument("--suap-error-rate", type=float, default=0.0,
+                        help="Fração de respostas 500 do SUAP falso.")
+    parser.add_argument("--server-cmd",
+                        help="Comando para subir o serviço, com {host} e {port} (padrão: wsgiref com threads).")
+    parser.add_argument("--keep-throttle", action="store_true",
+                        help="Mantém os limites do throttling de login configurados no ambiente.")
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--output", help="Arquivo para gravar o JSON (padrão: saída padrão).")
+    parser.add_argument("--serve", metavar="HOST:PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "auth_service.settings")
+    if args.serve:
+        host, _, port = args.serve.rpartition(":")
+        _serve(host, int(port))
+        return
+
+    import django
+    django.setup()
+
+    weights = _parse_weights(args.weights)
+    matriculas = _seed(args.users)
+    host, port = "127.0.0.1", _free_port()
+    base_url = f"http://{host}:{port}"
+
+    with SuapStub(latency=args.suap_latency, error_rate=args.suap_error_rate) as stub:
+        service = _start_service(args, stub.url, host, port)
+        try:
+            response = requests.post(
+                f"{base_url}/api/v1/auth/token/",
+                json={"matricula": ORGANIZER, "password": ORGANIZER_PASSWORD}, timeout=30)
+            response.raise_for_status()
+            tokens = response.json()
+
+            stop = threading.Event()
+            lock = threading.Lock()
+            results = []
+            threads = [
+                threading.Thread(target=_worker, args=(
+                    Traffic(base_url, matriculas, tokens, random.Random(args.seed + i),
+                            args.ids_per_request, args.callback_users),
+                    list(weights), list(weights.values()), stop, results, lock))
+                for i in range(args.concurrency)
+            ]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            time.sleep(args.duration)
+            stop.set()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+        finally:
+            service.terminate()
+            service.wait(timeout=10)
+            _cleanup()
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            key: value for key, value in vars(args).items() if key not in ("serve", "output")
+        },
+        "total": {
+            "requests": len(results),
+            "throughput_rps": round(len(results) / elapsed, 2),
+        },
+        "endpoints": _summarize(results, elapsed),
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+
+    print(f"\n{'endpoint':<9} | {'req':>6} | {'req/s':>7} | {'p50 ms':>8} | {'p95 ms':>8} | "
+          f"{'p99 ms':>8} | erros", file=sys.stderr)
+    for endpoint, stats in report["endpoints"].items():
+        print(f"{endpoint:<9} | {stats['requests']:>6} | {stats['throughput_rps']:>7.1f} | "
+              f"{stats['p50_ms']:>8.1f} | {stats['p95_ms']:>8.1f} | {stats['p99_ms']:>8.1f} | "
+              f"{stats['error_rate']:.2%}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Latência do login por senha de usuários legítimos enquanto outras threads
+fazem credential stuffing contra uma conta de organizador, com e sem o
+``LoginRateThrottle`` na frente do ``authenticate()``.
+
+Os logins passam pelo Django inteiro (``django.test.Client``) no próprio
+processo; os usuários de teste são criados no banco configurado e apagados
+ao final.
+
+Uso (com o banco configurado como para o serviço):
+    python -m benchmarks.login_throttle --attackers 8 --duration 20
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+
+
+def _percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[max(0, int(round(len(samples) * pct / 100)) - 1)]
+
+
+def _attacker(stop, target, ip, counts, lock, interval):
+    from django.db import connection
+    from django.test import Client
+
+    client = Client(REMOTE_ADDR=ip)
+    attempt = 0
+    while not stop.wait(interval):
+        response = client.post(
+            "/api/v1/auth/token/", {"matricula": target, "password": f"chute{attempt}"},
+            content_type="application/json")
+        attempt += 1
+        with lock:
+            counts[response.status_code] = counts.get(response.status_code, 0) + 1
+    connection.close()
+
+
+def _legit(stop, users, password, samples, lock, interval):
+    from django.db import connection
+    from django.test import Client
+
+    # Cada login é de um usuário diferente vindo de um IP diferente.
+    for index, matricula in enumerate(users):
+        if stop.is_set():
+            break
+        client = Client(REMOTE_ADDR=f"192.168.{index // 250}.{index % 250 + 1}")
+        start = time.perf_counter()
+        response = client.post(
+            "/api/v1/auth/token/", {"matricula": matricula, "password": password},
+            content_type="application/json")
+        elapsed = time.perf_counter() - start
+        if response.status_code != 200:
+            print(f"AVISO: login legítimo de {matricula} retornou {response.status_code}")
+        with lock:
+            samples.append(elapsed)
+        stop.wait(interval)
+    connection.close()
+
+
+def _run(label, args, legit_users, password, attackers):
+    from user import throttling
+
+    # Buckets zerados a cada cenário
+    throttling._store = None
+    stop = threading.Event()
+    lock = threading.Lock()
+    samples, counts = [], {}
+    threads = [
+        threading.Thread(target=_attacker, args=(
+            stop, "bench_org_alvo", f"10.0.0.{i % args.attacker_ips + 1}", counts, lock,
+            1 / args.attack_rate))
+        for i in range(attackers)
+    ]
+    threads.append(threading.Thread(
+        target=_legit, args=(stop, legit_users, password, samples, lock, args.legit_interval)))
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    print(f"{label:<14} logins legítimos={len(samples):>3} "
+          f"p50={statistics.median(samples) * 1000:8.1f}ms "
+          f"p95={_percentile(samples, 95) * 1000:8.1f}ms "
+          f"p99={_percentile(samples, 99) * 1000:8.1f}ms | "
+          f"ataque: {sum(counts.values())} tentativas, respostas {dict(sorted(counts.items()))}",
+          flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--attackers", type=int, default=8, help="Threads de ataque.")
+    parser.add_argument("--attack-rate", type=float, default=20.0,
+                        help="Tentativas por segundo de cada thread de ataque.")
+    parser.add_argument("--attacker-ips", type=int, default=4, help="IPs distintos usados no ataque.")
+    parser.add_argument("--duration", type=float, default=20.0, help="Duração de cada cenário (s).")
+    parser.add_argument("--legit-interval", type=float, default=0.5,
+                        help="Intervalo entre logins legítimos (s).")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "auth_service.settings")
+    import django
+    django.setup()
+
+    from django.contrib.auth.hashers import make_password
+
+    from user.models import User
+    from user.throttling import LoginRateThrottle
+    from user.views import LoginView
+
+    password = "senha-do-benchmark"
+    hashed = make_password(password)
+    legit_users = [f"bench_org_{i:04d}" for i in range(1000)]
+    User.objects.bulk_create([
+        User(matricula=matricula, email=f"{matricula}@ifrn.edu.br", nome=matricula, password=hashed)
+        for matricula in ["bench_org_alvo", *legit_users]
+    ])
+    try:
+        LoginView.throttle_classes = []
+        _run("sem ataque", args, legit_users, password, attackers=0)
+        _run("sem throttle", args, legit_users, password, attackers=args.attackers)
+        LoginView.throttle_classes = [LoginRateThrottle]
+        _run("com throttle", args, legit_users, password, attackers=args.attackers)
+    finally:
+        User.objects.filter(matricula__startswith="bench_org_").delete()
+
+
+if __name__ == "__main__":
+    main()
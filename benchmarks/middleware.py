@@ -0,0 +1,112 @@
+"""
+Custo por requisição da pilha de middlewares nas rotas da API, com os
+middlewares de sessão, CSRF, autenticação do Django e mensagens originais
+(``django``) e com as versões que pulam as rotas sem estado (``stateless``).
+
+As requisições passam pelo Django inteiro (``Client``), sem servidor HTTP,
+em endpoints baratos (JWKS, /me e validação) para o custo dos middlewares
+aparecer. Os dois modos se alternam em rodadas para diluir ruído; o
+resultado é a mediana do tempo por requisição de cada modo. Também mede uma
+página do admin, que deve custar o mesmo nos dois modos.
+
+Uso (com o banco configurado como para o serviço):
+    python -m benchmarks.middleware --requests 2000 --rounds 5
+"""
+import argparse
+import os
+import statistics
+import time
+
+BROWSER_MIDDLEWARES = {
+    "django.contrib.sessions.middleware.SessionMiddleware":
+        "auth_service.middleware.BrowserSessionMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware":
+        "auth_service.middleware.BrowserCsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware":
+        "auth_service.middleware.BrowserAuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware":
+        "auth_service.middleware.BrowserMessageMiddleware",
+}
+
+
+def _middleware_stacks():
+    """As duas pilhas (django, stateless) a partir do MIDDLEWARE configurado."""
+    from django.conf import settings
+
+    originals = {browser: django for django, browser in BROWSER_MIDDLEWARES.items()}
+    django_stack = [originals.get(name, name) for name in settings.MIDDLEWARE]
+    stateless_stack = [BROWSER_MIDDLEWARES.get(name, name) for name in django_stack]
+    return {"django": django_stack, "stateless": stateless_stack}
+
+
+def _requests(matricula, token):
+    auth = {"Authorization": f"Bearer {token}"}
+    return [
+        ("get", "/.well-known/jwks.json", None, {}),
+        ("get", "/api/v1/auth/users/me/", None, auth),
+        ("post", "/api/v1/auth/users/", {"user_ids": [matricula]}, {}),
+    ]
+
+
+def _fixture():
+    from user.models import User
+    from user.views import get_tokens_for_user
+
+    user = User.objects.order_by("id").first()
+    if user is None:
+        raise SystemExit("ERRO: o banco não tem usuários para o benchmark.")
+    return user.matricula, get_tokens_for_user(user)["access"]
+
+
+def _time_requests(client, requests, count):
+    """Tempo médio (µs) por requisição, repetindo ``requests`` até ``count``."""
+    start = time.perf_counter()
+    for i in range(count):
+        method, path, body, headers = requests[i % len(requests)]
+        if method == "get":
+            response = client.get(path, headers=headers)
+        else:
+            response = client.post(path, body, content_type="application/json", headers=headers)
+        assert response.status_code in (200, 302), (path, response.status_code)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000, help="Requisições por rodada.")
+    parser.add_argument("--rounds", type=int, default=5, help="Rodadas por modo.")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "auth_service.settings")
+    import django
+    django.setup()
+    from django.test import Client, override_settings
+
+    matricula, token = _fixture()
+    scenarios = {
+        "api": _requests(matricula, token),
+        "admin": [("get", "/admin/login/", None, {})],
+    }
+    results = {(mode, scenario): [] for mode in ("django", "stateless") for scenario in scenarios}
+
+    stacks = _middleware_stacks()
+    for round_ in range(args.rounds + 1):
+        for mode, stack in stacks.items():
+            # Client novo: o handler monta a pilha de middlewares ao ser criado
+            with override_settings(MIDDLEWARE=stack):
+                client = Client()
+                for scenario, requests in scenarios.items():
+                    count = args.requests if scenario == "api" else args.requests // 4
+                    elapsed = _time_requests(client, requests, count)
+                    if round_:  # a primeira rodada só aquece
+                        results[mode, scenario].append(elapsed)
+
+    print(f"{'rotas':<6} | {'django µs/req':>13} | {'stateless µs/req':>16} | {'economia':>8}")
+    for scenario in scenarios:
+        before = statistics.median(results["django", scenario])
+        after = statistics.median(results["stateless", scenario])
+        print(f"{scenario:<6} | {before:>13.1f} | {after:>16.1f} | {before - after:>6.1f}µs")
+
+
+if __name__ == "__main__":
+    main()
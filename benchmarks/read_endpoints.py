@@ -0,0 +1,166 @@
+"""
+Requisições por segundo e memória por conexão simultânea das views de
+leitura de usuários (/me, detalhe, by-ids e validação) em três modos:
+
+- ``wsgi``: views síncronas, uma thread por conexão (como um servidor WSGI
+  com threads);
+- ``asgi-sync``: as mesmas views sob o handler ASGI (rodam no thread pool);
+- ``asgi-async``: as views assíncronas (``USER_READ_VIEWS_ASYNC=True``).
+
+As requisições passam pelo Django inteiro (``Client``/``AsyncClient``), sem
+servidor HTTP. Cada modo roda em um processo novo; a memória é o aumento do
+RSS máximo do processo dividido pelo número de conexões.
+
+Uso (com o banco configurado como para o serviço):
+    python -m benchmarks.read_endpoints --concurrency 50 --duration 10
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+MODES = ("wsgi", "asgi-sync", "asgi-async")
+
+
+def _requests(matriculas, token):
+    """Ciclo de requisições (método, caminho, corpo, cabeçalhos) misturando os endpoints."""
+    auth = {"Authorization": f"Bearer {token}"}
+    return itertools.cycle([
+        ("get", "/api/v1/auth/users/me/", None, auth),
+        ("get", f"/api/v1/auth/users/{matriculas[0]}/", None, {}),
+        ("post", "/api/v1/auth/users/by-ids/", {"ids": matriculas}, {}),
+        ("post", "/api/v1/auth/users/", {"user_ids": matriculas + ["inexistente"]}, {}),
+    ])
+
+
+def _fixture(size):
+    from user.models import User
+    from user.views import get_tokens_for_user
+
+    matriculas = list(User.objects.order_by("id").values_list("matricula", flat=True)[:size])
+    if not matriculas:
+        raise SystemExit("ERRO: o banco não tem usuários para o benchmark.")
+    token = get_tokens_for_user(User.objects.get(matricula=matriculas[0]))["access"]
+    return matriculas, token
+
+
+def _run_wsgi(args, matriculas, token):
+    from django.db import connection
+    from django.test import Client
+
+    stop = threading.Event()
+    counts = []
+
+    def worker(offset):
+        client = Client()
+        requests = _requests(matriculas, token)
+        for _ in range(offset):
+            next(requests)
+        done = 0
+        while not stop.is_set():
+            method, path, body, headers = next(requests)
+            if method == "get":
+                response = client.get(path, headers=headers)
+            else:
+                response = client.post(path, body, content_type="application/json", headers=headers)
+            assert response.status_code in (200, 400), response.status_code
+            done += 1
+        counts.append(done)
+        connection.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts)
+
+
+def _run_asgi(args, matriculas, token):
+    from django.test import AsyncClient
+
+    async def worker(offset, deadline):
+        client = AsyncClient()
+        requests = _requests(matriculas, token)
+        for _ in range(offset):
+            next(requests)
+        done = 0
+        while time.monotonic() < deadline:
+            method, path, body, headers = next(requests)
+            if method == "get":
+                response = await client.get(path, headers=headers)
+            else:
+                response = await client.post(
+                    path, body, content_type="application/json", headers=headers)
+            assert response.status_code in (200, 400), response.status_code
+            done += 1
+        return done
+
+    async def main():
+        deadline = time.monotonic() + args.duration
+        return sum(await asyncio.gather(*(worker(i, deadline) for i in range(args.concurrency))))
+
+    return asyncio.run(main())
+
+
+def _child(args):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "auth_service.settings")
+    os.environ["USER_READ_VIEWS_ASYNC"] = "True" if args.mode == "asgi-async" else "False"
+    import django
+    django.setup()
+
+    matriculas, token = _fixture(args.ids)
+    # Aquece caches, índice de matrículas e conexões antes de medir
+    warmup = argparse.Namespace(**{**vars(args), "concurrency": 1, "duration": 1.0})
+    runner = _run_wsgi if args.mode == "wsgi" else _run_asgi
+    runner(warmup, matriculas, token)
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    total = runner(args, matriculas, token)
+    elapsed = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(json.dumps({
+        "mode": args.mode,
+        "requests": total,
+        "rps": total / elapsed,
+        "kib_per_connection": (rss_after - rss_before) / args.concurrency,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=50, help="Conexões simultâneas.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Duração de cada modo (s).")
+    parser.add_argument("--ids", type=int, default=20, help="Matrículas por requisição em lote.")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        _child(args)
+        return
+
+    print(f"{'modo':<11} | {'req/s':>8} | {'KiB/conexão':>11} | conexões={args.concurrency}")
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.read_endpoints", "--mode", mode,
+             "--concurrency", str(args.concurrency), "--duration", str(args.duration),
+             "--ids", str(args.ids)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(next(
+            line for line in output.splitlines() if line.startswith('{"mode"')))
+        print(f"{mode:<11} | {result['rps']:>8.0f} | {result['kib_per_connection']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
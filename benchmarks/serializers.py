@@ -0,0 +1,88 @@
+"""
+Compara o ``UserSerializer`` (ModelSerializer) com o ``UserReadSerializer``
+compilado para 1, 100 e 10.000 usuários: custo por objeto (consulta +
+serialização) e pico de memória medido com ``tracemalloc``. Também confere
+que o JSON gerado pelos dois é idêntico byte a byte.
+
+Os usuários são criados dentro de uma transação desfeita ao final.
+
+Uso (com o banco configurado como para o serviço):
+    python -m benchmarks.serializers --sizes 1 100 10000
+"""
+import argparse
+import os
+import time
+import tracemalloc
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def _seed(User, Group, size):
+    jogador, _ = Group.objects.get_or_create(name='Jogador')
+    users = User.objects.bulk_create([
+        User(matricula=f"bench{i:08d}", email=f"bench{i}@escolar.ifrn.edu.br",
+             nome=f"Usuário {i}", campus="CN", foto=f"https://suap.example/{i}.jpg",
+             sexo="M", tipo_usuario="Aluno", curso="Técnico em Informática",
+             situacao="Matriculado", data_nascimento="2005-10-20")
+        for i in range(size)
+    ])
+    User.groups.through.objects.bulk_create([
+        User.groups.through(user_id=user.pk, group_id=jogador.pk) for user in users
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10000])
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "auth_service.settings")
+    import django
+    django.setup()
+
+    from django.contrib.auth.models import Group
+    from django.db import transaction
+    from rest_framework.renderers import JSONRenderer
+
+    from user.models import User
+    from user.serializers import UserSerializer, user_read_serializer
+
+    renderer = JSONRenderer()
+    print(f"{'usuários':>9} | {'serializer':<18} | {'µs/objeto':>10} | {'pico (KiB)':>10}")
+    for size in args.sizes:
+        try:
+            with transaction.atomic():
+                _seed(User, Group, size)
+                queryset = User.objects.filter(matricula__startswith="bench").order_by("id")
+
+                drf_data, drf_time, drf_peak = _measure(
+                    lambda: UserSerializer(queryset.prefetch_related("groups"), many=True).data)
+                fast_data, fast_time, fast_peak = _measure(
+                    lambda: user_read_serializer.many(queryset))
+
+                identical = renderer.render(drf_data) == renderer.render(fast_data)
+                for label, elapsed, peak in (
+                    ("UserSerializer", drf_time, drf_peak),
+                    ("UserReadSerializer", fast_time, fast_peak),
+                ):
+                    print(f"{size:>9} | {label:<18} | {elapsed / size * 1e6:>10.1f} | {peak / 1024:>10.1f}")
+                print(f"{'':>9} | saída idêntica: {identical}")
+                raise _Rollback
+        except _Rollback:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Compara a latência por login da troca de token + buscas de perfil no SUAP:
+requisições avulsas com um ThreadPoolExecutor novo (comportamento antigo)
+contra o ``SuapClient`` com pool keep-alive.
+
+Uso:
+    python -m benchmarks.suap_login --logins 200 --connect-delay 0.03
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+
+from benchmarks.suap_stub import SuapStub
+
+
+def _naive_login(stub_url, code):
+    response = requests.post(f"{stub_url}/o/token/", data={"code": code}, timeout=15)
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    with ThreadPoolExecutor() as executor:
+        meus_dados = executor.submit(
+            requests.get, f"{stub_url}/api/v2/minhas-informacoes/meus-dados/", headers=headers, timeout=10)
+        eu = executor.submit(requests.get, f"{stub_url}/api/rh/eu", headers=headers, timeout=10)
+        return meus_dados.result().json(), eu.result().json()
+
+
+def _pooled_login(client, code):
+    token_data = client.exchange_code(code)
+    return client.fetch_profile(token_data["access_token"])
+
+
+def _report(label, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<8} média={statistics.mean(samples) * 1000:7.2f}ms "
+          f"p50={statistics.median(samples) * 1000:7.2f}ms p95={p95 * 1000:7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Latência artificial por requisição do stub (s).")
+    parser.add_argument("--connect-delay", type=float, default=0.03,
+                        help="Custo simulado de handshake por nova conexão (s).")
+    args = parser.parse_args()
+
+    with SuapStub(latency=args.latency, connect_delay=args.connect_delay) as stub:
+        settings.configure(
+            SUAP_BASE_URL=stub.url, SUAP_CLIENT_ID="bench", SUAP_CLIENT_SECRET="bench")
+        from user.suap import get_suap_client
+
+        results = {}
+        for label in ("avulso", "pool"):
+            stub.connections = 0
+            samples = []
+            client = get_suap_client() if label == "pool" else None
+            for i in range(args.logins):
+                start = time.perf_counter()
+                if client:
+                    _pooled_login(client, f"2024{i:06d}")
+                else:
+                    _naive_login(stub.url, f"2024{i:06d}")
+                samples.append(time.perf_counter() - start)
+            results[label] = samples
+            _report(label, samples)
+            print(f"{'':<8} conexões abertas no stub: {stub.connections}")
+
+        speedup = statistics.mean(results["avulso"]) / statistics.mean(results["pool"])
+        print(f"Redução de latência por login: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Servidor SUAP falso para benchmarks locais.
+
+Atende ``/o/token/``, ``/api/v2/minhas-informacoes/meus-dados/`` e ``/api/rh/eu``
+com latência e taxa de erro configuráveis por endpoint. O ``code`` do OAuth
+vira o access token e o access token vira a matrícula, então cada login pode
+simular um usuário diferente.
+
+``connect_delay`` é aplicado uma vez por conexão TCP aceita, simulando o custo
+do handshake TCP+TLS com o SUAP real.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+ENDPOINTS = {
+    "/o/token/": "token",
+    "/api/v2/minhas-informacoes/meus-dados/": "meus_dados",
+    "/api/rh/eu": "eu",
+}
+
+
+def _meus_dados(matricula):
+    return {
+        "matricula": matricula,
+        "nome_usual": f"Usuário {matricula}",
+        "url_foto_75x100": f"https://suap.example/fotos/{matricula}.jpg",
+        "tipo_vinculo": "Aluno",
+        "data_nascimento": "2005-10-20",
+        "vinculo": {
+            "campus": "CN",
+            "curso": "Técnico em Informática",
+            "situacao": "Matriculado",
+        },
+    }
+
+
+def _eu(matricula):
+    return {
+        "identificacao": matricula,
+        "email": f"{matricula}@escolar.ifrn.edu.br",
+        "sexo": "M",
+    }
+
+
+class SuapStub:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, connect_delay=0.0, error_rate=0.0):
+        self.connect_delay = connect_delay
+        self.behavior = {
+            name: {"latency": latency, "error_rate": error_rate}
+            for name in ENDPOINTS.values()
+        }
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def configure(self, endpoint, latency=None, error_rate=None):
+        if latency is not None:
+            self.behavior[endpoint]["latency"] = latency
+        if error_rate is not None:
+            self.behavior[endpoint]["error_rate"] = error_rate
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="suap-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+                if stub.connect_delay:
+                    time.sleep(stub.connect_delay)
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _dispatch(self):
+                # O corpo é sempre consumido para não corromper a conexão keep-alive.
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode() if length else ""
+                endpoint = ENDPOINTS.get(self.path.split("?")[0])
+                with stub._lock:
+                    stub.requests += 1
+                if endpoint is None:
+                    return self._reply(404, {"detail": "not found"})
+
+                behavior = stub.behavior[endpoint]
+                if behavior["latency"]:
+                    time.sleep(behavior["latency"])
+                if behavior["error_rate"] and random.random() < behavior["error_rate"]:
+                    return self._reply(500, {"detail": "erro simulado"})
+
+                if endpoint == "token":
+                    form = parse_qs(body)
+                    code = form.get("code", ["stub"])[0]
+                    return self._reply(200, {"access_token": code, "token_type": "Bearer"})
+
+                matricula = self.headers.get("Authorization", "").removeprefix("Bearer ") or "stub"
+                if endpoint == "meus_dados":
+                    return self._reply(200, _meus_dados(matricula))
+                return self._reply(200, _eu(matricula))
+
+            do_GET = _dispatch
+            do_POST = _dispatch
+
+        return Handler
@@ -0,0 +1,41 @@
+"""
+Validação local dos access tokens do auth-service, para os outros serviços
+do IFSports.
+
+Módulo independente do Django: depende só de ``PyJWT[crypto]`` e pode ser
+copiado para o serviço que precisa validar tokens. As chaves públicas vêm do
+JWKS do auth-service (``/.well-known/jwks.json``), ficam em cache e são
+buscadas de novo quando aparece um ``kid`` desconhecido (rotação de chave).
+
+Uso:
+    verifier = TokenVerifier("https://auth.exemplo/.well-known/jwks.json")
+    claims = verifier.verify(token)   # jwt.InvalidTokenError se inválido
+    claims["matricula"], claims["groups"]
+"""
+import jwt
+
+TOKEN_ISSUER = 'ifsports-recomeco'
+ALGORITHMS = ('RS256', 'EdDSA')
+
+
+class TokenVerifier:
+    def __init__(self, jwks_url, issuer=TOKEN_ISSUER, algorithms=ALGORITHMS,
+                 cache_seconds=3600, leeway=0, timeout=5):
+        self.issuer = issuer
+        self.algorithms = list(algorithms)
+        self.leeway = leeway
+        self.jwks_client = jwt.PyJWKClient(
+            jwks_url, cache_jwk_set=True, lifespan=cache_seconds, timeout=timeout)
+
+    def verify(self, token):
+        """Retorna as claims de um access token válido."""
+        try:
+            signing_key = self.jwks_client.get_signing_key_from_jwt(token)
+        except jwt.PyJWKClientError as exc:
+            raise jwt.InvalidTokenError(str(exc)) from exc
+        claims = jwt.decode(
+            token, signing_key.key, algorithms=self.algorithms, issuer=self.issuer,
+            leeway=self.leeway, options={'require': ['exp', 'iss', 'jti']})
+        if claims.get('token_type') != 'access':
+            raise jwt.InvalidTokenError("O token não é um access token.")
+        return claims
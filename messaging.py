@@ -1,7 +1,18 @@
+import atexit
 import json
+import os
+import queue
+import threading
+import time
 import uuid
 from datetime import datetime, timezone
-from celery_app import celery_app
+from tempfile import gettempdir
+from celery_app import celery_app, ensure_audit_topology
+from audit_spool import AuditSpool
+from auth_service.metrics import (
+    AUDIT_DROPPED, AUDIT_PUBLISH_FAILURES, AUDIT_PUBLISH_LATENCY, AUDIT_PUBLISHER_ALIVE,
+    AUDIT_PUBLISHER_ERRORS, AUDIT_QUEUE_DEPTH,
+)
 
 # Exceção principal de conexão do Celery
 from kombu.exceptions import OperationalError
@@ -9,33 +20,291 @@ from kombu.exceptions import OperationalError
 AUDIT_EXCHANGE = 'events_exchange'
 AUDIT_TASK_NAME = 'process_audit_log'
 
+# Vale para cada evento do lote: uma falha interrompe o lote e o restante vai
+# para o spool, então a thread de publicação não espera mais que isso.
+AUDIT_RETRY_POLICY = {
+    'max_retries': 1,          # Uma única nova tentativa
+    'interval_start': 0,       # Imediata
+    'interval_step': 0.2,
+    'interval_max': 0.2,       # O tempo de espera não passará de 0.2s
+}
 
-def send_audit_log(log_payload: dict):
-    try:
-        routing_key = log_payload.get("event_type", "log.info")
-
-        celery_app.send_task(
-            name=AUDIT_TASK_NAME,
-            args=[log_payload],
-            exchange=AUDIT_EXCHANGE,
-            routing_key=routing_key,
-            retry=True,
-            retry_policy={
-                'max_retries': 3,          # Tenta no máximo 3 vezes
-                'interval_start': 0.5,     # Começa esperando 0.5s
-                'interval_step': 0.5,      # Aumenta o tempo de espera em 0.5s a cada tentativa
-                'interval_max': 2.0,       # O tempo de espera não passará de 2s
-            }
-        )
 
-        print(
-            f" [AUDIT] Tarefa '{AUDIT_TASK_NAME}' enviada para a exchange '{AUDIT_EXCHANGE}' com routing_key '{routing_key}'.")
+class PartialPublishError(Exception):
+    """A publicação de um lote falhou depois de enviar os ``sent`` primeiros eventos."""
+
+    def __init__(self, sent, error):
+        super().__init__(str(error))
+        self.sent = sent
+        self.error = error
+
+
+class AuditPublisher:
+    """
+    Pipeline de auditoria em processo: a requisição apenas enfileira o evento
+    em uma fila limitada e uma thread em segundo plano publica os eventos em
+    lotes na exchange de auditoria, reutilizando uma única conexão com o broker.
+
+    Eventos que não puderam ser publicados (broker fora do ar ou fila cheia)
+    vão para o ``spool`` em disco e são reenviados em lote quando o broker
+    volta. Sem spool, eles são descartados e contabilizados em ``stats()``.
+    """
+
+    def __init__(self, app, maxsize=10000, batch_size=100, flush_interval=0.5,
+                 spool=None, replay_interval=5.0):
+        self.app = app
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool = spool
+        self.replay_interval = replay_interval
+        self._last_replay = 0.0
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._connection = None
+        self._producer = None
+        self._counters = {
+            'enqueued': 0,
+            'dropped': 0,
+            'published': 0,
+            'failed': 0,
+            'batches': 0,
+            'spooled': 0,
+            'replayed': 0,
+            'errors': 0,
+        }
+        self._last_publish_seconds = 0.0
+
+    def enqueue(self, log_payload):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(log_payload)
+        except queue.Full:
+            print(
+                f"ERRO DE AUDITORIA: Fila de auditoria cheia ({self.maxsize}).")
+            return self._spool([log_payload])
+        self._count('enqueued')
+        return True
+
+    def flush(self, timeout=5.0):
+        # Aguarda a thread publicar o que já está na fila (usado no desligamento).
+        if self._queue is None or self._pid != os.getpid():
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        if self.spool is not None:
+            self.spool.flush()
+        return not self._queue.unfinished_tasks
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats['queue_depth'] = self._queue.qsize() if self._queue else 0
+        stats['queue_maxsize'] = self.maxsize
+        stats['thread_alive'] = self.is_alive()
+        stats['last_publish_seconds'] = self._last_publish_seconds
+        if self.spool is not None:
+            stats['dropped'] += self.spool.dropped
+            stats['spool_pending_bytes'] = self.spool.pending_bytes()
+        return stats
+
+    def is_alive(self):
+        return self._thread is not None and self._pid == os.getpid() and self._thread.is_alive()
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            self._counters[counter] += amount
+        if counter == 'failed':
+            AUDIT_PUBLISH_FAILURES.inc(amount)
+        elif counter == 'dropped':
+            AUDIT_DROPPED.inc(amount)
+        elif counter == 'errors':
+            AUDIT_PUBLISHER_ERRORS.inc(amount)
+
+    def _ensure_started(self):
+        # Fila e thread são criadas por processo: um worker criado via fork
+        # não herda a thread do processo pai. Uma thread que morreu é
+        # recriada sobre a mesma fila.
+        if self.is_alive():
+            return
+        pid = os.getpid()
+        with self._lock:
+            if self.is_alive():
+                return
+            if self._pid != pid:
+                self._queue = queue.Queue(maxsize=self.maxsize)
+                self._connection = None
+                self._producer = None
+            elif self._thread is not None:
+                print("ERRO DE AUDITORIA: A thread de publicação parou; iniciando outra.")
+            self._thread = threading.Thread(
+                target=self._run, name="audit-publisher", daemon=True)
+            self._thread.start()
+            self._pid = pid
+
+    def _run(self):
+        AUDIT_PUBLISHER_ALIVE.inc()
+        try:
+            while True:
+                self._run_once()
+        finally:
+            AUDIT_PUBLISHER_ALIVE.dec()
 
-    except OperationalError as exc:
+    def _run_once(self):
+        batch = []
+        try:
+            batch = self._next_batch()
+            AUDIT_QUEUE_DEPTH.set(self._queue.qsize())
+            if not batch or self._publish(batch):
+                self._maybe_replay()
+        except Exception as exc:
+            # Nenhuma falha pode encerrar a thread: sem ela, a fila só enche.
+            self._count('errors')
+            print(f"ERRO DE AUDITORIA: Falha inesperada na thread de publicação. Erro: {exc}")
+            time.sleep(self.flush_interval)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _get_producer(self):
+        if self._producer is None:
+            self._connection = self.app.connection_for_write()
+            ensure_audit_topology(self._connection)
+            self._producer = self._connection.Producer()
+        return self._producer
+
+    def _reset_connection(self):
+        try:
+            if self._connection is not None:
+                self._connection.release()
+        except Exception:
+            pass
+        self._connection = None
+        self._producer = None
+
+    def _send_batch(self, batch):
+        producer = self._get_producer()
+        for sent, log_payload in enumerate(batch):
+            try:
+                self.app.send_task(
+                    name=AUDIT_TASK_NAME,
+                    args=[log_payload],
+                    exchange=AUDIT_EXCHANGE,
+                    routing_key=log_payload.get("event_type", "log.info"),
+                    producer=producer,
+                    retry=True,
+                    retry_policy=AUDIT_RETRY_POLICY,
+                )
+            except Exception as exc:
+                raise PartialPublishError(sent, exc) from exc
+
+    def _publish(self, batch):
+        start = time.perf_counter()
+        try:
+            self._send_batch(batch)
+        except Exception as exc:
+            self._reset_connection()
+            # Só o que não saiu vai para o spool: o reenvio não pode duplicar
+            # os eventos que o broker já recebeu.
+            sent = getattr(exc, 'sent', 0)
+            error = getattr(exc, 'error', exc)
+            unsent = batch[sent:]
+            if sent:
+                self._count('published', sent)
+            self._count('failed', len(unsent))
+            if isinstance(error, OperationalError):
+                print(
+                    f"ERRO DE AUDITORIA: Falha de conexão ao publicar {len(unsent)} evento(s). Erro: {error}")
+            else:
+                print(f"ERRO DE AUDITORIA: Falha genérica ao publicar {len(unsent)} evento(s). Erro: {error}")
+            self._spool(unsent)
+            return False
+
+        self._last_publish_seconds = time.perf_counter() - start
+        AUDIT_PUBLISH_LATENCY.observe(self._last_publish_seconds)
+        self._count('published', len(batch))
+        self._count('batches')
         print(
-            f"ERRO DE AUDITORIA: Falha de conexão ao tentar enviar tarefa. A tarefa será tentada novamente. Erro: {exc}")
+            f" [AUDIT] {len(batch)} tarefa(s) '{AUDIT_TASK_NAME}' enviada(s) para a exchange '{AUDIT_EXCHANGE}'.")
+        return True
+
+    def _spool(self, events):
+        if self.spool is None:
+            self._count('dropped', len(events))
+            print(f"ERRO DE AUDITORIA: {len(events)} evento(s) descartado(s).")
+            return False
+        try:
+            written = self.spool.append(events)
+        except Exception as exc:
+            # O spool já trata as falhas de disco; isto é só a última barreira.
+            self._count('dropped', len(events))
+            print(f"ERRO DE AUDITORIA: {len(events)} evento(s) descartado(s). Erro: {exc}")
+            return False
+        self._count('spooled', written)
+        if written < len(events):
+            # Descartes do spool: já somados em stats() por spool.dropped.
+            AUDIT_DROPPED.inc(len(events) - written)
+        return written == len(events)
+
+    def _maybe_replay(self):
+        if self.spool is None or time.monotonic() - self._last_replay < self.replay_interval:
+            return
+        self._last_replay = time.monotonic()
+        if not self.spool.has_pending():
+            return
+        try:
+            replayed = self.spool.replay(self._send_batch, batch_size=self.batch_size)
+        except Exception as exc:
+            self._reset_connection()
+            print(f"ERRO DE AUDITORIA: Falha ao reenviar eventos do spool. Erro: {exc}")
+            return
+        if replayed:
+            self._count('replayed', replayed)
+            print(f" [AUDIT] {replayed} evento(s) reenviado(s) a partir do spool.")
+
+
+audit_publisher = AuditPublisher(
+    celery_app,
+    maxsize=int(os.getenv('AUDIT_QUEUE_MAXSIZE', '10000')),
+    batch_size=int(os.getenv('AUDIT_BATCH_SIZE', '100')),
+    flush_interval=float(os.getenv('AUDIT_FLUSH_INTERVAL', '0.5')),
+    spool=AuditSpool(
+        os.getenv('AUDIT_SPOOL_DIR', os.path.join(
+            gettempdir(), 'auth-service-audit-spool')),
+        segment_max_bytes=int(
+            os.getenv('AUDIT_SPOOL_SEGMENT_BYTES', str(4 * 1024 * 1024))),
+        max_total_bytes=int(
+            os.getenv('AUDIT_SPOOL_MAX_BYTES', str(256 * 1024 * 1024))),
+    ),
+    replay_interval=float(os.getenv('AUDIT_SPOOL_REPLAY_INTERVAL', '5.0')),
+)
+atexit.register(audit_publisher.flush)
+
+
+def send_audit_log(log_payload: dict):
+    # Só enfileira: a publicação no broker acontece na thread do AuditPublisher.
+    # A auditoria nunca derruba a requisição (login, logout, callback do SUAP).
+    try:
+        audit_publisher.enqueue(log_payload)
     except Exception as e:
-        print(f"ERRO DE AUDITORIA: Falha genérica ao enviar tarefa. Erro: {e}")
+        print(
+            f"ERRO DE AUDITORIA: Falha ao enfileirar o evento. Erro: {e}. "
+            f"Evento: {json.dumps(log_payload, default=str)}")
 
 
 def build_log_payload(request, user, event_type, operation_type, old_data=None, new_data=None, entity_id=None):
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class UserConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "user"
+
+    def ready(self):
+        from . import lookups, signals  # noqa: F401
+        from .signing import install_token_backend
+
+        install_token_backend()
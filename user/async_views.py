@@ -0,0 +1,168 @@
+"""
+Versões assíncronas das views de leitura de usuários, usadas quando o
+serviço roda sob ASGI com ``USER_READ_VIEWS_ASYNC=True``.
+
+São views Django nativas (o ``APIView`` do DRF é síncrono) que usam o ORM
+assíncrono do início ao fim e devolvem as mesmas respostas das views
+síncronas correspondentes em ``views.py``.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST, require_safe
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated
+
+from auth_service.db_router import ais_pinned, replica_reads, use_primary
+
+from .authentication import ClaimsJWTAuthentication
+from .detail_cache import aget_user_detail
+from .matricula_index import matricula_index
+from .models import User
+from .renderers import NDJSONRenderer, json_bytes, ndjson_line
+from .serializers import user_read_serializer
+from .user_cache import aget_cached_user
+from .views import (
+    BULK_LOOKUP_CHUNK_SIZE, _etag_matches, _ids_para_busca, _matriculas_para_validar,
+    _resultado_validacao,
+)
+
+
+def _json_response(data, status_code=status.HTTP_200_OK, headers=None):
+    return HttpResponse(
+        json_bytes(data), status=status_code, headers=headers, content_type='application/json')
+
+
+def _request_json(request):
+    try:
+        return json.loads(request.body or b'{}'), None
+    except ValueError as exc:
+        # Mesma mensagem do JSONParser do DRF
+        return None, _json_response(
+            {"detail": f"JSON parse error - {exc}"}, status.HTTP_400_BAD_REQUEST)
+
+
+async def _authenticate(request):
+    """
+    Mesma autenticação do DRF (``ClaimsJWTAuthentication``). Retorna
+    ``(usuário, None)`` ou ``(None, resposta de erro 401)``.
+    """
+    authentication = ClaimsJWTAuthentication()
+    try:
+        header = authentication.get_header(request)
+        raw_token = authentication.get_raw_token(header) if header is not None else None
+        if raw_token is None:
+            raise NotAuthenticated()
+        # A verificação de revogação pode consultar o Redis: fora do event loop.
+        validated_token = await sync_to_async(authentication.get_validated_token)(raw_token)
+        # Lê o snapshot de claims (ou, em tokens antigos, o User) do cache ou do banco.
+        user = await sync_to_async(authentication.get_user)(validated_token)
+    except (AuthenticationFailed, NotAuthenticated) as exc:
+        detail = exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}
+        return None, _json_response(
+            detail, status.HTTP_401_UNAUTHORIZED,
+            headers={'WWW-Authenticate': authentication.authenticate_header(request)})
+    return user, None
+
+
+async def _pin_reads(*keys):
+    if await ais_pinned(*[str(key) for key in keys if key]):
+        use_primary()
+
+
+@require_safe
+async def auser_me_view(request):
+    with replica_reads():
+        user, erro = await _authenticate(request)
+        if erro:
+            return erro
+        await _pin_reads(user.matricula)
+        full_user = await aget_cached_user(user.id)
+        if full_user is None or not full_user.is_active:
+            code, detail = (
+                ("user_not_found", "User not found") if full_user is None
+                else ("user_inactive", "User is inactive"))
+            return _json_response(
+                {"detail": detail, "code": code}, status.HTTP_401_UNAUTHORIZED)
+
+        # Os grupos já vieram pré-carregados: não há consulta aqui.
+        return _json_response(user_read_serializer.from_instance(full_user))
+
+
+@require_safe
+async def auser_detail_view(request, id):
+    with replica_reads():
+        await _pin_reads(id)
+        detail = await aget_user_detail(id)
+    if detail is None:
+        return _json_response(
+            {"detail": "No User matches the given query."}, status.HTTP_404_NOT_FOUND)
+    data, etag = detail
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if _etag_matches(etag, request.headers.get('If-None-Match')):
+        return HttpResponseNotModified(headers=headers)
+    return _json_response(data, headers=headers)
+
+
+async def _astream_users(users, line):
+    async for data in user_read_serializer.aiter_queryset(users, chunk_size=BULK_LOOKUP_CHUNK_SIZE):
+        yield line(data)
+
+
+async def _astream_json_array(users):
+    yield b'['
+    separator = b''
+    async for chunk in _astream_users(users, json_bytes):
+        yield separator + chunk
+        separator = b','
+    yield b']'
+
+
+@csrf_exempt
+@require_POST
+async def ausers_by_id_view(request):
+    body, erro = _request_json(request)
+    if erro:
+        return erro
+    ids, erro = _ids_para_busca(body)
+    if erro:
+        return _json_response(erro, status.HTTP_400_BAD_REQUEST)
+
+    with replica_reads():
+        await _pin_reads(*ids)
+        users = User.objects.filter(matricula__any=ids)
+        # O streaming consulta o banco depois que a view retorna: fixa aqui o banco.
+        users = users.using(users.db)
+
+        if NDJSONRenderer.media_type in request.headers.get('Accept', ''):
+            return StreamingHttpResponse(
+                _astream_users(users, ndjson_line), content_type=NDJSONRenderer.media_type)
+        if request.GET.get('stream', '').lower() == 'true':
+            return StreamingHttpResponse(
+                _astream_json_array(users), content_type='application/json')
+
+        data = await user_read_serializer.amany(users, chunk_size=BULK_LOOKUP_CHUNK_SIZE)
+    return _json_response(data)
+
+
+@csrf_exempt
+@require_POST
+async def avalidate_users_by_matricula_view(request):
+    body, erro = _request_json(request)
+    if erro:
+        return erro
+    matriculas_solicitadas_set, erro = _matriculas_para_validar(body)
+    if erro:
+        return _json_response(erro, status.HTTP_400_BAD_REQUEST)
+    if not matriculas_solicitadas_set:
+        return _json_response(*_resultado_validacao(set(), set()))
+
+    if matricula_index.needs_refresh():
+        # A (re)construção do índice consulta o banco de forma síncrona.
+        await sync_to_async(matricula_index.ensure_fresh)()
+    matriculas_existentes_no_db, _ = matricula_index.partition(
+        matriculas_solicitadas_set, refresh=False)
+
+    return _json_response(*_resultado_validacao(matriculas_solicitadas_set, matriculas_existentes_no_db))
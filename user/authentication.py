@@ -0,0 +1,88 @@
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .claims import get_user_claims_by_id
+from .models import User
+from .revocation import token_revocation
+from .user_cache import get_cached_user
+
+
+class ClaimsUser(TokenUser):
+    """
+    Usuário leve montado a partir das claims do access token
+    (matricula, nome, campus, groups), sem consulta ao banco.
+    """
+
+    @cached_property
+    def matricula(self):
+        return self.token.get('matricula')
+
+    @cached_property
+    def nome(self):
+        return self.token.get('nome', '')
+
+    @cached_property
+    def campus(self):
+        return self.token.get('campus')
+
+    @cached_property
+    def group_names(self):
+        return list(self.token.get('groups', []))
+
+    def __str__(self):
+        return self.nome or self.matricula or super().__str__()
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    Autenticação JWT sem consulta ao banco enquanto o snapshot de claims do
+    usuário está em cache: o ``request.user`` é um ``ClaimsUser``. Tokens sem
+    as claims customizadas (emitidos antes delas existirem) caem no
+    comportamento padrão, que carrega o ``User``.
+    Tokens revogados (logout) são recusados sem consulta ao banco.
+    """
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if token_revocation.is_token_revoked(validated_token):
+            raise InvalidToken(_("Token is revoked"))
+        return validated_token
+
+    def get_user(self, validated_token):
+        if 'matricula' not in validated_token:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            return super().get_user(validated_token)
+
+        # Como no JWTAuthentication padrão, contas apagadas ou desativadas são
+        # recusadas em toda requisição; o snapshot de claims (invalidado pelos
+        # sinais do User) evita a consulta ao banco enquanto está em cache.
+        claims = get_user_claims_by_id(user_id)
+        if claims is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not claims['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return ClaimsUser(validated_token)
+
+
+def get_full_user(user):
+    """
+    Retorna o ``User`` completo do usuário autenticado, usando o LRU de
+    linhas quando ``request.user`` é um ``ClaimsUser``.
+    """
+    if isinstance(user, User):
+        return user
+    full_user = get_cached_user(user.id)
+    if full_user is None:
+        raise AuthenticationFailed(_("User not found"), code="user_not_found")
+    if not full_user.is_active:
+        raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+    return full_user
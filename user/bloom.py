@@ -0,0 +1,38 @@
+import math
+
+
+class BloomFilter:
+    def __init__(self, capacity, false_positive_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(false_positive_rate) / (math.log(2) ** 2)), 64)
+        self.hash_count = max(int(round(self.size / capacity * math.log(2))), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        # O filtro vive só na memória do processo, então o hash() nativo (já
+        # cacheado nas strings) basta; dele saem os dois hashes do double hashing.
+        h = hash(value) & 0xFFFFFFFFFFFFFFFF
+        h1 = h & 0xFFFFFFFF
+        h2 = (h >> 32) | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hash_count)]
+
+    def add(self, value):
+        bits = self._bits
+        for position in self._positions(value):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        # Mesmo cálculo de _positions, mas sem montar a lista: a maioria dos
+        # valores ausentes é descartada já no primeiro bit.
+        h = hash(value) & 0xFFFFFFFFFFFFFFFF
+        position = h & 0xFFFFFFFF
+        step = (h >> 32) | 1
+        size = self.size
+        bits = self._bits
+        for _ in range(self.hash_count):
+            position %= size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+            position += step
+        return True
@@ -0,0 +1,59 @@
+"""
+Log de mudanças compartilhado entre os processos pelo cache.
+
+Um contador de geração e uma entrada por mudança (``{prefixo}:log:{geração}``).
+Quem muda algo sobe o contador e grava a entrada; os demais processos leem,
+a cada sincronização, as entradas entre a última geração vista e o contador.
+É o que mantém os Bloom filters de tokens revogados (user/revocation.py) e o
+índice de matrículas (user/matricula_index.py) iguais em todos os workers.
+"""
+
+LOG_READ_CHUNK = 1000
+# O contador sobe antes de a entrada ser gravada: entradas recentes ausentes
+# são lidas de novo na próxima sincronização em vez de ignoradas.
+RECENT_LOG_ENTRIES = 32
+
+
+class ChangeLog:
+    def __init__(self, cache, prefix):
+        self.cache = cache
+        self.generation_key = f"{prefix}:generation"
+        self._entry_key = f"{prefix}:log:{{generation}}"
+
+    def entry_key(self, generation):
+        return self._entry_key.format(generation=generation)
+
+    def append(self, entry, timeout):
+        """Grava ``entry`` no log e retorna a geração dela."""
+        self.cache.add(self.generation_key, 0, None)
+        generation = self.cache.incr(self.generation_key)
+        self.cache.set(self.entry_key(generation), entry, timeout)
+        return generation
+
+    def last_generation(self):
+        return self.cache.get(self.generation_key) or 0
+
+    def read(self, first, last):
+        """``[(geração, entrada ou None), ...]`` de ``first`` a ``last``."""
+        keys = [self.entry_key(generation) for generation in range(first, last + 1)]
+        entries = self.cache.get_many(keys)
+        return [(generation, entries.get(key)) for generation, key in zip(range(first, last + 1), keys)]
+
+    def read_forward(self, position, last):
+        """
+        Entradas depois da geração ``position`` até ``last``. Retorna
+        ``(entradas, nova posição, completo)``: uma entrada recente ausente
+        encerra a leitura antes dela (para ser lida de novo) e uma antiga
+        ausente, já expirada, deixa ``completo`` falso.
+        """
+        entries = []
+        complete = True
+        for start in range(position + 1, last + 1, LOG_READ_CHUNK):
+            for generation, entry in self.read(start, min(start + LOG_READ_CHUNK - 1, last)):
+                if entry is not None:
+                    entries.append(entry)
+                elif last - generation < RECENT_LOG_ENTRIES:
+                    return entries, generation - 1, complete
+                else:
+                    complete = False
+        return entries, max(last, position), complete
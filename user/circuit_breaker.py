@@ -0,0 +1,110 @@
+"""
+Circuit breaker com janela deslizante de erros e de lentidão.
+
+Fechado, registra o resultado e a duração de cada chamada dos últimos
+``window_seconds``. Com pelo menos ``min_calls`` chamadas na janela, abre
+quando a fração de erros passa de ``error_rate`` ou a de chamadas mais lentas
+que ``slow_call_seconds`` passa de ``slow_call_rate``. Aberto, recusa as
+chamadas na hora por ``open_seconds``; depois deixa passar uma chamada de
+teste por vez (meio aberto), que fecha o circuito se der certo ou o reabre.
+
+O estado é por processo: cada worker decide sozinho, sem ida à rede.
+"""
+import threading
+import time
+from collections import deque
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    def __init__(self, name, window_seconds=30.0, min_calls=10, error_rate=0.5,
+                 slow_call_seconds=5.0, slow_call_rate=0.5, open_seconds=30.0,
+                 clock=time.monotonic, on_state_change=None):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.clock = clock
+        self.on_state_change = on_state_change
+        self.state = CLOSED
+        self._calls = deque()
+        self._errors = 0
+        self._slow = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Diz se a chamada pode ir ao serviço; se sim, ela deve terminar em ``record``."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if self.clock() - self._opened_at < self.open_seconds:
+                    return False
+                self._set_state(HALF_OPEN)
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def record(self, success, duration):
+        now = self.clock()
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if success and not slow:
+                    self._reset_window()
+                    self._set_state(CLOSED)
+                else:
+                    self._open(now)
+                return
+            if self.state == OPEN:
+                return
+
+            self._calls.append((now, success, slow))
+            self._errors += not success
+            self._slow += slow
+            self._expire(now)
+            calls = len(self._calls)
+            if calls >= self.min_calls and (
+                    self._errors / calls >= self.error_rate
+                    or self._slow / calls >= self.slow_call_rate):
+                self._open(now)
+
+    def cancel(self):
+        """Encerra sem resultado uma chamada liberada por ``allow`` (ex.: cancelada)."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probing = False
+
+    def _expire(self, now):
+        limit = now - self.window_seconds
+        calls = self._calls
+        while calls and calls[0][0] < limit:
+            _, success, slow = calls.popleft()
+            self._errors -= not success
+            self._slow -= slow
+
+    def _reset_window(self):
+        self._calls.clear()
+        self._errors = 0
+        self._slow = 0
+
+    def _open(self, now):
+        self._opened_at = now
+        self._reset_window()
+        self._set_state(OPEN)
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.state = state
+            if self.on_state_change is not None:
+                self.on_state_change(self, state)
@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+from auth_service.db_router import replica_reads
+
+from .user_cache import user_rows
+
+TOKEN_ISSUER = 'ifsports-recomeco'
+
+CLAIMS_CACHE_KEY = "user:claims:{user_id}"
+
+
+if not settings.DEBUG and isinstance(caches['default'], LocMemCache):
+    print("AVISO: Sem REDIS_URL, o snapshot de claims fica na memória de cada processo: "
+          "com mais de um worker, uma conta desativada ou uma mudança de grupo pode levar "
+          f"até {getattr(settings, 'USER_CLAIMS_CACHE_TIMEOUT', 300)}s para valer nos demais.")
+
+
+def _cache_key(user_id):
+    return CLAIMS_CACHE_KEY.format(user_id=user_id)
+
+
+def _cache_timeout():
+    return getattr(settings, "USER_CLAIMS_CACHE_TIMEOUT", 300)
+
+
+def build_user_claims(user):
+    return {
+        'matricula': user.matricula,
+        'nome': user.nome,
+        'campus': user.campus,
+        'groups': [group.name for group in user.groups.all()],
+        'is_active': user.is_active,
+        'is_staff': user.is_staff,
+    }
+
+
+def get_user_claims(user):
+    """
+    Retorna o snapshot de claims do usuário, consultando o banco apenas
+    quando não há snapshot em cache.
+    """
+    claims = cache.get(_cache_key(user.pk))
+    if claims is None:
+        claims = build_user_claims(user)
+        cache.set(_cache_key(user.pk), claims, _cache_timeout())
+    return claims
+
+
+def get_user_claims_by_id(user_id):
+    """
+    Snapshot de claims pelo id (refresh e autenticação de cada requisição),
+    ou ``None`` se o usuário não existe.
+    """
+    claims = cache.get(_cache_key(user_id))
+    if claims is None:
+        from .models import User
+
+        # O snapshot vale para todos os workers: é lido do primário, nunca de
+        # uma réplica atrasada (ex.: logo depois de desativar a conta).
+        with replica_reads(enabled=False):
+            user = User.objects.prefetch_related('groups').filter(pk=user_id).first()
+        if user is None:
+            return None
+        # A linha recém-lida também serve ao LRU (ex.: /users/me/ em seguida).
+        user_rows.set(user.pk, user)
+        claims = build_user_claims(user)
+        cache.set(_cache_key(user_id), claims, _cache_timeout())
+    return claims
+
+
+def invalidate_user_claims(*user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+def apply_claims(token, claims):
+    token['matricula'] = claims['matricula']
+    token['nome'] = claims['nome']
+    token['campus'] = claims['campus']
+    token['groups'] = claims['groups']
+    token['iss'] = TOKEN_ISSUER
+    return token
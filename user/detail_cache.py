@@ -0,0 +1,59 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .renderers import json_bytes
+
+DETAIL_CACHE_KEY = "user:detail:{matricula}"
+
+
+def _cache_key(matricula):
+    return DETAIL_CACHE_KEY.format(matricula=matricula)
+
+
+def _cache_timeout():
+    return getattr(settings, "USER_DETAIL_CACHE_TIMEOUT", 300)
+
+
+def compute_etag(data):
+    """ETag forte: hash do JSON exatamente como é enviado ao cliente."""
+    return '"%s"' % hashlib.blake2b(json_bytes(data), digest_size=16).hexdigest()
+
+
+def get_user_detail(matricula):
+    """
+    Retorna ``(dados, etag)`` do usuário com a matrícula informada, ou
+    ``None`` se ele não existe. Os dados serializados ficam em cache até a
+    próxima alteração do usuário ou dos seus grupos.
+    """
+    from .models import User
+    from .serializers import user_read_serializer
+
+    entry = cache.get(_cache_key(matricula))
+    if entry is None:
+        data = user_read_serializer.one(User.objects.filter(matricula=matricula))
+        if data is None:
+            return None
+        entry = (data, compute_etag(data))
+        cache.set(_cache_key(matricula), entry, _cache_timeout())
+    return entry
+
+
+async def aget_user_detail(matricula):
+    """Versão assíncrona de ``get_user_detail``."""
+    from .models import User
+    from .serializers import user_read_serializer
+
+    entry = await cache.aget(_cache_key(matricula))
+    if entry is None:
+        data = await user_read_serializer.aone(User.objects.filter(matricula=matricula))
+        if data is None:
+            return None
+        entry = (data, compute_etag(data))
+        await cache.aset(_cache_key(matricula), entry, _cache_timeout())
+    return entry
+
+
+def invalidate_user_detail(*matriculas):
+    cache.delete_many([_cache_key(matricula) for matricula in matriculas])
@@ -0,0 +1,38 @@
+from django.db.models import CharField, Field, Func, Lookup
+
+
+@CharField.register_lookup
+class AnyLookup(Lookup):
+    """
+    ``matricula__any=[...]``: no PostgreSQL vira ``matricula = ANY(%s)`` com a
+    lista inteira enviada como um único parâmetro de array, em vez de um
+    ``IN (%s, %s, ...)`` com um placeholder por valor. Nos demais bancos cai
+    no ``IN`` comum.
+    """
+    lookup_name = 'any'
+    prepare_rhs = False
+
+    def get_db_prep_lookup(self, value, connection):
+        return '%s', [[str(item) for item in value]]
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        values = [str(item) for item in self.rhs]
+        if not values:
+            return '1 = 0', []
+        placeholders = ', '.join(['%s'] * len(values))
+        return f'{lhs} IN ({placeholders})', [*lhs_params, *values]
+
+    def as_postgresql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} = ANY({rhs}::text[])', [*lhs_params, *rhs_params]
+
+
+class Row(Func):
+    """
+    Construtor de linha ``(a, b, ...)`` para comparações de tuplas, ex.:
+    ``GreaterThan(Row(F('campus'), F('id')), Row(Value(campus), Value(id)))``.
+    """
+    function = ''
+    output_field = Field()
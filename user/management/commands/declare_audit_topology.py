@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from celery_app import celery_app, declare_audit_topology
+
+
+class Command(BaseCommand):
+    help = "Declara a exchange 'events_exchange' e a fila 'audit_queue' no broker de auditoria."
+
+    def handle(self, *args, **options):
+        try:
+            with celery_app.connection_for_write() as conn:
+                conn.ensure_connection(max_retries=3)
+                declare_audit_topology(conn)
+        except Exception as e:
+            raise CommandError(
+                f"Não foi possível declarar a topologia de auditoria: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            "Exchange 'events_exchange' e fila 'audit_queue' declaradas com sucesso."))
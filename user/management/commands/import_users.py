@@ -0,0 +1,253 @@
+import csv
+import io
+import json
+import sys
+import time
+from itertools import islice
+
+from django.contrib.auth.models import Group
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from user.claims import invalidate_user_claims
+from user.detail_cache import invalidate_user_detail
+from user.matricula_index import matricula_index
+from user.models import User
+from user.user_cache import user_rows
+
+# Colunas aceitas no arquivo (as mesmas que o login pelo SUAP preenche)
+ROSTER_FIELDS = (
+    'matricula', 'email', 'nome', 'campus', 'foto', 'sexo',
+    'tipo_usuario', 'curso', 'situacao', 'data_nascimento',
+)
+REQUIRED_FIELDS = ('matricula', 'email', 'nome')
+STAGING_TABLE = 'import_users_staging'
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa (ou atualiza) usuários em massa a partir de um arquivo CSV ou JSONL '
+        'exportado do SUAP, em lotes, e atribui o grupo padrão a quem ainda não tem grupo. '
+        'Colunas ausentes ou vazias mantêm o valor atual dos usuários existentes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Arquivo .csv ou .jsonl ('-' para ler da entrada padrão).")
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Formato do arquivo (padrão: deduzido pela extensão).')
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Usuários gravados por lote (padrão: 5000).')
+        parser.add_argument('--group', default='Jogador',
+                            help="Grupo atribuído a quem ainda não tem grupo (padrão: 'Jogador').")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+        chunk_size = max(options['chunk_size'], 1)
+
+        try:
+            group = Group.objects.get(name=options['group'])
+        except Group.DoesNotExist:
+            raise CommandError(f"O grupo '{options['group']}' não foi encontrado.")
+
+        self.total = self.skipped = self.groups_added = 0
+        self._staging_ready = False
+        start = time.perf_counter()
+        try:
+            roster = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        except OSError as e:
+            raise CommandError(f"Não foi possível abrir '{path}': {e}")
+        with roster:
+            records = self._read_csv(roster) if file_format == 'csv' else self._read_jsonl(roster)
+            rows = (values for values in map(self._build_user, records) if values is not None)
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                self._import_chunk(chunk, group)
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'{self.total} usuários importados...')
+
+        elapsed = time.perf_counter() - start
+        rate = self.total / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'{self.total} usuários importados em {elapsed:.1f}s ({rate:,.0f} linhas/s); '
+            f'{self.groups_added} receberam o grupo {group.name}; {self.skipped} linha(s) ignorada(s).'))
+
+    def _read_csv(self, roster):
+        yield from csv.DictReader(roster)
+
+    def _read_jsonl(self, roster):
+        for number, line in enumerate(roster, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                self._skip(f'linha {number}: JSON inválido ({e})')
+
+    def _skip(self, reason):
+        self.skipped += 1
+        self.stderr.write(self.style.WARNING(f'AVISO: Linha ignorada, {reason}.'))
+
+    def _build_user(self, record):
+        if not isinstance(record, dict):
+            self._skip(f'esperado um objeto, recebido {type(record).__name__}')
+            return None
+        values = {}
+        for name in ROSTER_FIELDS:
+            value = record.get(name)
+            if isinstance(value, str):
+                value = value.strip()
+            # Células vazias e colunas ausentes viram NULL: o usuário novo fica
+            # sem o campo e o existente mantém o valor atual (ex.: vindo do SUAP).
+            values[name] = value if value not in ('', None) else None
+
+        missing = [name for name in REQUIRED_FIELDS if not values[name]]
+        if missing:
+            self._skip(f"matrícula '{values['matricula']}': faltando {', '.join(missing)}")
+            return None
+        try:
+            values['data_nascimento'] = User._meta.get_field(
+                'data_nascimento').to_python(values['data_nascimento'])
+        except ValidationError:
+            self._skip(f"matrícula '{values['matricula']}': data de nascimento inválida")
+            return None
+
+        values['matricula'] = str(values['matricula'])
+        values['email'] = User.objects.normalize_email(values['email'])
+        # Um valor longo demais derrubaria o lote inteiro no banco.
+        too_long = [
+            name for name in ROSTER_FIELDS
+            if isinstance(values[name], str)
+            and len(values[name]) > User._meta.get_field(name).max_length
+        ]
+        if too_long:
+            self._skip(f"matrícula '{values['matricula']}': muito longo(s): {', '.join(too_long)}")
+            return None
+        return values
+
+    def _import_chunk(self, chunk, group):
+        # Uma matrícula repetida no mesmo lote quebraria o ON CONFLICT; fica a última.
+        rows = list({values['matricula']: values for values in chunk}.values())
+
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                user_ids, groups_added = self._copy_chunk(rows, group)
+            else:
+                user_ids, groups_added = self._bulk_create_chunk(rows, group)
+
+        # Nenhum dos caminhos dispara sinais: invalida aqui os caches por usuário
+        # e publica as matrículas para o índice dos workers.
+        invalidate_user_claims(*user_ids)
+        user_rows.invalidate(*user_ids)
+        invalidate_user_detail(*(values['matricula'] for values in rows))
+        matricula_index.record_added(*(values['matricula'] for values in rows))
+
+        self.total += len(rows)
+        self.groups_added += groups_added
+
+    def _copy_chunk(self, rows, group):
+        """
+        PostgreSQL: ``COPY`` do lote para uma tabela temporária e, dela, um
+        único ``INSERT ... ON CONFLICT DO UPDATE`` na tabela de usuários e um
+        ``INSERT ... SELECT`` na tabela de grupos. Os valores nulos do lote não
+        sobrescrevem os atuais. Funciona com o psycopg2 e com o psycopg 3.
+        """
+        from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+        opts = User._meta
+        quote = connection.ops.quote_name
+        table = quote(opts.db_table)
+        columns = [quote(opts.get_field(name).column) for name in ROSTER_FIELDS]
+        updates = ', '.join(
+            f'{column} = COALESCE(EXCLUDED.{column}, {table}.{column})' for column in columns
+            if column != quote(opts.get_field('matricula').column))
+        through_opts = User.groups.through._meta
+        through_table = quote(through_opts.db_table)
+        through_user = quote(through_opts.get_field('user').column)
+        through_group = quote(through_opts.get_field('group').column)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for values in rows:
+            writer.writerow([values[name] for name in ROSTER_FIELDS])
+        buffer.seek(0)
+
+        with connection.cursor() as cursor:
+            if not self._staging_ready:
+                # A tabela temporária dura a conexão, que pode já ter rodado o comando.
+                cursor.execute(
+                    f"CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} AS "
+                    f"SELECT {', '.join(columns)} FROM {table} WITH NO DATA")
+                self._staging_ready = True
+            cursor.execute(f'TRUNCATE {STAGING_TABLE}')
+            # No CSV do COPY, campo vazio sem aspas é NULL.
+            copy_sql = f"COPY {STAGING_TABLE} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+            if is_psycopg3:
+                with cursor.copy(copy_sql) as copy:
+                    copy.write(buffer.getvalue())
+            else:
+                cursor.copy_expert(copy_sql, buffer)
+            # Perfil sem impressão digital: o próximo login pelo SUAP reescreve a linha.
+            cursor.execute(f"""
+                INSERT INTO {table} ({', '.join(columns)}, password, is_superuser,
+                                     is_active, is_staff, suap_fingerprint)
+                SELECT {', '.join(columns)}, '', false, true, false, ''
+                FROM {STAGING_TABLE}
+                ON CONFLICT ({quote(opts.get_field('matricula').column)}) DO UPDATE SET
+                    {updates}, suap_fingerprint = ''
+                RETURNING id
+            """)
+            user_ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute(f"""
+                INSERT INTO {through_table} ({through_user}, {through_group})
+                SELECT novo.id, %s FROM unnest(%s::bigint[]) AS novo(id)
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM {through_table} atual WHERE atual.{through_user} = novo.id
+                )
+                ON CONFLICT DO NOTHING
+            """, [group.pk, user_ids])
+            groups_added = cursor.rowcount
+        return user_ids, groups_added
+
+    def _bulk_create_chunk(self, rows, group):
+        # O upsert do bulk_create sobrescreve todas as colunas de update_fields:
+        # os valores nulos do lote são preenchidos antes com os atuais.
+        current = {
+            values['matricula']: values for values in User.objects.filter(
+                matricula__any=[values['matricula'] for values in rows]).values(*ROSTER_FIELDS)
+        }
+        for values in rows:
+            existing = current.get(values['matricula'], {})
+            for name, value in values.items():
+                if value is None:
+                    values[name] = existing.get(name)
+
+        users = [User(password='', suap_fingerprint='', **values) for values in rows]
+        User.objects.bulk_create(
+            users,
+            update_conflicts=True,
+            unique_fields=['matricula'],
+            update_fields=[*(name for name in ROSTER_FIELDS if name != 'matricula'),
+                           'suap_fingerprint'],
+        )
+        if any(user.pk is None for user in users):
+            # Bancos sem RETURNING no upsert: busca os ids pela matrícula.
+            ids = dict(User.objects.filter(
+                matricula__any=[user.matricula for user in users]
+            ).values_list('matricula', 'id'))
+            for user in users:
+                user.pk = ids[user.matricula]
+
+        through = User.groups.through
+        user_ids = [user.pk for user in users]
+        with_group = set(through.objects.filter(
+            user_id__in=user_ids).values_list('user_id', flat=True).distinct())
+        new_memberships = [
+            through(user_id=user_id, group_id=group.pk)
+            for user_id in user_ids if user_id not in with_group
+        ]
+        through.objects.bulk_create(new_memberships, ignore_conflicts=True)
+        return user_ids, len(new_memberships)
@@ -0,0 +1,173 @@
+"""
+Índice em memória (por processo) das matrículas existentes: um Bloom filter
+na frente de uma lista ordenada, usado na validação de matrículas.
+
+É montado com uma única varredura ``values_list`` na primeira consulta e
+reconstruído depois de ``MATRICULA_INDEX_TTL`` segundos. Entre uma montagem
+e outra, quem cria, renomeia ou apaga um usuário atualiza o índice do próprio
+processo e publica a mudança num log no cache (ver user/change_log.py), lido
+pelos demais workers a cada ``MATRICULA_INDEX_SYNC_INTERVAL`` segundos. Se o
+log tiver perdido entradas (cache esvaziado ou worker parado por muito
+tempo), o índice é reconstruído.
+"""
+import bisect
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from auth_service.db_router import replica_reads
+
+from .bloom import BloomFilter
+from .change_log import ChangeLog
+
+index_log = ChangeLog(cache, "user:matricula")
+
+
+class MatriculaIndex:
+    def __init__(self, ttl=300, false_positive_rate=0.01, sync_interval=1.0):
+        self.ttl = ttl
+        self.false_positive_rate = false_positive_rate
+        self.sync_interval = sync_interval
+        self._sorted = []
+        self._bloom = BloomFilter(0, false_positive_rate)
+        self._built_at = None
+        self._generation = 0
+        self._next_sync = 0.0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def is_stale(self):
+        return self._built_at is None or time.monotonic() - self._built_at > self.ttl
+
+    def needs_refresh(self):
+        return self.is_stale() or time.monotonic() >= self._next_sync
+
+    def build(self):
+        from .models import User
+
+        # Lida antes da varredura: mudanças feitas durante ela são reaplicadas.
+        generation = index_log.last_generation()
+        # No primário: uma réplica atrasada perderia mudanças anteriores à geração.
+        with replica_reads(enabled=False):
+            matriculas = list(
+                User.objects.order_by('matricula').values_list('matricula', flat=True))
+        # Folga para as matrículas adicionadas até a próxima reconstrução
+        bloom = BloomFilter(int(len(matriculas) * 1.2) + 1024, self.false_positive_rate)
+        for matricula in matriculas:
+            bloom.add(matricula)
+        with self._lock:
+            self._sorted = matriculas
+            self._bloom = bloom
+            self._generation = generation
+            self._built_at = time.monotonic()
+            self._next_sync = self._built_at + self.sync_interval
+
+    def ensure_fresh(self):
+        if self._built_at is None:
+            # Primeira montagem: as demais requisições esperam por ela.
+            with self._refresh_lock:
+                if self._built_at is None:
+                    self.build()
+            return
+        if not self.needs_refresh() or not self._refresh_lock.acquire(blocking=False):
+            # Só uma thread atualiza o índice; as outras seguem com a versão atual.
+            return
+        try:
+            self._next_sync = time.monotonic() + self.sync_interval
+            if self.is_stale():
+                self.build()
+            else:
+                self._sync()
+        finally:
+            self._refresh_lock.release()
+
+    def _sync(self):
+        try:
+            last = index_log.last_generation()
+            if last == self._generation:
+                return
+            if last > self._generation:
+                entries, generation, complete = index_log.read_forward(self._generation, last)
+        except Exception as e:
+            print(f"AVISO: Falha ao sincronizar o índice de matrículas: {e}")
+            return
+        if last < self._generation or not complete:
+            # O contador voltou (cache esvaziado) ou faltam entradas já expiradas.
+            self.build()
+            return
+        for action, matriculas in entries:
+            if action == 'add':
+                self.add(*matriculas)
+            else:
+                self.discard(*matriculas)
+        self._generation = generation
+
+    def _publish(self, action, matriculas):
+        try:
+            index_log.append((action, matriculas), self.ttl * 2)
+        except Exception as e:
+            print(f"AVISO: Falha ao publicar mudança no índice de matrículas: {e}")
+
+    def record_added(self, *matriculas):
+        """Adiciona ao índice deste processo e publica para os demais workers."""
+        self.add(*matriculas)
+        self._publish('add', matriculas)
+
+    def record_removed(self, *matriculas):
+        self.discard(*matriculas)
+        self._publish('discard', matriculas)
+
+    def add(self, *matriculas):
+        with self._lock:
+            if self._built_at is None:
+                return
+            for matricula in matriculas:
+                self._bloom.add(matricula)
+                position = bisect.bisect_left(self._sorted, matricula)
+                if position == len(self._sorted) or self._sorted[position] != matricula:
+                    self._sorted.insert(position, matricula)
+
+    def discard(self, *matriculas):
+        # O Bloom filter não suporta remoção; basta tirar da lista ordenada.
+        with self._lock:
+            for matricula in matriculas:
+                position = bisect.bisect_left(self._sorted, matricula)
+                if position < len(self._sorted) and self._sorted[position] == matricula:
+                    del self._sorted[position]
+
+    def __contains__(self, matricula):
+        if matricula not in self._bloom:
+            return False
+        sorted_matriculas = self._sorted
+        position = bisect.bisect_left(sorted_matriculas, matricula)
+        return position < len(sorted_matriculas) and sorted_matriculas[position] == matricula
+
+    def partition(self, matriculas, refresh=True):
+        """
+        Separa ``matriculas`` em ``(encontradas, ausentes)`` segundo o índice.
+        Com ``refresh=False`` não atualiza o índice antes (o chamador assíncrono
+        já chamou ``ensure_fresh``).
+        """
+        if refresh:
+            self.ensure_fresh()
+        found = set()
+        missing = set()
+        bloom = self._bloom
+        sorted_matriculas = self._sorted
+        bisect_left = bisect.bisect_left
+        for matricula in matriculas:
+            if matricula in bloom:
+                position = bisect_left(sorted_matriculas, matricula)
+                if position < len(sorted_matriculas) and sorted_matriculas[position] == matricula:
+                    found.add(matricula)
+                    continue
+            missing.add(matricula)
+        return found, missing
+
+
+matricula_index = MatriculaIndex(
+    ttl=getattr(settings, "MATRICULA_INDEX_TTL", 300),
+    sync_interval=getattr(settings, "MATRICULA_INDEX_SYNC_INTERVAL", 1.0),
+)
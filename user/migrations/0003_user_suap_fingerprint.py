@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0002_alter_user_campus_alter_user_curso_alter_user_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='suap_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-18 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('user', '0003_user_suap_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['campus', 'id'], name='user_campus_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['tipo_usuario', 'campus', 'id'], name='user_tipo_campus_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['curso', 'campus', 'id'], name='user_curso_campus_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['situacao', 'campus', 'id'], name='user_situacao_campus_id_idx'),
+        ),
+    ]
@@ -1,5 +1,17 @@
+import hashlib
+import json
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import signals
+
+
+def suap_profile_fingerprint(user_defaults):
+    # Impressão digital estável dos dados vindos do SUAP, usada para pular a
+    # escrita quando o perfil não mudou desde o último login.
+    canonical = json.dumps(user_defaults, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
 
 
 class CustomUserManager(BaseUserManager):
@@ -30,6 +42,144 @@ class CustomUserManager(BaseUserManager):
 
         return self.create_user(matricula, email, password, nome=nome, **extra_fields)
 
+    def upsert_from_suap(self, matricula, user_defaults, default_group='Jogador'):
+        """
+        Cria ou atualiza o usuário de um login SUAP e garante o grupo padrão.
+
+        No PostgreSQL tudo acontece em um único ``INSERT ... ON CONFLICT``: a
+        linha só é reescrita quando a impressão digital do perfil mudou e o
+        grupo padrão é inserido na mesma instrução para quem ainda não tem grupo.
+        Retorna ``(user, created)``.
+        """
+        fingerprint = suap_profile_fingerprint(user_defaults)
+        connection = connections[self.db]
+        if connection.vendor == 'postgresql':
+            return self._upsert_from_suap_postgresql(
+                connection, matricula, user_defaults, fingerprint, default_group)
+        return self._upsert_from_suap_orm(
+            matricula, user_defaults, fingerprint, default_group)
+
+    async def aupsert_from_suap(self, matricula, user_defaults, default_group='Jogador'):
+        return await sync_to_async(self.upsert_from_suap)(
+            matricula, user_defaults, default_group)
+
+    def _suap_upsert_statement(self, connection, matricula, user_defaults, fingerprint, default_group):
+        """SQL e parâmetros do ``INSERT ... ON CONFLICT`` de ``upsert_from_suap``."""
+        from django.contrib.auth.models import Group
+
+        opts = self.model._meta
+        values = {
+            'matricula': matricula,
+            'password': '',
+            'is_superuser': False,
+            'is_active': True,
+            'is_staff': False,
+            'suap_fingerprint': fingerprint,
+            **user_defaults,
+        }
+        fields = [opts.get_field(name) for name in values]
+        columns = [connection.ops.quote_name(field.column) for field in fields]
+        params = [
+            field.get_db_prep_save(values[field.name], connection) for field in fields
+        ]
+        updated_columns = [
+            connection.ops.quote_name(opts.get_field(name).column)
+            for name in [*user_defaults, 'suap_fingerprint']
+        ]
+
+        table = connection.ops.quote_name(opts.db_table)
+        through_opts = self.model.groups.through._meta
+        through_table = connection.ops.quote_name(through_opts.db_table)
+        through_user = connection.ops.quote_name(
+            through_opts.get_field('user').column)
+        through_group = connection.ops.quote_name(
+            through_opts.get_field('group').column)
+        group_table = connection.ops.quote_name(Group._meta.db_table)
+        matricula_column = connection.ops.quote_name(
+            opts.get_field('matricula').column)
+        fingerprint_column = connection.ops.quote_name(
+            opts.get_field('suap_fingerprint').column)
+
+        sql = f"""
+            WITH upserted AS (
+                INSERT INTO {table} ({', '.join(columns)})
+                VALUES ({', '.join(['%s'] * len(columns))})
+                ON CONFLICT ({matricula_column}) DO UPDATE SET
+                    {', '.join(f'{column} = EXCLUDED.{column}' for column in updated_columns)}
+                WHERE {table}.{fingerprint_column} IS DISTINCT FROM EXCLUDED.{fingerprint_column}
+                RETURNING {table}.*, (xmax = 0) AS created, true AS written
+            ), target AS (
+                SELECT * FROM upserted
+                UNION ALL
+                SELECT existing.*, false AS created, false AS written FROM {table} existing
+                WHERE existing.{matricula_column} = %s
+                  AND NOT EXISTS (SELECT 1 FROM upserted)
+            ), default_group AS (
+                INSERT INTO {through_table} ({through_user}, {through_group})
+                SELECT target.id, grupo.id FROM target, {group_table} grupo
+                WHERE grupo.name = %s
+                  AND NOT EXISTS (
+                      SELECT 1 FROM {through_table} atual
+                      WHERE atual.{through_user} = target.id
+                  )
+                ON CONFLICT DO NOTHING
+                RETURNING {through_group}
+            )
+            SELECT target.*, (SELECT max({through_group}) FROM default_group) AS added_group_id
+            FROM target
+        """
+        return sql, [*params, matricula, default_group]
+
+    def _upsert_from_suap_postgresql(self, connection, matricula, user_defaults, fingerprint, default_group):
+        from django.contrib.auth.models import Group
+
+        sql, params = self._suap_upsert_statement(
+            connection, matricula, user_defaults, fingerprint, default_group)
+        rows = list(self.raw(sql, params))
+        if not rows:
+            # Primeiro login simultâneo: a linha inserida por outra transação
+            # faz o ON CONFLICT descartá-la (perfil igual), mas não é visível
+            # no snapshot desta instrução. O caminho do ORM já a enxerga.
+            return self._upsert_from_suap_orm(
+                matricula, user_defaults, fingerprint, default_group)
+        user = rows[0]
+
+        # O SQL cru não dispara os sinais do ORM; eles são enviados aqui para
+        # que os caches que dependem deles (ex.: claims do token) sejam invalidados.
+        if user.written:
+            signals.post_save.send(
+                sender=self.model, instance=user, created=user.created,
+                update_fields=None, raw=False, using=self.db)
+        if user.added_group_id is not None:
+            signals.m2m_changed.send(
+                sender=self.model.groups.through, instance=user, action='post_add',
+                reverse=False, model=Group, pk_set={user.added_group_id}, using=self.db)
+        return user, user.created
+
+    def _upsert_from_suap_orm(self, matricula, user_defaults, fingerprint, default_group):
+        from django.contrib.auth.models import Group
+
+        with transaction.atomic(using=self.db):
+            user = self.select_for_update().filter(matricula=matricula).first()
+            created = user is None
+            if created:
+                user = self.create(
+                    matricula=matricula, suap_fingerprint=fingerprint, **user_defaults)
+            elif user.suap_fingerprint != fingerprint:
+                for field, value in user_defaults.items():
+                    setattr(user, field, value)
+                user.suap_fingerprint = fingerprint
+                user.save(using=self.db, update_fields=[
+                          *user_defaults, 'suap_fingerprint'])
+
+            if created or not user.groups.exists():
+                try:
+                    user.groups.add(Group.objects.get(name=default_group))
+                except Group.DoesNotExist:
+                    print(f"AVISO: O grupo '{default_group}' não foi encontrado.")
+
+        return user, created
+
 
 class User(AbstractBaseUser, PermissionsMixin):
     matricula = models.CharField(max_length=50, unique=True)
@@ -46,10 +196,24 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
 
+    # Hash do último perfil recebido do SUAP (ver CustomUserManager.upsert_from_suap)
+    suap_fingerprint = models.CharField(max_length=64, blank=True, default='')
+
     USERNAME_FIELD = 'matricula'
     REQUIRED_FIELDS = ['email', 'nome']
 
     objects = CustomUserManager()
 
+    class Meta:
+        # Listagem paginada por (campus, id): os filtros por igualdade vêm
+        # antes, para que "filtro = x AND (campus, id) > (...)" seja um único
+        # intervalo do índice.
+        indexes = [
+            models.Index(fields=['campus', 'id'], name='user_campus_id_idx'),
+            models.Index(fields=['tipo_usuario', 'campus', 'id'], name='user_tipo_campus_id_idx'),
+            models.Index(fields=['curso', 'campus', 'id'], name='user_curso_campus_id_idx'),
+            models.Index(fields=['situacao', 'campus', 'id'], name='user_situacao_campus_id_idx'),
+        ]
+
     def __str__(self):
         return self.nome if self.nome else self.matricula
@@ -0,0 +1,107 @@
+import base64
+import json
+
+from django.db.models import F, Value
+from django.db.models.lookups import GreaterThan
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .lookups import Row
+from .serializers import user_read_serializer
+
+
+class CampusKeysetPagination(BasePagination):
+    """
+    Paginação por cursor (keyset) na ordem ``(campus, id)``.
+
+    O cursor guarda o ``(campus, id)`` do último usuário da página e a
+    próxima página começa com ``WHERE (campus, id) > (...)``, que o índice
+    ``(campus, id)`` resolve sem percorrer as páginas anteriores (ao
+    contrário do ``OFFSET``). Usuários sem campus vêm por último, ordenados
+    por ``id``.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 100
+    max_page_size = 1000
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        after = self.decode_cursor(request)
+
+        if after is None:
+            rows = self._fetch(queryset.order_by(F('campus').asc(nulls_last=True), 'id'), page_size)
+        elif after[0] is not None:
+            campus, last_id = after
+            rows = self._fetch(
+                queryset.filter(GreaterThan(
+                    Row(F('campus'), F('id')), Row(Value(campus), Value(last_id))
+                )).order_by('campus', 'id'),
+                page_size)
+            if len(rows) <= page_size:
+                # Acabaram os campi: continua pelos usuários sem campus.
+                rows += self._fetch(
+                    queryset.filter(campus__isnull=True).order_by('id'), page_size - len(rows))
+        else:
+            rows = self._fetch(
+                queryset.filter(campus__isnull=True, id__gt=after[1]).order_by('id'), page_size)
+
+        self.has_next = len(rows) > page_size
+        self.page = rows[:page_size]
+        return self.page
+
+    def _fetch(self, queryset, page_size):
+        # Um registro a mais indica se existe próxima página.
+        return user_read_serializer.many(queryset[:page_size + 1])
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            campus, last_id = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+        except (TypeError, ValueError, UnicodeError):
+            raise ParseError(self.invalid_cursor_message)
+        # Cursor adulterado: só valores que o banco aceita (sem NUL no texto e
+        # id dentro de um bigint), senão a consulta falharia com erro 500.
+        if campus is not None and (not isinstance(campus, str) or '\x00' in campus):
+            raise ParseError(self.invalid_cursor_message)
+        if type(last_id) is not int or not -2 ** 63 <= last_id < 2 ** 63:
+            raise ParseError(self.invalid_cursor_message)
+        return campus, last_id
+
+    def encode_cursor(self, user):
+        raw = json.dumps([user['campus'], user['id']], ensure_ascii=False)
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
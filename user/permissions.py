@@ -0,0 +1,23 @@
+from rest_framework.permissions import BasePermission
+
+from .claims import get_user_claims_by_id
+
+ORGANIZER_GROUP = 'Organizador'
+
+
+class IsOrganizerOrStaff(BasePermission):
+    """
+    Só organizadores e a equipe (``is_staff``). Os grupos vêm do snapshot de
+    claims, invalidado a cada mudança de grupo, e não das claims do token,
+    que continuariam valendo até ele expirar.
+    """
+    message = "Apenas organizadores podem acessar este recurso."
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not (user and user.is_authenticated):
+            return False
+        claims = get_user_claims_by_id(user.id)
+        if claims is None:
+            return False
+        return claims.get('is_staff', False) or ORGANIZER_GROUP in claims['groups']
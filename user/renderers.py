@@ -0,0 +1,28 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils import encoders
+
+
+def json_bytes(data):
+    # Mesmo formato compacto e UTF-8 do JSONRenderer padrão do DRF
+    return json.dumps(
+        data, cls=encoders.JSONEncoder, ensure_ascii=False, separators=(',', ':')
+    ).encode('utf-8')
+
+
+def ndjson_line(data):
+    return json_bytes(data) + b'\n'
+
+
+class NDJSONRenderer(BaseRenderer):
+    """Um objeto JSON por linha (``application/x-ndjson``)."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data if isinstance(data, list) else [data]
+        return b''.join(ndjson_line(item) for item in items)
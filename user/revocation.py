@@ -0,0 +1,155 @@
+"""
+Revogação de tokens por ``jti`` (logout e rotação do refresh token).
+
+A fonte da verdade é o cache ``revocation`` (Redis com ``REDIS_URL``), que
+nunca descarta entradas para abrir espaço: uma chave por ``jti`` revogado,
+que expira junto com o token. Na frente dela,
+cada processo mantém Bloom filters em memória, um por hora de expiração dos
+tokens; a checagem feita em toda requisição autenticada só vai ao cache
+quando o filtro acusa o ``jti`` (revogado ou falso positivo), e os filtros
+de horas que já passaram são descartados.
+
+Os processos se sincronizam por um log de revogações no cache (um contador
+de geração e uma entrada por revogação, ver user/change_log.py), lido a cada
+``TOKEN_REVOCATION_SYNC_INTERVAL`` segundos: um token revogado em outro
+worker passa a ser recusado, no máximo, depois desse intervalo.
+
+Sem Redis, o cache em memória (``LocMemCache``) só apaga uma chave expirada
+quando ela é lida de novo ou no descarte, que está desligado; por isso cada
+processo apaga, na sincronização, as chaves que gravou e já expiraram.
+"""
+import heapq
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.connection import ConnectionProxy
+from rest_framework_simplejwt.settings import api_settings
+
+from .bloom import BloomFilter
+from .change_log import LOG_READ_CHUNK, RECENT_LOG_ENTRIES, ChangeLog
+
+REVOCATION_CACHE_ALIAS = 'revocation'
+revocation_cache = ConnectionProxy(caches, REVOCATION_CACHE_ALIAS)
+
+REVOKED_KEY = "jwt:revoked:{jti}"
+revocation_log = ChangeLog(revocation_cache, "jwt:revoked")
+GENERATION_KEY = revocation_log.generation_key
+
+BUCKET_SECONDS = 3600
+
+
+class RevocationStore:
+    def __init__(self, bloom_capacity=10000, false_positive_rate=0.001, sync_interval=1.0):
+        self.bloom_capacity = bloom_capacity
+        self.false_positive_rate = false_positive_rate
+        self.sync_interval = sync_interval
+        self._filters = {}
+        self._generation = None
+        self._next_sync = 0.0
+        self._expirations = []
+        self._lock = threading.Lock()
+
+    def _log_timeout(self):
+        # Todas as entradas do log vivem o mesmo tempo (o do token mais longo),
+        # então expiram na ordem em que foram gravadas.
+        lifetime = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+        return int(lifetime.total_seconds()) + BUCKET_SECONDS
+
+    def _add_local(self, jti, exp):
+        bucket = int(exp) // BUCKET_SECONDS
+        bloom = self._filters.get(bucket)
+        if bloom is None:
+            bloom = self._filters[bucket] = BloomFilter(
+                self.bloom_capacity, self.false_positive_rate)
+        bloom.add(jti)
+
+    def revoke(self, jti, exp):
+        timeout = int(exp - time.time()) + 1
+        if timeout <= 0:
+            return False
+        revoked_key = REVOKED_KEY.format(jti=jti)
+        revocation_cache.set(revoked_key, 1, timeout)
+        log_timeout = self._log_timeout()
+        generation = revocation_log.append((jti, int(exp)), log_timeout)
+        with self._lock:
+            self._add_local(jti, exp)
+            if isinstance(caches[REVOCATION_CACHE_ALIAS], LocMemCache):
+                now = time.time()
+                heapq.heappush(self._expirations, (now + timeout, revoked_key))
+                heapq.heappush(self._expirations, (now + log_timeout, revocation_log.entry_key(generation)))
+        return True
+
+    def revoke_token(self, token):
+        return self.revoke(token[api_settings.JTI_CLAIM], token['exp'])
+
+    def is_revoked(self, jti, exp):
+        self._maybe_sync()
+        bloom = self._filters.get(int(exp) // BUCKET_SECONDS)
+        if bloom is None or jti not in bloom:
+            return False
+        try:
+            return revocation_cache.get(REVOKED_KEY.format(jti=jti)) is not None
+        except Exception as e:
+            # O filtro já acusou o jti: na dúvida, recusa o token.
+            print(f"AVISO: Falha ao consultar tokens revogados: {e}")
+            return True
+
+    def is_token_revoked(self, token):
+        return self.is_revoked(token[api_settings.JTI_CLAIM], token['exp'])
+
+    def _maybe_sync(self):
+        if time.monotonic() < self._next_sync or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sync = time.monotonic() + self.sync_interval
+            self._sync()
+        except Exception as e:
+            print(f"AVISO: Falha ao sincronizar tokens revogados: {e}")
+        finally:
+            self._lock.release()
+
+    def _sync(self):
+        last = revocation_log.last_generation()
+        if self._generation is None:
+            self._backfill(last - RECENT_LOG_ENTRIES)
+            self._generation = max(last - RECENT_LOG_ENTRIES, 0)
+        if last > self._generation:
+            # Entradas antigas ausentes são de tokens que já expiraram.
+            entries, self._generation, _ = revocation_log.read_forward(self._generation, last)
+            for entry in entries:
+                self._add_local(*entry)
+        current_bucket = int(time.time()) // BUCKET_SECONDS
+        for bucket in [bucket for bucket in self._filters if bucket < current_bucket]:
+            del self._filters[bucket]
+        self._purge_expired()
+
+    def _purge_expired(self):
+        expired = []
+        now = time.time()
+        while self._expirations and self._expirations[0][0] <= now:
+            expired.append(heapq.heappop(self._expirations)[1])
+        if expired:
+            revocation_cache.delete_many(expired)
+
+    def _backfill(self, last):
+        # Lê o log de trás para frente até a primeira entrada já expirada.
+        while last >= 1:
+            first = max(1, last - LOG_READ_CHUNK + 1)
+            for _, entry in reversed(revocation_log.read(first, last)):
+                if entry is None:
+                    return
+                self._add_local(*entry)
+            last = first - 1
+
+
+if not settings.DEBUG and isinstance(caches[REVOCATION_CACHE_ALIAS], LocMemCache):
+    print("AVISO: Sem REDIS_URL, os tokens revogados ficam na memória de cada processo: "
+          "com mais de um worker, um logout só vale no worker que o recebeu.")
+
+token_revocation = RevocationStore(
+    bloom_capacity=getattr(settings, "TOKEN_REVOCATION_BLOOM_CAPACITY", 10000),
+    sync_interval=getattr(settings, "TOKEN_REVOCATION_SYNC_INTERVAL", 1.0),
+)
@@ -1,5 +1,13 @@
+from itertools import islice
+
 from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, StringRelatedField
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from .models import User
+from .claims import apply_claims, get_user_claims_by_id
+from .revocation import token_revocation
 from django.contrib.auth.models import Group
 
 
@@ -28,3 +36,140 @@ class UserSerializer(serializers.ModelSerializer):
             'id', 'matricula', 'email', 'is_staff', 'last_login',
             'campus', 'foto', 'sexo', 'tipo_usuario', 'curso', 'situacao', 'data_nascimento', 'groups'
         ]
+
+
+class UserReadSerializer:
+    """
+    Versão compilada e somente leitura do ``UserSerializer``.
+
+    O plano de campos é montado uma única vez a partir de
+    ``UserSerializer.Meta.fields``, reaproveitando o ``to_representation`` de
+    cada campo do DRF, e aplicado diretamente sobre linhas de ``.values()``
+    (ou instâncias já carregadas). A saída é idêntica à do ``UserSerializer``,
+    sem o custo de instanciar serializers e resolver atributos por objeto.
+    """
+
+    def __init__(self, serializer_class=UserSerializer):
+        self._plan = []
+        self.value_fields = []
+        for name, field in serializer_class().fields.items():
+            if isinstance(field, ManyRelatedField):
+                if name != 'groups' or not isinstance(field.child_relation, StringRelatedField):
+                    raise TypeError(f"Campo '{name}' não suportado pelo UserReadSerializer.")
+                self._plan.append((name, None, None))
+            else:
+                self._plan.append((name, field.source, field.to_representation))
+                self.value_fields.append(field.source)
+
+    def to_representation(self, values, group_names):
+        data = {}
+        for name, source, to_representation in self._plan:
+            if source is None:
+                data[name] = group_names
+            else:
+                value = values[source]
+                data[name] = None if value is None else to_representation(value)
+        return data
+
+    def from_instance(self, user):
+        values = {source: getattr(user, source) for source in self.value_fields}
+        return self.to_representation(values, [str(group) for group in user.groups.all()])
+
+    def iter_queryset(self, queryset, chunk_size=2000):
+        rows = queryset.values(*self.value_fields).iterator(chunk_size=chunk_size)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            # Os grupos vêm do mesmo banco (primário ou réplica) que os usuários.
+            group_names = self._group_names([row['id'] for row in chunk], using=queryset.db)
+            for row in chunk:
+                yield self.to_representation(row, group_names.get(row['id'], []))
+
+    def one(self, queryset):
+        return next(self.iter_queryset(queryset[:1], chunk_size=1), None)
+
+    def many(self, queryset, chunk_size=2000):
+        return list(self.iter_queryset(queryset, chunk_size))
+
+    async def aiter_queryset(self, queryset, chunk_size=2000):
+        """Versão assíncrona de ``iter_queryset`` (ORM assíncrono do Django)."""
+        chunk = []
+        async for row in queryset.values(*self.value_fields).aiterator(chunk_size=chunk_size):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                async for data in self._arepresent_chunk(chunk, queryset.db):
+                    yield data
+                chunk = []
+        if chunk:
+            async for data in self._arepresent_chunk(chunk, queryset.db):
+                yield data
+
+    async def _arepresent_chunk(self, chunk, using):
+        group_names = {}
+        memberships = User.groups.through.objects.using(using).filter(
+            user_id__in=[row['id'] for row in chunk]).order_by('group_id').values_list('user_id', 'group__name')
+        async for user_id, name in memberships:
+            group_names.setdefault(user_id, []).append(name)
+        for row in chunk:
+            yield self.to_representation(row, group_names.get(row['id'], []))
+
+    async def aone(self, queryset):
+        rows = self.aiter_queryset(queryset[:1], chunk_size=1)
+        try:
+            async for data in rows:
+                return data
+            return None
+        finally:
+            await rows.aclose()
+
+    async def amany(self, queryset, chunk_size=2000):
+        return [data async for data in self.aiter_queryset(queryset, chunk_size)]
+
+    def _group_names(self, user_ids, using=None):
+        group_names = {}
+        memberships = User.groups.through.objects.using(using).filter(
+            user_id__in=user_ids).order_by('group_id').values_list('user_id', 'group__name')
+        for user_id, name in memberships:
+            group_names.setdefault(user_id, []).append(name)
+        return group_names
+
+
+user_read_serializer = UserReadSerializer()
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh que emite access tokens com as mesmas claims do login
+    (matricula, nome, campus, groups), lidas do snapshot em cache.
+    Refresh tokens revogados (logout ou rotação) são recusados.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        if token_revocation.is_token_revoked(refresh):
+            raise InvalidToken("Token is revoked")
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM, None)
+        claims = get_user_claims_by_id(user_id) if user_id else None
+        if not claims or not claims['is_active']:
+            raise AuthenticationFailed(
+                self.error_messages["no_active_account"],
+                "no_active_account",
+            )
+
+        data = {"access": str(apply_claims(refresh.access_token, claims))}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                # Sem o app token_blacklist: o refresh antigo vai para o
+                # store de revogação, sem tabela no banco.
+                token_revocation.revoke_token(refresh)
+
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+
+            data["refresh"] = str(refresh)
+
+        return data
@@ -0,0 +1,85 @@
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from auth_service.db_router import pin_to_primary
+
+from .claims import invalidate_user_claims
+from .detail_cache import invalidate_user_detail
+from .matricula_index import matricula_index
+from .models import User
+from .user_cache import user_rows
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_caches(sender, instance, **kwargs):
+    # Antes de invalidar: a próxima leitura (que repõe os caches) vai ao primário.
+    pin_to_primary(instance.matricula)
+    invalidate_user_claims(instance.pk)
+    user_rows.invalidate(instance.pk)
+    invalidate_user_detail(instance.matricula)
+
+
+@receiver(post_init, sender=User)
+def remember_indexed_matricula(sender, instance, **kwargs):
+    # Matrícula carregada do banco: numa renomeação, a antiga sai do índice.
+    instance._indexed_matricula = instance.matricula
+
+
+@receiver(post_save, sender=User)
+def index_user_matricula(sender, instance, created, **kwargs):
+    old = instance._indexed_matricula
+    if not created and old and old != instance.matricula:
+        matricula_index.record_removed(old)
+    if created or old != instance.matricula:
+        matricula_index.record_added(instance.matricula)
+    instance._indexed_matricula = instance.matricula
+
+
+@receiver(post_delete, sender=User)
+def unindex_user_matricula(sender, instance, **kwargs):
+    matricula_index.record_removed(instance.matricula)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_user_group_caches(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # group.user_set.clear(): pk_set vem vazio e, no post_clear, os vínculos
+        # já foram apagados; os membros são guardados aqui para invalidar depois.
+        instance._cleared_members = _members(instance.user_set.all())
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        pin_to_primary(instance.matricula)
+        invalidate_user_claims(instance.pk)
+        user_rows.invalidate(instance.pk)
+        invalidate_user_detail(instance.matricula)
+    elif action == 'post_clear':
+        _invalidate_members(instance.__dict__.pop('_cleared_members', {}))
+    elif pk_set:
+        # group.user_set.add(...): pk_set contém os ids dos usuários afetados
+        _invalidate_members(_members(User.objects.filter(pk__in=pk_set)))
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_group_member_caches(sender, instance, created=False, **kwargs):
+    # Renomear ou apagar um grupo muda as claims e o detalhe dos membros. Na
+    # remoção, os vínculos ainda existem só antes do delete (sem m2m_changed).
+    if not created:
+        _invalidate_members(_members(instance.user_set.all()))
+
+
+def _members(users):
+    return dict(users.values_list('pk', 'matricula'))
+
+
+def _invalidate_members(members):
+    if not members:
+        return
+    pin_to_primary(*members.values())
+    invalidate_user_claims(*members)
+    user_rows.invalidate(*members)
+    invalidate_user_detail(*members.values())
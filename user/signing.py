@@ -0,0 +1,140 @@
+"""
+Assinatura assimétrica dos tokens (RS256/EdDSA) com rotação de chaves.
+
+``JWT_PRIVATE_KEYS`` traz uma ou mais chaves privadas PEM concatenadas: a
+primeira assina os tokens novos e as demais continuam publicadas no JWKS
+(``/.well-known/jwks.json``) até os tokens assinados por elas expirarem. Cada
+chave é identificada pelo ``kid`` (thumbprint RFC 7638 da chave pública),
+enviado no cabeçalho do token.
+
+Sem chaves configuradas, o serviço continua com HS256 e ``JWT_SECRET_KEY``.
+"""
+import base64
+import hashlib
+import json
+import re
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.exceptions import TokenBackendError
+from rest_framework_simplejwt.settings import api_settings
+
+_PEM_PRIVATE_KEY = re.compile(
+    r'-----BEGIN [A-Z ]*PRIVATE KEY-----.+?-----END [A-Z ]*PRIVATE KEY-----', re.DOTALL)
+
+# Membros obrigatórios de cada tipo de chave no thumbprint (RFC 7638).
+_THUMBPRINT_MEMBERS = {
+    'RSA': ('e', 'kty', 'n'),
+    'EC': ('crv', 'kty', 'x', 'y'),
+    'OKP': ('crv', 'kty', 'x'),
+}
+
+
+def jwk_thumbprint(jwk):
+    members = {name: jwk[name] for name in _THUMBPRINT_MEMBERS[jwk['kty']]}
+    digest = hashlib.sha256(
+        json.dumps(members, separators=(',', ':'), sort_keys=True).encode()).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+
+class SigningKey:
+    def __init__(self, private_key, algorithm):
+        self.algorithm = algorithm
+        self.private_key = private_key
+        self.public_key = private_key.public_key()
+        jwk = jwt.PyJWS().get_algorithm_by_name(algorithm).to_jwk(self.public_key, as_dict=True)
+        self.kid = jwk_thumbprint(jwk)
+        self.jwk = {**jwk, 'kid': self.kid, 'alg': algorithm, 'use': 'sig'}
+
+
+def load_signing_keys(pem_bundle, algorithm):
+    """Lê as chaves privadas PEM de ``pem_bundle``; a primeira é a ativa."""
+    pem_bundle = (pem_bundle or '').replace('\\n', '\n')
+    return [
+        SigningKey(serialization.load_pem_private_key(pem.encode(), password=None), algorithm)
+        for pem in _PEM_PRIVATE_KEY.findall(pem_bundle)
+    ]
+
+
+class KeyRingTokenBackend(TokenBackend):
+    """
+    ``TokenBackend`` do simplejwt que assina com a chave ativa, põe o ``kid``
+    no cabeçalho e valida cada token com a chave pública do seu ``kid``.
+    """
+
+    def __init__(self, keys, **kwargs):
+        self.keys = {key.kid: key for key in keys}
+        self.active_key = keys[0]
+        super().__init__(
+            keys[0].algorithm, signing_key=keys[0].private_key,
+            verifying_key=keys[0].public_key, **kwargs)
+
+    def get_verifying_key(self, token):
+        try:
+            kid = jwt.get_unverified_header(token).get('kid')
+        except jwt.InvalidTokenError as ex:
+            raise TokenBackendError(_("Token is invalid")) from ex
+        key = self.keys.get(kid)
+        if key is None:
+            raise TokenBackendError(_("Token is invalid"))
+        return key.public_key
+
+    def encode(self, payload):
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload["aud"] = self.audience
+        if self.issuer is not None:
+            jwt_payload["iss"] = self.issuer
+        return jwt.encode(
+            jwt_payload, self.active_key.private_key, algorithm=self.algorithm,
+            headers={'kid': self.active_key.kid}, json_encoder=self.json_encoder)
+
+    def jwks(self):
+        return {'keys': [key.jwk for key in self.keys.values()]}
+
+
+def build_token_backend():
+    """
+    ``KeyRingTokenBackend`` das chaves configuradas, ou ``None`` (HS256).
+    Chaves configuradas que não carregam impedem a inicialização, em vez de
+    cada login falhar depois.
+    """
+    pem_bundle = getattr(settings, 'JWT_PRIVATE_KEYS', '')
+    if not (pem_bundle or '').strip():
+        return None
+    algorithm = getattr(settings, 'JWT_ALGORITHM', 'RS256')
+    try:
+        keys = load_signing_keys(pem_bundle, algorithm)
+    except Exception as exc:
+        raise ImproperlyConfigured(
+            f"JWT_PRIVATE_KEYS tem uma chave inválida para {algorithm}: {exc}") from exc
+    if not keys:
+        raise ImproperlyConfigured(
+            "JWT_PRIVATE_KEYS está definido, mas nenhuma chave privada PEM foi encontrada.")
+    return KeyRingTokenBackend(
+        keys, audience=api_settings.AUDIENCE, issuer=api_settings.ISSUER,
+        leeway=api_settings.LEEWAY, json_encoder=api_settings.JSON_ENCODER)
+
+
+def install_token_backend():
+    """
+    Troca o backend global do simplejwt (usado por todas as classes de token)
+    pelo ``KeyRingTokenBackend`` quando há chaves configuradas.
+    """
+    from rest_framework_simplejwt import state
+
+    backend = build_token_backend()
+    if backend is not None:
+        state.token_backend = backend
+    return backend
+
+
+def current_jwks():
+    from rest_framework_simplejwt import state
+
+    backend = state.token_backend
+    return backend.jwks() if isinstance(backend, KeyRingTokenBackend) else {'keys': []}
@@ -0,0 +1,274 @@
+import asyncio
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from auth_service.metrics import SUAP_CIRCUIT_STATE, observe_suap_request
+
+from .circuit_breaker import CLOSED, OPEN, CircuitBreaker
+
+SUAP_BASE_URL = getattr(settings, "SUAP_BASE_URL", "https://suap.ifrn.edu.br").rstrip("/")
+SUAP_TOKEN_URL = f"{SUAP_BASE_URL}/o/token/"
+SUAP_API_EU_URL = f"{SUAP_BASE_URL}/api/rh/eu"
+SUAP_API_MEUS_DADOS_URL = f"{SUAP_BASE_URL}/api/v2/minhas-informacoes/meus-dados/"
+
+SUAP_TOKEN_TIMEOUT = 15
+SUAP_API_TIMEOUT = 10
+
+
+class SuapUnavailable(Exception):
+    """O SUAP não respondeu: erro de rede, status 5xx ou circuito aberto."""
+
+
+_CIRCUIT_STATE_VALUES = {CLOSED: 0, OPEN: 1}
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def _circuit_state_changed(breaker, state):
+    SUAP_CIRCUIT_STATE.labels(breaker.name).set(_CIRCUIT_STATE_VALUES.get(state, 2))
+    print(f"AVISO: Circuito do SUAP para {breaker.name}: {state}.")
+
+
+def get_circuit_breaker(url):
+    """Circuit breaker (por processo) de um endpoint do SUAP."""
+    breaker = _breakers.get(url)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(url)
+            if breaker is None:
+                breaker = _breakers[url] = CircuitBreaker(
+                    url,
+                    window_seconds=getattr(settings, "SUAP_BREAKER_WINDOW_SECONDS", 30.0),
+                    min_calls=getattr(settings, "SUAP_BREAKER_MIN_CALLS", 10),
+                    error_rate=getattr(settings, "SUAP_BREAKER_ERROR_RATE", 0.5),
+                    slow_call_seconds=getattr(settings, "SUAP_BREAKER_SLOW_CALL_SECONDS", 5.0),
+                    slow_call_rate=getattr(settings, "SUAP_BREAKER_SLOW_CALL_RATE", 0.5),
+                    open_seconds=getattr(settings, "SUAP_BREAKER_OPEN_SECONDS", 30.0),
+                    on_state_change=_circuit_state_changed,
+                )
+    return breaker
+
+
+def _acquire_circuit(url):
+    breaker = get_circuit_breaker(url)
+    if not breaker.allow():
+        raise SuapUnavailable(f"Circuito aberto para {url}")
+    return breaker
+
+
+def _record_call(breaker, url, start, response=None):
+    # Para o circuito, só falhas do SUAP contam (rede e 5xx); um 4xx, como um
+    # code inválido, é erro do cliente.
+    duration = time.perf_counter() - start
+    status_code = response.status_code if response is not None else None
+    breaker.record(status_code is not None and status_code < 500, duration)
+    observe_suap_request(url, duration, error=status_code is None or status_code >= 400)
+
+
+def _raise_for_token_status(response):
+    if response.status_code >= 500:
+        raise SuapUnavailable(f"O SUAP respondeu {response.status_code} ao trocar o code.")
+    response.raise_for_status()
+
+
+def _suap_urls(base_url=None):
+    """URLs de token, ``eu`` e ``meus-dados`` (as do settings, por padrão)."""
+    if not base_url:
+        return SUAP_TOKEN_URL, SUAP_API_EU_URL, SUAP_API_MEUS_DADOS_URL
+    base_url = base_url.rstrip("/")
+    return (f"{base_url}/o/token/", f"{base_url}/api/rh/eu",
+            f"{base_url}/api/v2/minhas-informacoes/meus-dados/")
+
+
+def _token_request_data(code):
+    return {
+        "grant_type": "authorization_code", "code": code,
+        "client_id": settings.SUAP_CLIENT_ID, "client_secret": settings.SUAP_CLIENT_SECRET,
+        "scope": "identificacao email documentos_pessoais",
+    }
+
+
+class SuapClient:
+    """
+    Cliente HTTP de longa duração para o SUAP.
+
+    Mantém uma única ``requests.Session`` com pool de conexões keep-alive e um
+    executor limitado reutilizado nas buscas paralelas de ``meus-dados``/``eu``,
+    evitando um novo handshake TCP+TLS e novas threads a cada login.
+    """
+
+    def __init__(self, pool_size=20, max_workers=8, base_url=None):
+        self.token_url, self.eu_url, self.meus_dados_url = _suap_urls(base_url)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="suap")
+
+    def _request(self, method, url, **kwargs):
+        breaker = _acquire_circuit(url)
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException as exc:
+            _record_call(breaker, url, start)
+            raise SuapUnavailable(str(exc)) from exc
+        except BaseException:
+            breaker.cancel()
+            raise
+        _record_call(breaker, url, start, response)
+        return response
+
+    def exchange_code(self, code):
+        response = self._request(
+            "POST", self.token_url, data=_token_request_data(code), timeout=SUAP_TOKEN_TIMEOUT)
+        _raise_for_token_status(response)
+        return response.json()
+
+    def fetch_profile(self, access_token):
+        headers_suap_api = {"Authorization": f"Bearer {access_token}"}
+
+        future_meus_dados = self.executor.submit(
+            self._request, "GET", self.meus_dados_url, headers=headers_suap_api, timeout=SUAP_API_TIMEOUT)
+        future_eu = self.executor.submit(
+            self._request, "GET", self.eu_url, headers=headers_suap_api, timeout=SUAP_API_TIMEOUT)
+
+        data_suap = {}
+        data_eu = {}
+
+        try:
+            response_meus_dados = future_meus_dados.result()
+            if response_meus_dados.status_code == 200:
+                data_suap = response_meus_dados.json()
+        except Exception as e:
+            print(f"AVISO: Falha ao buscar dados da API MEUS_DADOS: {e}")
+
+        try:
+            response_eu = future_eu.result()
+            if response_eu.status_code == 200:
+                data_eu = response_eu.json()
+        except Exception as e:
+            print(f"AVISO: Falha ao buscar dados da API EU: {e}")
+
+        return data_suap, data_eu
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+
+class AsyncSuapClient:
+    """
+    Equivalente assíncrono do ``SuapClient`` para o callback servido via ASGI.
+
+    As buscas de ``meus-dados``/``eu`` rodam concorrentemente no event loop,
+    sem ocupar threads enquanto o SUAP responde.
+    """
+
+    def __init__(self, pool_size=20, base_url=None):
+        self.token_url, self.eu_url, self.meus_dados_url = _suap_urls(base_url)
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size),
+        )
+
+    async def _request(self, method, url, **kwargs):
+        breaker = _acquire_circuit(url)
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.RequestError as exc:
+            _record_call(breaker, url, start)
+            raise SuapUnavailable(str(exc)) from exc
+        except BaseException:
+            breaker.cancel()
+            raise
+        _record_call(breaker, url, start, response)
+        return response
+
+    async def exchange_code(self, code):
+        response = await self._request(
+            "POST", self.token_url, data=_token_request_data(code), timeout=SUAP_TOKEN_TIMEOUT)
+        _raise_for_token_status(response)
+        return response.json()
+
+    async def fetch_profile(self, access_token):
+        headers_suap_api = {"Authorization": f"Bearer {access_token}"}
+
+        response_meus_dados, response_eu = await asyncio.gather(
+            self._request("GET", self.meus_dados_url,
+                          headers=headers_suap_api, timeout=SUAP_API_TIMEOUT),
+            self._request("GET", self.eu_url, headers=headers_suap_api,
+                          timeout=SUAP_API_TIMEOUT),
+            return_exceptions=True,
+        )
+
+        data_suap = {}
+        data_eu = {}
+
+        try:
+            if isinstance(response_meus_dados, BaseException):
+                raise response_meus_dados
+            if response_meus_dados.status_code == 200:
+                data_suap = response_meus_dados.json()
+        except Exception as e:
+            print(f"AVISO: Falha ao buscar dados da API MEUS_DADOS: {e}")
+
+        try:
+            if isinstance(response_eu, BaseException):
+                raise response_eu
+            if response_eu.status_code == 200:
+                data_eu = response_eu.json()
+        except Exception as e:
+            print(f"AVISO: Falha ao buscar dados da API EU: {e}")
+
+        return data_suap, data_eu
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_suap_client():
+    # Um cliente por processo: workers criados via fork não podem herdar
+    # as conexões nem as threads do processo pai.
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = SuapClient(
+                    pool_size=getattr(settings, "SUAP_HTTP_POOL_SIZE", 20),
+                    max_workers=getattr(settings, "SUAP_HTTP_MAX_WORKERS", 8),
+                )
+                _client_pid = pid
+    return _client
+
+
+# O httpx.AsyncClient fica preso ao event loop em que foi criado, então
+# mantemos um cliente por loop (na prática, um por worker ASGI).
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_suap_client():
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncSuapClient(
+            pool_size=getattr(settings, "SUAP_HTTP_POOL_SIZE", 20))
+        _async_clients[loop] = client
+    return client
@@ -1,3 +1,1939 @@
-from django.test import TestCase
+import asyncio
+import base64
+import datetime
+import io
+import json
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from unittest import mock, skipUnless
+from urllib.parse import parse_qs, urlencode, urlsplit
 
-# Create your tests here.
+import jwt
+from asgiref.sync import async_to_sync
+from celery import Celery
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.core.cache import cache, caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db.models.signals import post_save
+from django.db import connection, connections, router, transaction
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresDatabaseWrapper
+from django.test import (
+    AsyncRequestFactory, RequestFactory, SimpleTestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from kombu import Exchange, Queue
+from kombu.exceptions import OperationalError
+from prometheus_client import REGISTRY
+from rest_framework_simplejwt.exceptions import TokenBackendError
+
+from audit_spool import AuditSpool
+from auth_service.db_router import replica_reads
+from auth_service.metrics import collect_queries, install_query_recorders
+from auth_service.secret_loader import load_secrets
+from jwt_verifier import TokenVerifier
+from messaging import (
+    AUDIT_EXCHANGE, AuditPublisher, PartialPublishError, audit_publisher, send_audit_log,
+)
+from benchmarks.suap_stub import SuapStub
+from user.claims import get_user_claims
+from user.detail_cache import compute_etag
+from user.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from user.matricula_index import MatriculaIndex, matricula_index
+from user.models import User
+from user.revocation import GENERATION_KEY, RevocationStore, revocation_cache, token_revocation
+from user.serializers import UserSerializer, user_read_serializer
+from user.signing import KeyRingTokenBackend, build_token_backend, load_signing_keys
+from user.suap import AsyncSuapClient, SuapClient, get_suap_client
+from user.throttling import LocalBucketStore, RedisBucketStore
+from user import async_views, views
+from user.views import asuap_oauth_callback_view, get_tokens_for_user, suap_oauth_callback_view
+
+
+def _event(i):
+    return {"event_type": "auth.login", "user_id": f"2024{i:06d}"}
+
+
+class AuditSpoolTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_replay_drains_segments_in_order(self):
+        spool = AuditSpool(self.directory, segment_max_bytes=200, fsync_batch=2)
+        spool.append([_event(i) for i in range(10)])
+
+        self.assertGreater(len(spool._segments()), 1)
+
+        published = []
+        replayed = spool.replay(published.extend, batch_size=3)
+
+        self.assertEqual(replayed, 10)
+        self.assertEqual(published, [_event(i) for i in range(10)])
+        self.assertEqual(spool._segments(), [])
+        self.assertFalse(spool.has_pending())
+
+    def test_append_respects_size_cap(self):
+        spool = AuditSpool(self.directory, max_total_bytes=120)
+
+        written = spool.append([_event(i) for i in range(5)])
+
+        self.assertEqual(written, 2)
+        self.assertEqual(spool.dropped, 3)
+
+    def test_failed_replay_keeps_unpublished_events(self):
+        spool = AuditSpool(self.directory)
+        spool.append([_event(i) for i in range(5)])
+        published = []
+
+        def publish_then_fail(batch):
+            if published:
+                raise OperationalError("broker fora do ar")
+            published.extend(batch)
+
+        with self.assertRaises(OperationalError):
+            spool.replay(publish_then_fail, batch_size=2)
+
+        remaining = []
+        spool.replay(remaining.extend)
+        self.assertEqual(published + remaining, [_event(i) for i in range(5)])
+
+    def test_partially_published_batch_is_not_replayed_again(self):
+        spool = AuditSpool(self.directory)
+        spool.append([_event(i) for i in range(5)])
+        published = []
+
+        def publish_two_then_fail(batch):
+            published.extend(batch[:2])
+            raise PartialPublishError(2, OperationalError("broker fora do ar"))
+
+        with self.assertRaises(PartialPublishError):
+            spool.replay(publish_two_then_fail, batch_size=4)
+
+        spool.replay(published.extend)
+        self.assertEqual(published, [_event(i) for i in range(5)])
+
+    def test_unwritable_directory_drops_events_without_raising(self):
+        not_a_directory = os.path.join(self.directory, 'arquivo')
+        open(not_a_directory, 'w').close()
+        spool = AuditSpool(os.path.join(not_a_directory, 'spool'))
+
+        self.assertEqual(spool.append([_event(i) for i in range(3)]), 0)
+        self.assertEqual(spool.dropped, 3)
+
+    def test_stray_files_do_not_block_replay(self):
+        spool = AuditSpool(self.directory)
+        spool.append([_event(i) for i in range(3)])
+        for name in ('audit-copia.jsonl', 'audit-123-backup.jsonl', 'notas.txt'):
+            with open(os.path.join(self.directory, name), 'w') as stray:
+                stray.write('{}\n')
+
+        published = []
+        self.assertEqual(spool.replay(published.extend), 3)
+
+        self.assertEqual(published, [_event(i) for i in range(3)])
+        self.assertCountEqual(
+            os.listdir(self.directory), ['audit-copia.jsonl', 'audit-123-backup.jsonl', 'notas.txt'])
+
+    def test_segment_of_a_dead_process_is_claimed_by_a_single_worker(self):
+        spool = AuditSpool(self.directory)
+        spool.append([_event(i) for i in range(3)])
+        spool.close()
+        [segment] = spool._segments()
+        finished = subprocess.Popen([sys.executable, '-c', 'pass'])
+        finished.wait()
+        orphan = segment.replace(f'audit-{os.getpid()}-', f'audit-{finished.pid}-')
+        os.rename(segment, orphan)
+
+        claimed = AuditSpool(self.directory)._claim(orphan)
+        # O outro worker que listou o mesmo segmento perde a disputa.
+        self.assertIsNone(AuditSpool(self.directory)._claim(orphan))
+        self.assertEqual(claimed, segment)
+
+        published = []
+        self.assertEqual(AuditSpool(self.directory).replay(published.extend), 3)
+        self.assertEqual(published, [_event(i) for i in range(3)])
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+class AuditBrokerTestCase(SimpleTestCase):
+    """Broker em memória com a fila de auditoria declarada e vazia."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.app = Celery('audit_tests', broker='memory://')
+        self.queue = Queue('audit_queue', Exchange(
+            AUDIT_EXCHANGE, type='topic'), routing_key='#')
+        with self.app.connection_for_write() as conn:
+            self.queue.declare(channel=conn.default_channel)
+        self._broker_messages()
+
+    def _broker_messages(self):
+        with self.app.connection_for_write() as conn:
+            simple_queue = conn.SimpleQueue(self.queue)
+            messages = []
+            while simple_queue.qsize():
+                message = simple_queue.get(timeout=1)
+                messages.append(message.payload[0][0])
+                message.ack()
+            simple_queue.close()
+            return messages
+
+
+class AuditPublisherSpoolTests(AuditBrokerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.publisher = AuditPublisher(
+            self.app, spool=AuditSpool(self.directory), replay_interval=0)
+
+    def test_events_are_spooled_during_outage_and_replayed(self):
+        batch = [_event(i) for i in range(3)]
+        with mock.patch.object(self.publisher, '_get_producer', side_effect=OperationalError("down")):
+            self.assertFalse(self.publisher._publish(batch))
+
+        stats = self.publisher.stats()
+        self.assertEqual(stats['failed'], 3)
+        self.assertEqual(stats['spooled'], 3)
+        self.assertEqual(stats['dropped'], 0)
+        self.assertEqual(self._broker_messages(), [])
+
+        self.publisher._maybe_replay()
+
+        self.assertEqual(self.publisher.stats()['replayed'], 3)
+        self.assertEqual(self._broker_messages(), batch)
+        self.assertFalse(self.publisher.spool.has_pending())
+
+    def test_failure_mid_batch_spools_only_the_unsent_events(self):
+        batch = [_event(i) for i in range(5)]
+        send_task = self.app.send_task
+        calls = []
+
+        def fail_on_third(*args, **kwargs):
+            calls.append(kwargs['retry_policy'])
+            if len(calls) == 3:
+                raise OperationalError("down")
+            return send_task(*args, **kwargs)
+
+        with mock.patch.object(self.app, 'send_task', side_effect=fail_on_third):
+            self.assertFalse(self.publisher._publish(batch))
+
+        stats = self.publisher.stats()
+        self.assertEqual((stats['published'], stats['failed'], stats['spooled']), (2, 3, 3))
+        self.assertEqual(self._broker_messages(), batch[:2])
+        # O lote para na primeira falha, com uma política de retry curta.
+        self.assertEqual(len(calls), 3)
+        self.assertLessEqual(calls[0]['max_retries'] * calls[0]['interval_max'], 0.5)
+
+        self.publisher._maybe_replay()
+
+        self.assertEqual(self._broker_messages(), batch[2:])
+        self.assertFalse(self.publisher.spool.has_pending())
+
+    def test_spool_failure_never_reaches_the_caller(self):
+        open(os.path.join(self.directory, 'arquivo'), 'w').close()
+        publisher = AuditPublisher(
+            self.app, maxsize=1, spool=AuditSpool(os.path.join(self.directory, 'arquivo', 'spool')))
+        # Sem a thread de publicação, a fila enche no segundo evento.
+        with mock.patch.object(publisher, '_ensure_started'):
+            publisher._queue = queue.Queue(maxsize=1)
+            self.assertTrue(publisher.enqueue(_event(0)))
+            self.assertFalse(publisher.enqueue(_event(1)))
+        with mock.patch.object(publisher, '_send_batch', side_effect=OperationalError("down")):
+            self.assertFalse(publisher._publish([_event(2)]))
+
+        self.assertEqual(publisher.stats()['dropped'], 2)
+
+    def test_send_audit_log_swallows_publisher_errors(self):
+        with mock.patch.object(audit_publisher, 'enqueue', side_effect=OSError("spool")):
+            send_audit_log(_event(0))
+
+
+def _wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("A condição não foi atingida a tempo.")
+        time.sleep(0.01)
+
+
+class AuditPublisherThreadTests(AuditBrokerTestCase):
+    def _publisher(self, **kwargs):
+        return AuditPublisher(
+            self.app, flush_interval=0.05, spool=AuditSpool(self.directory),
+            replay_interval=0, **kwargs)
+
+    def test_flush_drains_the_queue_on_shutdown(self):
+        publisher = self._publisher(batch_size=10)
+        events = [_event(i) for i in range(25)]
+        for event in events:
+            self.assertTrue(publisher.enqueue(event))
+
+        self.assertTrue(publisher.flush(timeout=5))
+
+        self.assertEqual(self._broker_messages(), events)
+        self.assertEqual(publisher.stats()['published'], 25)
+        self.assertEqual(publisher.stats()['batches'], 3)
+
+    def test_full_queue_spills_to_the_spool(self):
+        publisher = self._publisher(maxsize=2, batch_size=1)
+        release = threading.Event()
+        send_batch = publisher._send_batch
+
+        def blocked_send(batch):
+            release.wait(5)
+            send_batch(batch)
+
+        with mock.patch.object(publisher, '_send_batch', side_effect=blocked_send):
+            publisher.enqueue(_event(0))
+            _wait_until(lambda: publisher.stats()['queue_depth'] == 0)  # preso no envio
+            for i in range(1, 5):
+                self.assertTrue(publisher.enqueue(_event(i)))
+
+            stats = publisher.stats()
+            self.assertEqual((stats['enqueued'], stats['spooled'], stats['queue_depth']), (3, 2, 2))
+            release.set()
+            self.assertTrue(publisher.flush(timeout=5))
+
+        # Os eventos do spool são reenviados depois do primeiro lote publicado.
+        self.assertCountEqual(self._broker_messages(), [_event(i) for i in range(5)])
+        self.assertEqual(publisher.stats()['replayed'], 2)
+        self.assertFalse(publisher.spool.has_pending())
+
+    def test_unexpected_error_does_not_stop_the_thread(self):
+        publisher = self._publisher()
+        publish = publisher._publish
+        with mock.patch.object(
+                publisher, '_publish', side_effect=[RuntimeError("inesperado"), publish]):
+            publisher.enqueue(_event(0))
+            self.assertTrue(publisher.flush(timeout=5))
+            publisher._publish.side_effect = publish
+            publisher.enqueue(_event(1))
+            self.assertTrue(publisher.flush(timeout=5))
+
+        self.assertTrue(publisher.is_alive())
+        self.assertEqual(publisher.stats()['errors'], 1)
+        self.assertEqual(self._broker_messages(), [_event(1)])
+
+    def test_dead_thread_is_restarted_on_the_next_event(self):
+        publisher = self._publisher()
+        publisher.enqueue(_event(0))
+        self.assertTrue(publisher.flush(timeout=5))
+        alive = REGISTRY.get_sample_value('audit_publisher_threads_alive')
+
+        with mock.patch.object(publisher, '_run_once', side_effect=SystemExit):
+            _wait_until(lambda: not publisher.is_alive())
+        self.assertFalse(publisher.stats()['thread_alive'])
+        self.assertEqual(REGISTRY.get_sample_value('audit_publisher_threads_alive'), alive - 1)
+
+        publisher.enqueue(_event(1))
+        self.assertTrue(publisher.flush(timeout=5))
+        self.assertTrue(publisher.is_alive())
+        self.assertEqual(REGISTRY.get_sample_value('audit_publisher_threads_alive'), alive)
+        self.assertEqual(self._broker_messages(), [_event(0), _event(1)])
+
+
+class AuditTopologyTests(AuditBrokerTestCase):
+    def setUp(self):
+        super().setUp()
+        brokers = mock.patch('celery_app._declared_brokers', set())
+        brokers.start()
+        self.addCleanup(brokers.stop)
+        declare = mock.patch('celery_app.declare_audit_topology')
+        self.declare = declare.start()
+        self.addCleanup(declare.stop)
+
+    def test_topology_is_declared_once_on_the_first_publish(self):
+        publisher = AuditPublisher(self.app, spool=AuditSpool(self.directory))
+        publisher._ensure_started()
+        self.declare.assert_not_called()  # nada no import nem na criação da thread
+
+        self.assertTrue(publisher._publish([_event(0)]))
+        publisher._reset_connection()  # reconexão ao mesmo broker
+        self.assertTrue(publisher._publish([_event(1)]))
+
+        self.declare.assert_called_once()
+        self.assertEqual(self._broker_messages(), [_event(0), _event(1)])
+
+    def test_command_declares_the_topology(self):
+        stdout = io.StringIO()
+        with mock.patch('user.management.commands.declare_audit_topology.celery_app', self.app), \
+                mock.patch('user.management.commands.declare_audit_topology.declare_audit_topology') as declare:
+            call_command('declare_audit_topology', stdout=stdout)
+
+            declare.assert_called_once()
+            self.assertIn('declaradas com sucesso', stdout.getvalue())
+
+            declare.side_effect = OperationalError("broker fora do ar")
+            with self.assertRaises(CommandError):
+                call_command('declare_audit_topology', stdout=stdout)
+
+
+class SecretCacheTests(SimpleTestCase):
+    secrets = {'SECRET_KEY': 'segredo', 'DB_PASSWORD': 'senha'}
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.cache_path = os.path.join(directory, 'secrets.json')
+        patcher = mock.patch(
+            'auth_service.secret_loader.fetch_parameters', return_value=dict(self.secrets))
+        self.fetch = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _load(self, ttl=300):
+        return load_secrets(cache_ttl=ttl, cache_path=self.cache_path)
+
+    def test_cache_is_private_and_reused_within_the_ttl(self):
+        self.assertEqual(self._load(), self.secrets)
+        self.assertEqual(os.stat(self.cache_path).st_mode & 0o777, 0o600)
+
+        self.assertEqual(self._load(), self.secrets)
+        self.assertEqual(self.fetch.call_count, 1)
+
+    def test_expired_cache_is_fetched_again(self):
+        self._load()
+        expired = time.time() - 301
+        os.utime(self.cache_path, (expired, expired))
+
+        self.assertEqual(self._load(), self.secrets)
+        self.assertEqual(self.fetch.call_count, 2)
+        self.assertGreater(os.stat(self.cache_path).st_mtime, expired)
+
+    def test_corrupt_or_readable_cache_falls_back_to_parameter_store(self):
+        for contents, mode in (('{"SECRET_KEY": "trunc', 0o600), ('["lista"]', 0o600),
+                               (json.dumps({'SECRET_KEY': 'outro'}), 0o644)):
+            with open(self.cache_path, 'w') as cache_file:
+                cache_file.write(contents)
+            os.chmod(self.cache_path, mode)
+            self.fetch.reset_mock()
+
+            self.assertEqual(self._load(), self.secrets)
+            self.fetch.assert_called_once()
+            self.assertEqual(os.stat(self.cache_path).st_mode & 0o777, 0o600)
+
+    def test_symlinked_temporary_file_is_not_followed(self):
+        target = f'{self.cache_path}.alvo'
+        os.symlink(target, f'{self.cache_path}.{os.getpid()}.tmp')
+
+        self._load()
+
+        self.assertFalse(os.path.exists(target))
+        self.assertEqual(self._load(), self.secrets)
+
+    def test_parameter_store_failure_returns_no_secrets(self):
+        self.fetch.side_effect = RuntimeError("sem credenciais")
+        self.assertEqual(self._load(), {})
+        self.assertFalse(os.path.exists(self.cache_path))
+
+
+@skipUnless('replica' in settings.DATABASES,
+            "requer o alias 'replica' (use --settings=auth_service.test_settings)")
+class ReplicaRoutingTests(TransactionTestCase):
+    # O espelho usa outra conexão: os dados precisam estar commitados.
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            matricula='20240000000001', email='aluno@escolar.ifrn.edu.br', nome='Aluno')
+        cache.clear()  # descarta o pin criado pelo cadastro acima
+
+    def _queries_by_alias(self, fn):
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = fn()
+        return response, len(primary), len(replica)
+
+    def test_reads_outside_marked_views_use_primary(self):
+        self.assertEqual(router.db_for_read(User), 'default')
+        with replica_reads():
+            self.assertEqual(router.db_for_read(User), 'replica')
+
+    def test_write_sends_following_reads_to_primary(self):
+        with replica_reads():
+            self.assertEqual(router.db_for_write(User), 'default')
+            self.assertEqual(router.db_for_read(User), 'default')
+
+    def test_read_only_view_reads_from_replica(self):
+        response, primary, replica = self._queries_by_alias(
+            lambda: self.client.get(f'/api/v1/auth/users/{self.user.matricula}/'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_recent_write_pins_reads_to_primary(self):
+        self.user.nome = 'Aluno Atualizado'
+        self.user.save()
+
+        response, primary, replica = self._queries_by_alias(
+            lambda: self.client.post(
+                '/api/v1/auth/users/by-ids/', {'ids': [self.user.matricula]},
+                content_type='application/json'))
+
+        self.assertEqual(response.json()[0]['nome'], 'Aluno Atualizado')
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+
+class MetricsTests(TransactionTestCase):
+    databases = '__all__'
+    view = 'api/v1/auth/users/by-ids/'
+
+    def _sample(self, name):
+        return REGISTRY.get_sample_value(name, {'view': self.view}) or 0
+
+    def test_request_latency_and_queries_are_exported(self):
+        User.objects.create_user(
+            matricula='20240000000001', email='aluno@escolar.ifrn.edu.br', nome='Aluno')
+        queries_before = self._sample('http_request_db_queries_sum')
+
+        response = self.client.post(
+            '/' + self.view, {'ids': ['20240000000001']}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(self._sample('http_request_db_queries_sum'), queries_before)
+
+        metrics = self.client.get('/metrics')
+        self.assertEqual(metrics.status_code, 200)
+        self.assertIn(
+            f'http_request_duration_seconds_count{{method="POST",status="200",view="{self.view}"}}',
+            metrics.content.decode())
+
+
+def _claims(raw_token):
+    return jwt.decode(raw_token, options={'verify_signature': False})
+
+
+# Os buckets locais do throttling sobrevivem entre os testes.
+@override_settings(LOGIN_THROTTLE_IP_BURST=1000, LOGIN_THROTTLE_MATRICULA_BURST=1000)
+class ClaimsSnapshotTests(TransactionTestCase):
+    """Login e refresh não podem emitir claims de um snapshot desatualizado."""
+    databases = '__all__'
+    password = 'senha-forte-123'
+
+    def setUp(self):
+        cache.clear()
+        self.jogador = Group.objects.create(name='Jogador')
+        self.user = User.objects.create_user(
+            matricula='20200000000001', email='org@ifrn.edu.br', nome='Organizador',
+            campus='CN', password=self.password)
+        self.user.groups.add(self.jogador)
+        # Login: o snapshot fica no cache e é reaproveitado pelo refresh.
+        self.tokens = self._login().json()
+
+    def _login(self):
+        return self.client.post(
+            '/api/v1/auth/token/', {'matricula': self.user.matricula, 'password': self.password},
+            content_type='application/json')
+
+    def _refresh(self):
+        return self.client.post(
+            '/api/v1/auth/token/refresh/', {'refresh': self.tokens['refresh']},
+            content_type='application/json')
+
+    def test_profile_change_reaches_login_and_refresh(self):
+        self.user.nome = 'Novo Nome'
+        self.user.campus = 'PF'
+        self.user.save()
+
+        for response in (self._refresh(), self._login()):
+            claims = _claims(response.json()['access'])
+            self.assertEqual((claims['nome'], claims['campus']), ('Novo Nome', 'PF'))
+
+    def test_group_changes_reach_refresh(self):
+        organizador = Group.objects.create(name='Organizador')
+        self.user.groups.add(organizador)
+        self.assertCountEqual(
+            _claims(self._refresh().json()['access'])['groups'], ['Jogador', 'Organizador'])
+
+        self.jogador.user_set.remove(self.user)  # pelo lado do grupo
+        self.assertEqual(_claims(self._refresh().json()['access'])['groups'], ['Organizador'])
+
+    def test_clearing_a_group_reaches_refresh(self):
+        self.assertEqual(_claims(self._refresh().json()['access'])['groups'], ['Jogador'])
+
+        self.jogador.user_set.clear()
+
+        self.assertEqual(_claims(self._refresh().json()['access'])['groups'], [])
+        self.assertEqual(_claims(self._login().json()['access'])['groups'], [])
+
+    def test_deactivated_user_cannot_refresh_or_login(self):
+        self.user.is_active = False
+        self.user.save()
+
+        response = self._refresh()
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['code'], 'no_active_account')
+        # O ModelBackend já recusa contas inativas no authenticate().
+        self.assertEqual(self._login().status_code, 401)
+
+    def test_deleted_user_cannot_refresh(self):
+        self.user.delete()
+
+        self.assertEqual(self._refresh().status_code, 401)
+
+
+class AccountStatusAuthenticationTests(TransactionTestCase):
+    """Tokens de contas desativadas ou apagadas são recusados, como no JWTAuthentication."""
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            matricula='20200000000001', email='org@ifrn.edu.br', nome='Organizador')
+        self.user.groups.add(Group.objects.create(name='Organizador'))
+        self.auth = {'Authorization': f"Bearer {get_tokens_for_user(self.user)['access']}"}
+
+    def assertRejected(self, code):
+        for response in (
+            self.client.get('/api/v1/auth/users/list/', headers=self.auth),
+            self.client.post('/api/v1/auth/logout/', headers=self.auth),
+        ):
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response.json()['code'], code)
+
+    def test_active_user_is_accepted(self):
+        response = self.client.get('/api/v1/auth/users/list/', headers=self.auth)
+        self.assertEqual(response.status_code, 200)
+
+    def test_deactivated_user(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertRejected('user_inactive')
+
+    def test_deactivated_user_with_a_cold_cache(self):
+        # update() não dispara sinais: só a leitura do banco percebe a mudança.
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        cache.clear()
+        self.assertRejected('user_inactive')
+
+    def test_deleted_user(self):
+        self.user.delete()
+        self.assertRejected('user_not_found')
+
+
+def _suap_defaults(nome='Aluno'):
+    return {
+        'email': 'aluno@escolar.ifrn.edu.br', 'nome': nome, 'campus': 'CN', 'foto': '',
+        'sexo': 'M', 'tipo_usuario': 'Aluno', 'curso': 'Informática', 'situacao': 'Matriculado',
+        'data_nascimento': '2005-10-20',
+    }
+
+
+class SuapUpsertStatementTests(SimpleTestCase):
+    """O SQL do upsert montado para o PostgreSQL, sem precisar de um servidor."""
+
+    def setUp(self):
+        self.connection = PostgresDatabaseWrapper({
+            'ENGINE': 'django.db.backends.postgresql', 'NAME': 'auth', 'USER': '', 'PASSWORD': '',
+            'HOST': '', 'PORT': '', 'OPTIONS': {}, 'TIME_ZONE': None, 'CONN_MAX_AGE': 0,
+            'CONN_HEALTH_CHECKS': False, 'AUTOCOMMIT': True, 'ATOMIC_REQUESTS': False, 'TEST': {},
+        })
+        self.sql, self.params = User.objects._suap_upsert_statement(
+            self.connection, '20240000000001', _suap_defaults(), 'f' * 64, 'Jogador')
+        self.sql = ' '.join(self.sql.split())
+
+    def test_conflict_only_rewrites_suap_fields_when_the_fingerprint_changed(self):
+        table = User._meta.db_table
+        quote = self.connection.ops.quote_name
+        set_clause = self.sql.split('DO UPDATE SET ')[1].split(' WHERE ')[0]
+
+        self.assertIn(f'INSERT INTO {quote(table)} (', self.sql)
+        self.assertIn('ON CONFLICT ("matricula") DO UPDATE SET', self.sql)
+        self.assertEqual(
+            set_clause.split(', '),
+            [f'{quote(name)} = EXCLUDED.{quote(name)}'
+             for name in [*_suap_defaults(), 'suap_fingerprint']])
+        # Um novo login não pode desfazer permissões nem reativar a conta.
+        for column in ('password', 'is_staff', 'is_superuser', 'is_active'):
+            self.assertNotIn(quote(column), set_clause)
+        self.assertIn(
+            f'WHERE {quote(table)}."suap_fingerprint" IS DISTINCT FROM EXCLUDED."suap_fingerprint"',
+            self.sql)
+        self.assertIn('(xmax = 0) AS created', self.sql)
+
+    def test_parameters_match_the_placeholders(self):
+        self.assertEqual(self.sql.count('%s'), len(self.params))
+        self.assertEqual(self.params[0], '20240000000001')
+        self.assertIn(datetime.date(2005, 10, 20), self.params)
+        self.assertIn('f' * 64, self.params)
+        self.assertEqual(self.params[-2:], ['20240000000001', 'Jogador'])
+
+
+@skipUnless(settings.DATABASES['default']['ENGINE'].endswith('postgresql'),
+            "exercita o INSERT ... ON CONFLICT do PostgreSQL "
+            "(rode com --settings=auth_service.settings)")
+class SuapUpsertPostgresTests(TransactionTestCase):
+    matricula = '20240000000001'
+
+    def setUp(self):
+        self.jogador = Group.objects.create(name='Jogador')
+        cache.clear()
+
+    def _groups(self):
+        return list(User.objects.get(matricula=self.matricula).groups.values_list('name', flat=True))
+
+    def test_first_login_inserts_the_user_with_the_default_group(self):
+        user, created = User.objects.upsert_from_suap(self.matricula, _suap_defaults())
+
+        self.assertTrue(created)
+        self.assertTrue(user.written)
+        self.assertEqual(user.added_group_id, self.jogador.pk)
+        stored = User.objects.get(matricula=self.matricula)
+        self.assertEqual((stored.nome, stored.campus), ('Aluno', 'CN'))
+        self.assertEqual(len(stored.suap_fingerprint), 64)
+        self.assertEqual(self._groups(), ['Jogador'])
+
+    def test_unchanged_profile_is_not_rewritten(self):
+        User.objects.upsert_from_suap(self.matricula, _suap_defaults())
+        saved = mock.Mock()
+        post_save.connect(saved, sender=User)
+        self.addCleanup(post_save.disconnect, saved, sender=User)
+
+        user, created = User.objects.upsert_from_suap(self.matricula, _suap_defaults())
+
+        self.assertFalse(created)
+        self.assertFalse(user.written)
+        self.assertIsNone(user.added_group_id)
+        saved.assert_not_called()
+
+    def test_changed_profile_is_updated_and_invalidates_caches(self):
+        first, _ = User.objects.upsert_from_suap(self.matricula, _suap_defaults())
+        fingerprint = User.objects.get(matricula=self.matricula).suap_fingerprint
+        self.assertEqual(get_user_claims(first)['nome'], 'Aluno')
+
+        user, created = User.objects.upsert_from_suap(self.matricula, _suap_defaults('Aluno Novo'))
+
+        self.assertFalse(created)
+        self.assertTrue(user.written)
+        stored = User.objects.get(matricula=self.matricula)
+        self.assertEqual(stored.nome, 'Aluno Novo')
+        self.assertNotEqual(stored.suap_fingerprint, fingerprint)
+        self.assertEqual(get_user_claims(stored)['nome'], 'Aluno Novo')
+
+    def test_default_group_only_for_users_without_groups(self):
+        organizador = Group.objects.create(name='Organizador')
+        User.objects.create_user(
+            matricula=self.matricula, email='org@ifrn.edu.br', nome='Org').groups.add(organizador)
+        User.objects.upsert_from_suap(self.matricula, _suap_defaults())
+        self.assertEqual(self._groups(), ['Organizador'])
+
+        User.objects.get(matricula=self.matricula).groups.clear()
+        user, _ = User.objects.upsert_from_suap(self.matricula, _suap_defaults())
+        self.assertEqual(user.added_group_id, self.jogador.pk)
+        self.assertEqual(self._groups(), ['Jogador'])
+
+    def test_concurrent_first_login_returns_the_row_of_the_other_transaction(self):
+        inserted = threading.Event()
+
+        def other_worker():
+            try:
+                with transaction.atomic():
+                    User.objects.upsert_from_suap(self.matricula, _suap_defaults())
+                    inserted.set()
+                    time.sleep(0.3)  # o upsert abaixo espera por este commit
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=other_worker)
+        thread.start()
+        self.assertTrue(inserted.wait(5))
+        user, created = User.objects.upsert_from_suap(self.matricula, _suap_defaults())
+        thread.join()
+
+        self.assertFalse(created)
+        self.assertEqual(user.pk, User.objects.get(matricula=self.matricula).pk)
+        self.assertEqual(self._groups(), ['Jogador'])
+
+
+class StatelessRoutesTests(TransactionTestCase):
+    def test_api_routes_skip_session_and_django_auth(self):
+        response = self.client.get('/.well-known/jwks.json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(hasattr(response.wsgi_request, 'session'))
+        self.assertFalse(hasattr(response.wsgi_request, '_messages'))
+        self.assertNotIn('csrftoken', response.cookies)
+
+    def test_admin_keeps_session_and_csrf(self):
+        User.objects.create_superuser(
+            matricula='20200000000001', email='admin@ifrn.edu.br', nome='Admin',
+            password='senha-forte-123')
+        client = self.client_class(enforce_csrf_checks=True)
+
+        self.assertEqual(client.post('/admin/login/', {}).status_code, 403)
+        self.assertIn('csrftoken', client.get('/admin/login/').cookies)
+        self.assertTrue(client.login(matricula='20200000000001', password='senha-forte-123'))
+        self.assertEqual(client.get('/admin/').status_code, 200)
+
+
+class UserDetailETagTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.jogador = Group.objects.create(name='Jogador')
+        self.user = User.objects.create_user(
+            matricula='20240000000001', email='aluno@escolar.ifrn.edu.br', nome='Aluno', campus='CN')
+        self.user.groups.add(self.jogador)
+        self.url = f'/api/v1/auth/users/{self.user.matricula}/'
+
+    def _get(self, etag=None):
+        return self.client.get(self.url, headers={'If-None-Match': etag} if etag else {})
+
+    def _assertChanged(self, etag):
+        response = self._get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response.json()
+
+    def test_etag_and_conditional_get(self):
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        etag = response['ETag']
+        self.assertEqual(etag, compute_etag(response.json()))
+
+        for if_none_match in (etag, f'W/{etag}', f'"outro", {etag}', '*'):
+            with self.assertNumQueries(0):
+                not_modified = self._get(if_none_match)
+            self.assertEqual(not_modified.status_code, 304, if_none_match)
+            self.assertEqual(not_modified['ETag'], etag)
+            self.assertEqual(not_modified.content, b'')
+
+        self.assertEqual(self._get('"outro"').status_code, 200)
+        self.assertEqual(self.client.get('/api/v1/auth/users/00000000/').status_code, 404)
+
+    def test_profile_change_invalidates_the_payload(self):
+        etag = self._get()['ETag']
+        self.user.nome = 'Aluno Renomeado'
+        self.user.save()
+
+        self.assertEqual(self._assertChanged(etag)['nome'], 'Aluno Renomeado')
+
+    def test_group_changes_invalidate_the_payload(self):
+        organizador = Group.objects.create(name='Organizador')
+        etag = self._get()['ETag']
+
+        self.user.groups.add(organizador)
+        self.assertEqual(self._assertChanged(etag)['groups'], ['Jogador', 'Organizador'])
+
+        etag = self._get()['ETag']
+        self.jogador.user_set.remove(self.user)
+        self.assertEqual(self._assertChanged(etag)['groups'], ['Organizador'])
+
+    def test_renamed_or_deleted_group_invalidates_the_payload(self):
+        etag = self._get()['ETag']
+        self.jogador.name = 'Atleta'
+        self.jogador.save()
+        self.assertEqual(self._assertChanged(etag)['groups'], ['Atleta'])
+
+        etag = self._get()['ETag']
+        self.jogador.delete()
+        self.assertEqual(self._assertChanged(etag)['groups'], [])
+
+
+@override_settings(LOGIN_THROTTLE_IP_BURST=3, LOGIN_THROTTLE_IP_PER_MINUTE=1,
+                   LOGIN_THROTTLE_MATRICULA_BURST=2, LOGIN_THROTTLE_MATRICULA_PER_MINUTE=1)
+class LoginThrottleTests(SimpleTestCase):
+    """As tentativas além da taxa recebem 429 antes de chegar ao hash da senha."""
+
+    def setUp(self):
+        store_patcher = mock.patch('user.throttling._store', LocalBucketStore())
+        store_patcher.start()
+        self.addCleanup(store_patcher.stop)
+        authenticate_patcher = mock.patch('user.views.authenticate', return_value=None)
+        self.authenticate = authenticate_patcher.start()
+        self.addCleanup(authenticate_patcher.stop)
+
+    def _login(self, matricula, ip='203.0.113.1', forwarded_for=None):
+        headers = {'X-Forwarded-For': forwarded_for} if forwarded_for else {}
+        return self.client.post(
+            '/api/v1/auth/token/', {'matricula': matricula, 'password': 'errada'},
+            content_type='application/json', headers=headers, REMOTE_ADDR=ip)
+
+    def test_ip_bucket_exhaustion(self):
+        for i in range(3):
+            self.assertEqual(self._login(f'2024{i:010d}').status_code, 401)
+
+        response = self._login('20249999999999')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertEqual(self.authenticate.call_count, 3)
+        # Outro IP tem o seu próprio bucket.
+        self.assertEqual(self._login('20249999999999', ip='203.0.113.2').status_code, 401)
+
+    def test_matricula_bucket_is_shared_across_ips(self):
+        self.assertEqual(self._login('20240000000001', ip='203.0.113.1').status_code, 401)
+        self.assertEqual(self._login(' 20240000000001 ', ip='203.0.113.2').status_code, 401)
+        self.assertEqual(self._login('20240000000001', ip='203.0.113.3').status_code, 429)
+        # Outra matrícula, do mesmo IP, ainda passa.
+        self.assertEqual(self._login('20240000000002', ip='203.0.113.3').status_code, 401)
+
+    def test_blocked_ip_does_not_drain_the_matricula_bucket(self):
+        for i in range(3):
+            self._login(f'2024{i:010d}', ip='198.51.100.1')
+        for _ in range(5):
+            self.assertEqual(self._login('20240000000009', ip='198.51.100.1').status_code, 429)
+
+        self.assertEqual(self._login('20240000000009', ip='203.0.113.1').status_code, 401)
+
+    def test_spoofed_forwarded_for_is_ignored_by_default(self):
+        for i in range(3):
+            self._login(f'2024{i:010d}', forwarded_for=f'10.0.0.{i}')
+        response = self._login('20249999999999', forwarded_for='10.0.0.99')
+        self.assertEqual(response.status_code, 429)
+
+    def test_only_the_trusted_proxy_hops_are_read(self):
+        rest_framework = {**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}
+        with override_settings(REST_FRAMEWORK=rest_framework):
+            # O proxy acrescenta o IP real ao fim; o início é do cliente.
+            for i in range(3):
+                self._login(f'2024{i:010d}', ip='10.0.0.1', forwarded_for=f'1.1.1.{i}, 198.51.100.7')
+            blocked = self._login('20249999999999', ip='10.0.0.1',
+                                  forwarded_for='1.1.1.99, 198.51.100.7')
+            other_client = self._login('20249999999999', ip='10.0.0.1', forwarded_for='198.51.100.8')
+
+        self.assertEqual(blocked.status_code, 429)
+        self.assertEqual(other_client.status_code, 401)
+
+    def test_redis_outage_falls_back_to_local_buckets(self):
+        store = RedisBucketStore('redis://127.0.0.1:1/0', fallback=LocalBucketStore())
+
+        with mock.patch('builtins.print') as printed:
+            results = [store.consume('throttle:login:ip:203.0.113.1', 2, 1 / 60)[0] for _ in range(3)]
+
+        self.assertEqual(results, [True, True, False])
+        printed.assert_called_once()
+        self.assertIn('AVISO: Redis indisponível', printed.call_args.args[0])
+
+
+class ImportUsersCommandTests(TransactionTestCase):
+    databases = '__all__'
+    header = 'matricula,email,nome,campus,curso,data_nascimento\n'
+
+    def setUp(self):
+        cache.clear()
+        self.jogador = Group.objects.create(name='Jogador')
+        self.organizador = Group.objects.create(name='Organizador')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.directory = directory
+
+    def _import(self, contents, name='roster.csv', **options):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as roster:
+            roster.write(contents)
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command('import_users', path, stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def _memberships(self):
+        return sorted(User.groups.through.objects.values_list('user__matricula', 'group__name'))
+
+    def test_fresh_import(self):
+        stdout, _ = self._import(
+            self.header
+            + '20240000000001,Aluno1@Escolar.IFRN.edu.br,Aluno Um,CN,Informática,2005-03-09\n'
+            + '20240000000002,aluno2@escolar.ifrn.edu.br, Aluno Dois ,,,\n')
+
+        self.assertIn('2 usuários importados', stdout)
+        um = User.objects.get(matricula='20240000000001')
+        self.assertEqual(um.email, 'Aluno1@escolar.ifrn.edu.br')
+        self.assertEqual(um.data_nascimento, datetime.date(2005, 3, 9))
+        self.assertEqual(um.curso, 'Informática')
+        self.assertFalse(um.check_password(''))
+        dois = User.objects.get(matricula='20240000000002')
+        self.assertEqual(dois.nome, 'Aluno Dois')
+        self.assertIsNone(dois.campus)
+        self.assertIsNone(dois.data_nascimento)
+        self.assertEqual(self._memberships(), [
+            ('20240000000001', 'Jogador'), ('20240000000002', 'Jogador')])
+
+    def test_reimport_is_idempotent_and_applies_changes(self):
+        roster = self.header + ''.join(
+            f'2024{i:010d},aluno{i}@escolar.ifrn.edu.br,Aluno {i},CN,,\n' for i in range(5))
+        self._import(roster)
+        ids = dict(User.objects.values_list('matricula', 'id'))
+        memberships = self._memberships()
+
+        for chunk_size in (5000, 2):
+            self._import(roster, chunk_size=chunk_size)
+            self.assertEqual(dict(User.objects.values_list('matricula', 'id')), ids)
+            self.assertEqual(self._memberships(), memberships)
+
+        self._import(roster.replace('Aluno 3,CN', 'Aluno Três,AP'), chunk_size=2)
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(
+            User.objects.values_list('nome', 'campus').get(matricula='20240000000003'),
+            ('Aluno Três', 'AP'))
+
+    def test_existing_users_keep_their_groups_and_caches_are_invalidated(self):
+        organizador = User.objects.create_user(
+            matricula='20240000000001', email='org@ifrn.edu.br', nome='Organizador', campus='CN')
+        organizador.groups.add(self.organizador)
+        sem_grupo = User.objects.create_user(
+            matricula='20240000000002', email='aluno@escolar.ifrn.edu.br', nome='Sem Grupo')
+        get_user_claims(organizador)
+        self.client.get('/api/v1/auth/users/20240000000001/')
+
+        self._import(
+            self.header
+            + '20240000000001,org@ifrn.edu.br,Organizador Renomeado,CN,,\n'
+            + '20240000000002,aluno@escolar.ifrn.edu.br,Sem Grupo,,,\n'
+            + '20240000000003,novo@escolar.ifrn.edu.br,Novo,,,\n',
+            group='Organizador')
+
+        self.assertEqual(self._memberships(), [
+            ('20240000000001', 'Organizador'), ('20240000000002', 'Organizador'),
+            ('20240000000003', 'Organizador')])
+        organizador.refresh_from_db()
+        self.assertEqual(get_user_claims(organizador)['nome'], 'Organizador Renomeado')
+        self.assertEqual(
+            self.client.get('/api/v1/auth/users/20240000000001/').json()['nome'],
+            'Organizador Renomeado')
+        self.assertEqual(User.objects.get(pk=sem_grupo.pk).nome, 'Sem Grupo')
+
+    def test_missing_and_blank_columns_keep_the_stored_values(self):
+        User.objects.upsert_from_suap('20240000000001', _suap_defaults())
+
+        stdout, _ = self._import(
+            'matricula,email,nome,campus\n'
+            '20240000000001,aluno@escolar.ifrn.edu.br,Aluno Renomeado,\n'
+            '20240000000002,novo@escolar.ifrn.edu.br,Novo,PF\n')
+
+        self.assertIn('2 usuários importados', stdout)
+        stored = User.objects.get(matricula='20240000000001')
+        self.assertEqual(stored.nome, 'Aluno Renomeado')
+        self.assertEqual(
+            (stored.campus, stored.sexo, stored.situacao, stored.curso, stored.data_nascimento),
+            ('CN', 'M', 'Matriculado', 'Informática', datetime.date(2005, 10, 20)))
+        novo = User.objects.get(matricula='20240000000002')
+        self.assertEqual((novo.campus, novo.sexo, novo.foto), ('PF', None, None))
+
+    def test_malformed_rows_are_skipped(self):
+        valid = {'matricula': 20240000000001, 'email': 'aluno@escolar.ifrn.edu.br', 'nome': 'Aluno'}
+        lines = [
+            json.dumps(valid),
+            '{"matricula": "20240000000002", "email": ',
+            json.dumps({'matricula': '20240000000003', 'nome': 'Sem Email'}),
+            json.dumps({**valid, 'matricula': '20240000000004', 'data_nascimento': '31/02/2005'}),
+            json.dumps(['20240000000005', 'lista@escolar.ifrn.edu.br', 'Lista']),
+            json.dumps({**valid, 'matricula': '20240000000006', 'campus': 'X' * 151}),
+            '',
+            json.dumps({**valid, 'matricula': '20240000000007', 'nome': 'Depois dos Erros'}),
+        ]
+        stdout, stderr = self._import('\n'.join(lines) + '\n', name='roster.jsonl')
+
+        self.assertEqual(
+            sorted(User.objects.values_list('matricula', flat=True)),
+            ['20240000000001', '20240000000007'])
+        self.assertIn('2 usuários importados', stdout)
+        self.assertIn('5 linha(s) ignorada(s)', stdout)
+        self.assertEqual(stderr.count('AVISO: Linha ignorada'), 5)
+
+    def test_repeated_matricula_keeps_the_last_row(self):
+        self._import(
+            self.header
+            + '20240000000001,aluno@escolar.ifrn.edu.br,Primeira,CN,,\n'
+            + '20240000000001,aluno@escolar.ifrn.edu.br,Última,CN,,\n')
+        self.assertEqual(User.objects.get().nome, 'Última')
+
+    def test_unknown_group(self):
+        with self.assertRaisesMessage(CommandError, "O grupo 'Inexistente' não foi encontrado."):
+            self._import(self.header, group='Inexistente')
+
+
+def _cursor(value):
+    return base64.urlsafe_b64encode(value.encode('utf-8')).decode('ascii')
+
+
+class UserListPaginationTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        for i, campus in enumerate(['CN', None, 'AP', 'CN', None, 'CN', 'AP', None]):
+            User.objects.create_user(
+                matricula=f'2024{i:010d}', email=f'aluno{i}@escolar.ifrn.edu.br',
+                nome=f'Aluno {i}', campus=campus, tipo_usuario='Aluno' if i % 2 else 'Servidor')
+        organizador = User.objects.create_user(
+            matricula='20200000000001', email='org@ifrn.edu.br', nome='Organizador', campus='CN')
+        organizador.groups.add(Group.objects.create(name='Organizador'))
+        self.auth = {'Authorization': f"Bearer {get_tokens_for_user(organizador)['access']}"}
+
+    def _expected(self, **filters):
+        users = User.objects.filter(**filters)
+        # Campus em ordem, empates pelo id e usuários sem campus por último.
+        return [user.matricula for user in sorted(
+            users, key=lambda user: (user.campus is None, user.campus or '', user.id))]
+
+    def _walk(self, page_size, **params):
+        url = '/api/v1/auth/users/list/?' + urlencode({**params, 'page_size': page_size})
+        matriculas = []
+        while url:
+            response = self.client.get(url, headers=self.auth)
+            self.assertEqual(response.status_code, 200, response.content)
+            page = response.json()
+            self.assertLessEqual(len(page['results']), page_size)
+            matriculas += [user['matricula'] for user in page['results']]
+            url = page['next']
+        return matriculas
+
+    def test_cursor_round_trip_visits_every_user_once_in_order(self):
+        expected = self._expected()
+        # Tamanhos que cortam as páginas no meio dos empates e na passagem
+        # para os usuários sem campus.
+        for page_size in (1, 2, 3, 4, 100):
+            self.assertEqual(self._walk(page_size), expected, page_size)
+
+    def test_filters_are_kept_across_pages(self):
+        self.assertEqual(self._walk(1, campus='CN'), self._expected(campus='CN'))
+        self.assertEqual(self._walk(2, tipo_usuario='Aluno'), self._expected(tipo_usuario='Aluno'))
+
+    def test_cursor_inside_the_users_without_campus(self):
+        sem_campus = list(User.objects.filter(campus__isnull=True).order_by('id'))
+        response = self.client.get(
+            '/api/v1/auth/users/list/', {'cursor': _cursor(json.dumps([None, sem_campus[0].id]))},
+            headers=self.auth)
+        self.assertEqual(
+            [user['matricula'] for user in response.json()['results']],
+            [user.matricula for user in sem_campus[1:]])
+
+    def test_tampered_cursor_is_a_bad_request(self):
+        for cursor in (
+            'não-é-base64', _cursor('não é json'), _cursor('{"campus": "CN"}'), _cursor('5'),
+            _cursor('["CN", 1, 2]'), _cursor('[1, 1]'), _cursor('["CN", "1"]'),
+            _cursor('["CN", 1.5]'), _cursor('["CN", true]'), _cursor('["CN", Infinity]'),
+            _cursor(f'["CN", {2 ** 64}]'), _cursor('["C\\u0000N", 1]'),
+        ):
+            response = self.client.get(
+                '/api/v1/auth/users/list/', {'cursor': cursor}, headers=self.auth)
+            self.assertEqual(response.status_code, 400, cursor)
+            self.assertEqual(response.json(), {'detail': 'Cursor inválido.'})
+
+
+class UserListPermissionTests(TransactionTestCase):
+    """A listagem expõe dados pessoais de todos os usuários: só organizadores e equipe."""
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.organizador = Group.objects.create(name='Organizador')
+        self.user = User.objects.create_user(
+            matricula='20240000000001', email='aluno@escolar.ifrn.edu.br', nome='Aluno')
+        self.user.groups.add(Group.objects.create(name='Jogador'))
+        self.auth = {'Authorization': f"Bearer {get_tokens_for_user(self.user)['access']}"}
+
+    def _list(self):
+        return self.client.get('/api/v1/auth/users/list/', headers=self.auth)
+
+    def test_regular_user_is_forbidden(self):
+        self.assertEqual(self._list().status_code, 403)
+        self.assertEqual(self.client.get('/api/v1/auth/users/list/').status_code, 401)
+
+    def test_staff_is_allowed(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self._list().status_code, 200)
+
+    def test_group_changes_apply_to_tokens_already_issued(self):
+        self.user.groups.add(self.organizador)
+        self.assertEqual(self._list().status_code, 200)
+
+        self.organizador.user_set.remove(self.user)
+        self.assertEqual(self._list().status_code, 403)
+
+
+class MatriculaValidationTests(TransactionTestCase):
+    """A validação de matrículas acompanha criações e remoções feitas por qualquer worker."""
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            matricula='20240000000001', email='aluno@escolar.ifrn.edu.br', nome='Aluno')
+        matricula_index.build()
+
+    def _validate(self, *matriculas):
+        return self.client.post(
+            '/api/v1/auth/users/', {'user_ids': list(matriculas)}, content_type='application/json')
+
+    def test_new_user_is_valid_right_away(self):
+        novo = User.objects.create_user(
+            matricula='20240000000002', email='novo@escolar.ifrn.edu.br', nome='Novo')
+
+        response = self._validate(self.user.matricula, novo.matricula)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.json()['valid_ids']), [self.user.matricula, novo.matricula])
+
+    def test_deleted_user_is_rejected(self):
+        self.user.delete()
+
+        response = self._validate(self.user.matricula)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['invalid_ids'], [self.user.matricula])
+
+    def test_renamed_user_is_validated_by_the_new_matricula(self):
+        antiga = self.user.matricula
+        self.user.matricula = '20240000000009'
+        self.user.save()
+
+        response = self._validate(antiga, self.user.matricula)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['valid_ids'], [self.user.matricula])
+        self.assertEqual(response.json()['invalid_ids'], [antiga])
+
+    def test_changes_from_another_worker_are_seen(self):
+        worker_a, worker_b = MatriculaIndex(sync_interval=0), MatriculaIndex(sync_interval=0)
+        worker_a.build()
+        worker_b.build()
+        # Sem sinais: as mudanças chegam ao worker B só pelo log no cache.
+        User.objects.bulk_create([User(
+            matricula='20240000000003', email='outro@escolar.ifrn.edu.br', nome='Outro')])
+        User.objects.filter(pk=self.user.pk).update(matricula='20240000000009')
+        worker_a.record_added('20240000000003', '20240000000009')
+        worker_a.record_removed(self.user.matricula)
+
+        with self.assertNumQueries(0):
+            found, missing = worker_b.partition(
+                [self.user.matricula, '20240000000003', '20240000000009'])
+        self.assertEqual(found, {'20240000000003', '20240000000009'})
+        self.assertEqual(missing, {self.user.matricula})
+
+    def test_index_is_rebuilt_when_the_log_is_lost(self):
+        worker = MatriculaIndex(sync_interval=0)
+        worker.build()
+        User.objects.bulk_create([User(
+            matricula='20240000000003', email='outro@escolar.ifrn.edu.br', nome='Outro')])
+        cache.clear()
+
+        found, _ = worker.partition(['20240000000003'])
+        self.assertEqual(found, {'20240000000003'})
+
+
+class UserReadSerializerTests(TransactionTestCase):
+    """O serializer compilado produz exatamente a saída do UserSerializer."""
+    databases = '__all__'
+
+    def setUp(self):
+        jogador = Group.objects.create(name='Jogador')
+        organizador = Group.objects.create(name='Organizador')
+        completo = User.objects.create_user(
+            matricula='20240000000001', email='aluno@escolar.ifrn.edu.br', nome='Aluno Completo',
+            campus='CN', foto='https://suap.ifrn.edu.br/media/fotos/aluno.jpg', sexo='F',
+            tipo_usuario='Aluno', curso='Informática', situacao='Matriculado',
+            data_nascimento=datetime.date(2005, 3, 9), is_staff=True)
+        completo.groups.add(organizador, jogador)
+        # Só os campos obrigatórios: todos os opcionais ficam nulos.
+        self.minimo = User.objects.create_user(
+            matricula='20240000000002', email='outro@escolar.ifrn.edu.br', nome='Aluno Mínimo')
+        inativo = User.objects.create_user(
+            matricula='20240000000003', email='inativo@escolar.ifrn.edu.br', nome='Aluno Inativo',
+            campus='MO', is_active=False)
+        inativo.groups.add(jogador)
+        self.queryset = User.objects.order_by('id')
+
+    def _expected(self):
+        return [dict(data) for data in UserSerializer(self.queryset, many=True).data]
+
+    def test_matches_user_serializer(self):
+        expected = self._expected()
+        self.assertIsNone(expected[1]['data_nascimento'])
+        self.assertEqual(expected[1]['groups'], [])
+
+        self.assertEqual(user_read_serializer.many(self.queryset), expected)
+        self.assertEqual(user_read_serializer.many(self.queryset, chunk_size=1), expected)
+        self.assertEqual(async_to_sync(user_read_serializer.amany)(self.queryset, chunk_size=2), expected)
+        self.assertEqual(
+            [user_read_serializer.from_instance(user) for user in self.queryset], expected)
+        self.assertEqual(
+            user_read_serializer.one(self.queryset.filter(pk=self.minimo.pk)), expected[1])
+        self.assertEqual(
+            async_to_sync(user_read_serializer.aone)(self.queryset.filter(pk=self.minimo.pk)),
+            expected[1])
+
+    def test_missing_user(self):
+        self.assertIsNone(user_read_serializer.one(User.objects.none()))
+        self.assertIsNone(async_to_sync(user_read_serializer.aone)(User.objects.none()))
+        self.assertEqual(user_read_serializer.many(User.objects.none()), [])
+
+
+class BulkLookupStreamingTests(TransactionTestCase):
+    """As respostas em streaming do by-ids trazem os mesmos usuários da resposta comum."""
+    databases = '__all__'
+
+    def setUp(self):
+        jogador = Group.objects.create(name='Jogador')
+        organizador = Group.objects.create(name='Organizador')
+        self.users = [
+            User.objects.create_user(
+                matricula=f'2024{i:010d}', email=f'aluno{i}@escolar.ifrn.edu.br',
+                nome=f'Aluno {i}', campus='CN' if i % 2 else None)
+            for i in range(5)
+        ]
+        for user in self.users[:4]:
+            user.groups.add(jogador)
+        self.users[0].groups.add(organizador)
+        # Repetida e inexistente: nenhuma das duas aparece na resposta.
+        self.ids = [user.matricula for user in self.users] + [self.users[0].matricula, '00000000']
+
+    def _post(self, path='/api/v1/auth/users/by-ids/', **kwargs):
+        return self.client.post(path, {'ids': self.ids}, content_type='application/json', **kwargs)
+
+    def _by_matricula(self, users):
+        return {user['matricula']: user for user in users}
+
+    def test_formats_return_the_same_users(self):
+        # Lotes menores que a lista: os grupos são carregados a cada lote.
+        with mock.patch('user.views.BULK_LOOKUP_CHUNK_SIZE', 2):
+            expected = self._post()
+            ndjson = self._post(headers={'Accept': 'application/x-ndjson'})
+            array = self._post('/api/v1/auth/users/by-ids/?stream=true')
+
+        self.assertEqual(expected.status_code, 200)
+        expected = self._by_matricula(expected.json())
+        self.assertEqual(len(expected), 5)
+        self.assertEqual(expected[self.users[0].matricula]['groups'], ['Jogador', 'Organizador'])
+        self.assertEqual(expected[self.users[4].matricula]['groups'], [])
+
+        self.assertTrue(ndjson.streaming)
+        self.assertEqual(ndjson['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(ndjson.streaming_content).decode().splitlines()
+        self.assertEqual(self._by_matricula(json.loads(line) for line in lines), expected)
+        self.assertEqual(len(lines), 5)
+
+        self.assertTrue(array.streaming)
+        self.assertEqual(array['Content-Type'], 'application/json')
+        users = json.loads(b''.join(array.streaming_content))
+        self.assertEqual(self._by_matricula(users), expected)
+        self.assertEqual(len(users), 5)
+
+    def test_empty_result_streams_valid_documents(self):
+        self.ids = ['00000000']
+        ndjson = self._post(headers={'Accept': 'application/x-ndjson'})
+        array = self._post('/api/v1/auth/users/by-ids/?stream=true')
+
+        self.assertEqual(b''.join(ndjson.streaming_content), b'')
+        self.assertEqual(json.loads(b''.join(array.streaming_content)), [])
+
+
+# Consultas ao banco por requisição, com os caches de usuário frios. Aumentar
+# um destes números deve ser uma decisão consciente: em geral é um N+1 novo.
+QUERY_BUDGETS = {
+    'login': 2,
+    'refresh': 2,
+    'suap_callback': 2,
+    # Fora do PostgreSQL o upsert do login pelo SUAP usa o ORM.
+    'suap_callback_orm': 5,
+    'me': 2,
+    'detail': 2,
+    'by_ids': 2,
+    'validate': 0,
+    # Autenticação com o snapshot de claims frio (usuário + grupos) e a página.
+    'list': 4,
+}
+
+
+class QueryBudgetTests(TransactionTestCase):
+    databases = '__all__'
+    password = 'senha-forte-123'
+
+    def setUp(self):
+        jogador = Group.objects.create(name='Jogador')
+        self.users = [
+            User.objects.create_user(
+                matricula=f'2024{i:010d}', email=f'aluno{i}@escolar.ifrn.edu.br',
+                nome=f'Aluno {i}', campus='CN')
+            for i in range(10)
+        ]
+        for user in self.users:
+            user.groups.add(jogador)
+        self.organizador = User.objects.create_user(
+            matricula='20200000000001', email='org@ifrn.edu.br', nome='Organizador',
+            password=self.password)
+        self.organizador.groups.add(Group.objects.create(name='Organizador'))
+        self.tokens = get_tokens_for_user(self.organizador)
+        self.auth = {'Authorization': f"Bearer {self.tokens['access']}"}
+        self.matriculas = [user.matricula for user in self.users]
+        cache.clear()
+        matricula_index.build()
+
+    def assertQueryBudget(self, endpoint, request):
+        install_query_recorders()
+        with collect_queries() as stats:
+            response = request()
+        self.assertLess(response.status_code, 400, response.content)
+        self.assertLessEqual(
+            stats.count, QUERY_BUDGETS[endpoint],
+            f"{endpoint}: {stats.count} consultas (orçamento: {QUERY_BUDGETS[endpoint]})")
+        return response
+
+    def test_login(self):
+        self.assertQueryBudget('login', lambda: self.client.post(
+            '/api/v1/auth/token/', {'matricula': self.organizador.matricula, 'password': self.password},
+            content_type='application/json'))
+
+    def test_refresh(self):
+        self.assertQueryBudget('refresh', lambda: self.client.post(
+            '/api/v1/auth/token/refresh/', {'refresh': self.tokens['refresh']},
+            content_type='application/json'))
+
+    def test_suap_callback(self):
+        suap_client = mock.Mock()
+        suap_client.exchange_code.return_value = {'access_token': 'token'}
+        suap_client.fetch_profile.return_value = (
+            {'matricula': self.users[0].matricula, 'nome_usual': 'Aluno Atualizado',
+             'vinculo': {'campus': 'CN'}},
+            {'email': 'aluno0@escolar.ifrn.edu.br'},
+        )
+        with mock.patch('user.views.get_suap_client', return_value=suap_client), \
+                mock.patch('user.views.send_audit_log'):
+            endpoint = 'suap_callback' if connection.vendor == 'postgresql' else 'suap_callback_orm'
+            self.assertQueryBudget(endpoint, lambda: self.client.get(
+                '/auth/suap/callback/', {'code': 'codigo'}))
+
+    def test_me(self):
+        self.assertQueryBudget('me', lambda: self.client.get(
+            '/api/v1/auth/users/me/', headers=self.auth))
+
+    def test_detail(self):
+        self.assertQueryBudget('detail', lambda: self.client.get(
+            f'/api/v1/auth/users/{self.matriculas[0]}/'))
+
+    def test_by_ids_does_not_grow_with_the_batch(self):
+        self.assertQueryBudget('by_ids', lambda: self.client.post(
+            '/api/v1/auth/users/by-ids/', {'ids': self.matriculas},
+            content_type='application/json'))
+
+    def test_validate(self):
+        self.assertQueryBudget('validate', lambda: self.client.post(
+            '/api/v1/auth/users/', {'user_ids': self.matriculas},
+            content_type='application/json'))
+
+    def test_list(self):
+        self.assertQueryBudget('list', lambda: self.client.get(
+            '/api/v1/auth/users/list/', headers=self.auth))
+
+
+def _ed25519_pem():
+    return ed25519.Ed25519PrivateKey.generate().private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()).decode()
+
+
+class KeyRingSigningTests(SimpleTestCase):
+    def setUp(self):
+        self.old_key, self.new_key = load_signing_keys(_ed25519_pem() + _ed25519_pem(), 'EdDSA')
+        self.backend = KeyRingTokenBackend([self.new_key, self.old_key])
+        self.payload = {
+            'token_type': 'access', 'exp': 4102444800, 'jti': 'abc', 'iss': 'ifsports-recomeco',
+            'matricula': '20240000000001',
+        }
+
+    def test_tokens_carry_the_active_kid(self):
+        token = self.backend.encode(self.payload)
+        self.assertEqual(jwt.get_unverified_header(token)['kid'], self.new_key.kid)
+        self.assertEqual(self.backend.decode(token)['matricula'], '20240000000001')
+
+    def test_rotated_key_still_validates_and_unknown_kid_is_rejected(self):
+        rotated = KeyRingTokenBackend([self.old_key]).encode(self.payload)
+        self.assertEqual(self.backend.decode(rotated)['jti'], 'abc')
+
+        unknown = load_signing_keys(_ed25519_pem(), 'EdDSA')
+        with self.assertRaises(TokenBackendError):
+            self.backend.decode(KeyRingTokenBackend(unknown).encode(self.payload))
+
+    def test_verifier_validates_against_the_published_jwks(self):
+        verifier = TokenVerifier('http://auth.local/.well-known/jwks.json')
+        with mock.patch.object(verifier.jwks_client, 'fetch_data', return_value=self.backend.jwks()):
+            claims = verifier.verify(self.backend.encode(self.payload))
+            self.assertEqual(claims['matricula'], '20240000000001')
+            with self.assertRaises(jwt.InvalidTokenError):
+                verifier.verify(self.backend.encode({**self.payload, 'token_type': 'refresh'}))
+
+
+class SigningKeyConfigurationTests(SimpleTestCase):
+    def test_without_keys_tokens_stay_on_hs256(self):
+        for value in ('', '   '):
+            with override_settings(JWT_PRIVATE_KEYS=value):
+                self.assertIsNone(build_token_backend())
+
+    def test_configured_keys_that_do_not_load_stop_the_startup(self):
+        broken_pem = _ed25519_pem().replace('\n', '\nAAAA', 2)
+        for value, algorithm in (('chave-colada-errado', 'EdDSA'), (broken_pem, 'EdDSA'),
+                                 (_ed25519_pem(), 'RS256')):
+            with override_settings(JWT_PRIVATE_KEYS=value, JWT_ALGORITHM=algorithm), \
+                    self.assertRaises(ImproperlyConfigured):
+                build_token_backend()
+
+    def test_valid_keys_build_the_key_ring(self):
+        with override_settings(JWT_PRIVATE_KEYS=_ed25519_pem(), JWT_ALGORITHM='EdDSA'):
+            self.assertIsInstance(build_token_backend(), KeyRingTokenBackend)
+
+
+class ConnectionPoolSettingsTests(SimpleTestCase):
+    def test_db_pool_builds_the_psycopg_pool(self):
+        # As configurações são lidas na importação: roda num processo à parte.
+        script = (
+            "import django; django.setup()\n"
+            "from django.db import connections\n"
+            "pool = connections['default'].pool\n"
+            "print(type(pool).__module__, pool.min_size, pool.max_size)\n"
+        )
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'auth_service.settings',
+               'DB_POOL': 'true', 'DB_POOL_MIN_SIZE': '1', 'DB_POOL_MAX_SIZE': '4'}
+        result = subprocess.run([sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env,
+                                capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.splitlines()[-1], 'psycopg_pool.pool 1 4')
+
+
+class TokenRevocationTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        revocation_cache.clear()
+        self.exp = int(time.time()) + 600
+
+    def test_revocation_reaches_other_workers_on_sync(self):
+        worker_a, worker_b = RevocationStore(sync_interval=0), RevocationStore(sync_interval=0)
+        self.assertFalse(worker_b.is_revoked('jti-1', self.exp))
+
+        worker_a.revoke('jti-1', self.exp)
+
+        self.assertTrue(worker_b.is_revoked('jti-1', self.exp))
+        self.assertFalse(worker_b.is_revoked('jti-2', self.exp))
+        # Um worker novo recupera as revogações anteriores pelo log.
+        self.assertTrue(RevocationStore(sync_interval=0).is_revoked('jti-1', self.exp))
+
+    def test_log_entry_written_after_the_counter_is_not_lost(self):
+        worker = RevocationStore(sync_interval=0)
+        worker.is_revoked('jti-1', self.exp)
+        # Outro worker subiu o contador mas ainda não gravou a entrada do log.
+        revocation_cache.add(GENERATION_KEY, 0, None)
+        revocation_cache.incr(GENERATION_KEY)
+        self.assertFalse(worker.is_revoked('jti-1', self.exp))
+
+        revocation_cache.set('jwt:revoked:jti-1', 1, 600)
+        revocation_cache.set('jwt:revoked:log:1', ('jti-1', self.exp), 600)
+        self.assertTrue(worker.is_revoked('jti-1', self.exp))
+
+    def test_expired_entries_are_purged_from_the_local_cache(self):
+        worker = RevocationStore(sync_interval=0)
+        now = time.time()
+        for i in range(50):
+            worker.revoke(f'jti-{i}', now + 60)
+        local_keys = caches['revocation']._cache
+        self.assertGreaterEqual(len(local_keys), 100)
+
+        # Depois do fim dos tokens (e do log), sem nenhuma leitura das chaves.
+        later = now + worker._log_timeout() + 1
+        with mock.patch('user.revocation.time.time', return_value=later):
+            worker.is_revoked('outro-jti', later + 60)
+
+        self.assertEqual(list(local_keys), [revocation_cache.make_key(GENERATION_KEY)])
+
+    def test_logout_revokes_access_and_refresh_tokens(self):
+        user = User.objects.create_user(
+            matricula='20240000000001', email='aluno@escolar.ifrn.edu.br', nome='Aluno')
+        tokens = get_tokens_for_user(user)
+        auth = {'Authorization': f"Bearer {tokens['access']}"}
+
+        response = self.client.post(
+            '/api/v1/auth/logout/', {'refresh': tokens['refresh']},
+            content_type='application/json', headers=auth)
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.client.get('/api/v1/auth/users/me/', headers=auth).status_code, 401)
+        refresh = self.client.post(
+            '/api/v1/auth/token/refresh/', {'refresh': tokens['refresh']},
+            content_type='application/json')
+        self.assertEqual(refresh.status_code, 401)
+
+    def test_revocation_survives_a_full_cache(self):
+        user = User.objects.create_user(
+            matricula='20240000000001', email='aluno@escolar.ifrn.edu.br', nome='Aluno')
+        auth = {'Authorization': f"Bearer {get_tokens_for_user(user)['access']}"}
+        self.assertEqual(self.client.post('/api/v1/auth/logout/', headers=auth).status_code, 200)
+
+        # Bem além do MAX_ENTRIES (300) do LocMemCache: tanto o cache padrão
+        # quanto outras revogações enchem o cache.
+        for i in range(1000):
+            cache.set(f'user:detail:{i}', i)
+            token_revocation.revoke(f'outro-jti-{i}', self.exp)
+
+        self.assertEqual(self.client.get('/api/v1/auth/users/me/', headers=auth).status_code, 401)
+        self.assertEqual(
+            self.client.get('/api/v1/auth/users/list/', headers=auth).status_code, 401)
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.breaker = CircuitBreaker(
+            'suap', window_seconds=10, min_calls=4, error_rate=0.5, slow_call_seconds=1.0,
+            slow_call_rate=0.5, open_seconds=5, clock=lambda: self.now)
+
+    def test_opens_on_errors_and_recovers_through_a_single_probe(self):
+        for success in (True, False, True, False):
+            self.assertTrue(self.breaker.allow())
+            self.breaker.record(success, 0.1)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow())
+
+        self.now += 5
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertFalse(self.breaker.allow())  # só uma chamada de teste por vez
+        self.breaker.record(True, 0.1)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_opens_on_slow_calls_and_forgets_calls_outside_the_window(self):
+        self.breaker.record(True, 2.0)
+        self.breaker.record(True, 2.0)
+        self.now += 11
+        self.breaker.record(True, 2.0)
+        self.breaker.record(True, 0.1)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+        self.breaker.record(True, 2.0)
+        self.breaker.record(True, 0.1)
+        self.assertEqual(self.breaker.state, OPEN)
+
+
+class SuapClientPoolTests(SimpleTestCase):
+    def setUp(self):
+        for patcher in (
+            mock.patch('user.suap._client', None),
+            mock.patch('user.suap._client_pid', None),
+            mock.patch.dict('user.suap._breakers', clear=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_logins_reuse_the_keep_alive_connection(self):
+        stub = SuapStub().start()
+        self.addCleanup(stub.stop)
+        suap_client = SuapClient(base_url=stub.url)
+        self.addCleanup(suap_client.close)
+
+        for code in ('20240000000001', '20240000000002'):
+            suap_client.exchange_code(code)
+            suap_client.fetch_profile(code)
+
+        self.assertEqual(stub.requests, 6)
+        # As duas buscas de perfil correm em paralelo: no máximo duas conexões.
+        self.assertLessEqual(stub.connections, 2)
+
+    def test_client_is_shared_within_a_process_and_rebuilt_after_fork(self):
+        with mock.patch('user.suap.os.getpid', return_value=1000):
+            parent = get_suap_client()
+            self.addCleanup(parent.close)
+            self.assertIs(get_suap_client(), parent)
+
+        with mock.patch('user.suap.os.getpid', return_value=1001):
+            child = get_suap_client()
+            self.addCleanup(child.close)
+
+        self.assertIsNot(child, parent)
+        self.assertIsNot(child.session, parent.session)
+        self.assertIsNot(child.executor, parent.executor)
+
+
+@override_settings(SUAP_BREAKER_MIN_CALLS=2, SUAP_BREAKER_SLOW_CALL_SECONDS=0.2,
+                   SUAP_BREAKER_OPEN_SECONDS=60)
+class SuapOutageTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        Group.objects.create(name='Jogador')
+        self.stub = SuapStub().start()
+        self.addCleanup(self.stub.stop)
+        suap_client = SuapClient(base_url=self.stub.url)
+        self.addCleanup(suap_client.close)
+        for patcher in (
+            mock.patch('user.views.get_suap_client', return_value=suap_client),
+            mock.patch('user.views.send_audit_log'),
+            mock.patch.dict('user.suap._breakers', clear=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _login(self, matricula):
+        return self.client.get('/auth/suap/callback/', {'code': matricula})
+
+    def test_profile_failure_falls_back_to_the_stored_user(self):
+        User.objects.create_user(
+            matricula='20240000000001', email='aluno@escolar.ifrn.edu.br', nome='Nome Gravado',
+            campus='CN')
+        self.stub.configure('meus_dados', error_rate=1.0)
+
+        response = self._login('20240000000001')
+
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('userName=Nome%20Gravado', response['Location'])
+        self.assertEqual(User.objects.get(matricula='20240000000001').campus, 'CN')
+
+    def test_fallback_login_with_an_unchanged_profile_does_not_write(self):
+        self.assertEqual(self._login('20240000000001').status_code, 302)
+
+        self.stub.configure('meus_dados', error_rate=1.0)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self._login('20240000000001')
+
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn('error=', response['Location'])
+        writes = [query['sql'] for query in queries
+                  if query['sql'].lstrip().upper().startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(writes, [])
+
+    def test_slow_token_endpoint_opens_the_circuit_and_fails_fast(self):
+        self.stub.configure('token', latency=0.3)
+        for i in range(2):
+            self.assertEqual(self._login(f'2024000000000{i}').status_code, 302)
+
+        start = time.perf_counter()
+        response = self._login('20240000000009')
+
+        self.assertLess(time.perf_counter() - start, 0.2)
+        self.assertTrue(response['Location'].endswith('error=suap_indisponivel'))
+
+
+class AsyncSuapCallbackTests(TransactionTestCase):
+    """O callback assíncrono responde exatamente como o síncrono."""
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        Group.objects.create(name='Jogador')
+        self.stub = SuapStub().start()
+        self.addCleanup(self.stub.stop)
+        for patcher in (
+            mock.patch('user.views.send_audit_log'),
+            mock.patch.dict('user.suap._breakers', clear=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _sync_callback(self, params):
+        suap_client = SuapClient(base_url=self.stub.url)
+        try:
+            with mock.patch('user.views.get_suap_client', return_value=suap_client):
+                return suap_oauth_callback_view(
+                    RequestFactory().get('/auth/suap/callback/', params))
+        finally:
+            suap_client.close()
+
+    @async_to_sync
+    async def _async_callback(self, params):
+        suap_client = AsyncSuapClient(base_url=self.stub.url)
+        try:
+            with mock.patch('user.views.get_async_suap_client', return_value=suap_client):
+                return await asuap_oauth_callback_view(
+                    AsyncRequestFactory().get('/auth/suap/callback/', params))
+        finally:
+            await suap_client.aclose()
+
+    def _redirect(self, response):
+        """Destino do redirect, com os tokens trocados pelas suas claims estáveis."""
+        self.assertEqual(response.status_code, 302)
+        location = urlsplit(response['Location'])
+        query = parse_qs(location.query)
+        for name in ('token', 'refresh_token'):
+            if name in query:
+                claims = jwt.decode(query[name][0], options={'verify_signature': False})
+                query[name] = {key: value for key, value in claims.items()
+                               if key not in ('exp', 'iat', 'jti', 'user_id')}
+        return location.path, query
+
+    def test_successful_login(self):
+        # O usuário é apagado entre os dois logins para que ambos o criem.
+        sync_response = self._sync_callback({'code': '20240000000001'})
+        User.objects.filter(matricula='20240000000001').delete()
+        async_response = self._async_callback({'code': '20240000000001'})
+
+        path, query = self._redirect(async_response)
+        self.assertEqual(path, '/auth/handle-token')
+        self.assertEqual(query['user_created'], ['true'])
+        self.assertEqual(query['token']['groups'], ['Jogador'])
+        self.assertEqual(self._redirect(sync_response), (path, query))
+
+    def test_suap_error(self):
+        self.stub.configure('token', error_rate=1.0)
+
+        sync_response = self._sync_callback({'code': '20240000000001'})
+        async_response = self._async_callback({'code': '20240000000001'})
+
+        self.assertEqual(self._redirect(async_response), ('/login', {'error': ['suap_indisponivel']}))
+        self.assertEqual(self._redirect(sync_response), self._redirect(async_response))
+        self.assertFalse(User.objects.exists())
+
+    def test_missing_code(self):
+        sync_response = self._sync_callback({'error': 'access_denied'})
+        async_response = self._async_callback({'error': 'access_denied'})
+
+        self.assertEqual(self._redirect(async_response), ('/login', {'error': ['falha_suap']}))
+        self.assertEqual(self._redirect(sync_response), self._redirect(async_response))
+        self.assertEqual(self.stub.requests, 0)
+
+
+class AsyncReadViewsParityTests(TransactionTestCase):
+    """As views de leitura assíncronas respondem exatamente como as síncronas."""
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        jogador = Group.objects.create(name='Jogador')
+        self.users = [
+            User.objects.create_user(
+                matricula=f'2024{i:010d}', email=f'aluno{i}@escolar.ifrn.edu.br',
+                nome=f'Aluno {i}', campus='CN' if i else None)
+            for i in range(3)
+        ]
+        self.users[1].groups.add(jogador)
+        self.matriculas = [user.matricula for user in self.users]
+        self.auth = {'Authorization': f"Bearer {get_tokens_for_user(self.users[1])['access']}"}
+        matricula_index.build()
+
+    def _sync(self, view, method, path, data=None, headers=None, **kwargs):
+        factory = RequestFactory()
+        if method == 'post':
+            request = factory.post(path, data, content_type='application/json', headers=headers)
+        else:
+            request = factory.get(path, headers=headers)
+        response = view(request, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    @async_to_sync
+    async def _async(self, view, method, path, data=None, headers=None, **kwargs):
+        factory = AsyncRequestFactory()
+        if method == 'post':
+            request = factory.post(path, data, content_type='application/json', headers=headers)
+        else:
+            request = factory.get(path, headers=headers)
+        response = await view(request, **kwargs)
+        if response.streaming:
+            return response, b''.join([chunk async for chunk in response.streaming_content])
+        return response, response.content
+
+    def assertSameResponse(self, sync_view, async_view, method, path, data=None, headers=None,
+                           parse=json.loads, **kwargs):
+        sync_response, sync_body = self._sync(sync_view, method, path, data, headers, **kwargs)
+        async_response, async_body = self._async(async_view, method, path, data, headers, **kwargs)
+
+        self.assertEqual(async_response.status_code, sync_response.status_code, path)
+        for header in ('Content-Type', 'ETag', 'Cache-Control', 'WWW-Authenticate'):
+            self.assertEqual(async_response.get(header), sync_response.get(header), header)
+        if sync_body or async_body:
+            self.assertEqual(parse(async_body), parse(sync_body), path)
+        return sync_response, parse(sync_body) if sync_body else None
+
+    def test_me(self):
+        me_sync, me_async = views.UserMeView.as_view(), async_views.auser_me_view
+        path = '/api/v1/auth/users/me/'
+
+        response, data = self.assertSameResponse(me_sync, me_async, 'get', path, headers=self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['groups'], ['Jogador'])
+
+        for headers in ({}, {'Authorization': 'Bearer invalido'}):
+            response, _ = self.assertSameResponse(me_sync, me_async, 'get', path, headers=headers)
+            self.assertEqual(response.status_code, 401)
+
+        self.users[1].is_active = False
+        self.users[1].save()
+        response, data = self.assertSameResponse(me_sync, me_async, 'get', path, headers=self.auth)
+        self.assertEqual(data['code'], 'user_inactive')
+
+        self.users[1].delete()
+        response, data = self.assertSameResponse(me_sync, me_async, 'get', path, headers=self.auth)
+        self.assertEqual(data['code'], 'user_not_found')
+
+    def test_token_checks_run_off_the_event_loop(self):
+        on_event_loop = []
+
+        def is_token_revoked(token):
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                on_event_loop.append(False)
+            else:
+                on_event_loop.append(True)
+            return False
+
+        with mock.patch.object(token_revocation, 'is_token_revoked', side_effect=is_token_revoked):
+            response, _ = self._async(
+                async_views.auser_me_view, 'get', '/api/v1/auth/users/me/', headers=self.auth)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(on_event_loop, [False])
+
+    def test_detail(self):
+        detail_sync, detail_async = views.UserDetailView.as_view(), async_views.auser_detail_view
+        matricula = self.matriculas[1]
+        path = f'/api/v1/auth/users/{matricula}/'
+
+        response, _ = self.assertSameResponse(detail_sync, detail_async, 'get', path, id=matricula)
+        self.assertEqual(response.status_code, 200)
+        response, _ = self.assertSameResponse(
+            detail_sync, detail_async, 'get', path, headers={'If-None-Match': response['ETag']},
+            id=matricula)
+        self.assertEqual(response.status_code, 304)
+        response, _ = self.assertSameResponse(
+            detail_sync, detail_async, 'get', '/api/v1/auth/users/00000000/', id='00000000')
+        self.assertEqual(response.status_code, 404)
+
+    def test_by_ids(self):
+        by_ids_sync, by_ids_async = views.UsersByIdView.as_view(), async_views.ausers_by_id_view
+        path = '/api/v1/auth/users/by-ids/'
+        by_matricula = lambda body: sorted(json.loads(body), key=lambda user: user['matricula'])
+        ids = {'ids': [*self.matriculas, self.matriculas[0], '00000000']}
+
+        response, data = self.assertSameResponse(
+            by_ids_sync, by_ids_async, 'post', path, ids, parse=by_matricula)
+        self.assertEqual(len(data), 3)
+        self.assertSameResponse(by_ids_sync, by_ids_async, 'post', f'{path}?stream=true', ids,
+                                parse=by_matricula)
+        self.assertSameResponse(
+            by_ids_sync, by_ids_async, 'post', path, ids, headers={'Accept': 'application/x-ndjson'},
+            parse=lambda body: sorted(body.splitlines()))
+
+        for body in ({'ids': []}, {'ids': 'nao-e-lista'}, {}, ['lista'], '{"ids": [',
+                     {'ids': [{'matricula': '1'}]}, {'ids': [['1']]}, {'ids': [None]},
+                     {'ids': [True]}):
+            response, _ = self.assertSameResponse(by_ids_sync, by_ids_async, 'post', path, body)
+            self.assertEqual(response.status_code, 400, body)
+
+    def test_validate(self):
+        validate_sync = views.ValidateUsersByMatriculaView.as_view()
+        validate_async = async_views.avalidate_users_by_matricula_view
+        path = '/api/v1/auth/users/'
+        parse = lambda body: {key: sorted(value) if isinstance(value, list) else value
+                              for key, value in json.loads(body).items()}
+
+        for body, status_code in (
+            ({'user_ids': self.matriculas}, 200),
+            ({'user_ids': [self.matriculas[0], '00000000']}, 400),
+            ({'user_ids': []}, 200),
+            ({'user_ids': 'nao-e-lista'}, 400),
+            ('{"user_ids": [', 400),
+        ):
+            response, _ = self.assertSameResponse(
+                validate_sync, validate_async, 'post', path, body, parse=parse)
+            self.assertEqual(response.status_code, status_code, body)
@@ -0,0 +1,139 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+# Refill + consumo atômicos de um token bucket no Redis.
+# KEYS[1]: chave do bucket; ARGV: capacidade, tokens/s, agora (s), ttl (s).
+# Retorna {1, 0} se o token foi consumido ou {0, ms até o próximo token}.
+_REDIS_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local wait_ms = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait_ms = math.ceil((1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return {allowed, wait_ms}
+"""
+
+
+class LocalBucketStore:
+    """Token buckets na memória do processo (LRU limitado)."""
+
+    def __init__(self, maxsize=100_000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, rate):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            if tokens >= 1:
+                allowed, wait = True, 0.0
+                tokens -= 1
+            else:
+                allowed, wait = False, (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return allowed, wait
+
+
+class RedisBucketStore:
+    """
+    Token buckets compartilhados entre workers no Redis. Se o Redis não
+    responder, a decisão cai para os buckets locais do processo.
+    """
+
+    def __init__(self, url, fallback, socket_timeout=0.05):
+        import redis
+
+        self._client = redis.Redis.from_url(
+            url, socket_timeout=socket_timeout, socket_connect_timeout=socket_timeout)
+        self._script = self._client.register_script(_REDIS_TOKEN_BUCKET)
+        self._errors = (redis.RedisError, OSError)
+        self.fallback = fallback
+        self._down = False
+
+    def consume(self, key, capacity, rate):
+        ttl = max(1, math.ceil(capacity / rate))
+        try:
+            allowed, wait_ms = self._script(
+                keys=[key], args=[capacity, rate, time.time(), ttl])
+        except self._errors as e:
+            if not self._down:
+                self._down = True
+                print(f"AVISO: Redis indisponível para o throttling de login; usando buckets locais. {e}")
+            return self.fallback.consume(key, capacity, rate)
+        self._down = False
+        return bool(allowed), wait_ms / 1000
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_bucket_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                local = LocalBucketStore()
+                redis_url = getattr(settings, "REDIS_URL", None)
+                _store = RedisBucketStore(redis_url, fallback=local) if redis_url else local
+    return _store
+
+
+class LoginRateThrottle(BaseThrottle):
+    """
+    Admissão das tentativas de login antes do ``authenticate()`` (e do hash
+    PBKDF2): um token bucket por IP e outro por matrícula. Tentativas além
+    da taxa recebem 429 sem gastar CPU com a senha.
+    """
+    scope = 'login'
+
+    def __init__(self):
+        self.store = get_bucket_store()
+        self.wait_seconds = None
+
+    def _limits(self, name):
+        burst = getattr(settings, f"LOGIN_THROTTLE_{name}_BURST")
+        per_minute = getattr(settings, f"LOGIN_THROTTLE_{name}_PER_MINUTE")
+        return burst, per_minute / 60
+
+    def allow_request(self, request, view):
+        checks = [(f"throttle:{self.scope}:ip:{self.get_ident(request)}", *self._limits('IP'))]
+        matricula = request.data.get('matricula') if hasattr(request.data, 'get') else None
+        if matricula:
+            checks.append((
+                f"throttle:{self.scope}:matricula:{str(matricula).strip().lower()}",
+                *self._limits('MATRICULA'),
+            ))
+
+        # O bucket por matrícula só é consumido se o IP ainda tem tokens, para
+        # que um IP já barrado não esgote o bucket das contas que ataca.
+        for key, capacity, rate in checks:
+            allowed, wait = self.store.consume(key, capacity, rate)
+            if not allowed:
+                self.wait_seconds = wait
+                return False
+        return True
+
+    def wait(self):
+        return self.wait_seconds
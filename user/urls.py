@@ -1,19 +1,40 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 from rest_framework_simplejwt.views import TokenRefreshView 
 
 app_name = 'user'
 
+# Sob ASGI, o callback do SUAP pode usar a versão assíncrona (SUAP_CALLBACK_ASYNC=True).
+suap_callback_view = (
+    views.asuap_oauth_callback_view if settings.SUAP_CALLBACK_ASYNC
+    else views.suap_oauth_callback_view
+)
+
+# Sob ASGI, as leituras de usuários podem usar as views assíncronas (USER_READ_VIEWS_ASYNC=True).
+if settings.USER_READ_VIEWS_ASYNC:
+    user_me_view = async_views.auser_me_view
+    users_by_id_view = async_views.ausers_by_id_view
+    user_detail_view = async_views.auser_detail_view
+    validate_users_view = async_views.avalidate_users_by_matricula_view
+else:
+    user_me_view = views.UserMeView.as_view()
+    users_by_id_view = views.UsersByIdView.as_view()
+    user_detail_view = views.UserDetailView.as_view()
+    validate_users_view = views.ValidateUsersByMatriculaView.as_view()
+
 urlpatterns = [
     # --- ROTAS DE AUTENTICAÇÃO ---
     path("api/v1/auth/token/", views.LoginView.as_view(), name="token_obtain_pair"),
     path("api/v1/auth/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
-    path("auth/suap/callback/", views.suap_oauth_callback_view, name="suap_oauth_callback"),
+    path("auth/suap/callback/", suap_callback_view, name="suap_oauth_callback"),
+    path(".well-known/jwks.json", views.jwks_view, name="jwks"),
 
     # --- ROTAS DA API (protegidas por JWT) ---
     path("api/v1/auth/logout/", views.LogoutView.as_view(), name="api_logout"),
-    path("api/v1/auth/users/me/", views.UserMeView.as_view(), name="api_user_me"),
-    path("api/v1/auth/users/by-ids/", views.UsersByIdView.as_view(), name="api_users_by_ids"),
-    path("api/v1/auth/users/<str:id>/", views.UserDetailView.as_view(), name="api_user_detail"),
-    path("api/v1/auth/users/", views.ValidateUsersByMatriculaView.as_view(), name="api_user_list"),
+    path("api/v1/auth/users/me/", user_me_view, name="api_user_me"),
+    path("api/v1/auth/users/by-ids/", users_by_id_view, name="api_users_by_ids"),
+    path("api/v1/auth/users/list/", views.UserListView.as_view(), name="api_user_listing"),
+    path("api/v1/auth/users/<str:id>/", user_detail_view, name="api_user_detail"),
+    path("api/v1/auth/users/", validate_users_view, name="api_user_list"),
 ]
\ No newline at end of file
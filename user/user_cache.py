@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+_MISSING = object()
+
+
+class UserRowCache:
+    """
+    LRU limitado, em memória do processo, de linhas completas de ``User``
+    (com os grupos pré-carregados) e com expiração por TTL.
+
+    As instâncias são compartilhadas entre requisições e devem ser tratadas
+    como somente leitura.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, user = entry
+            if expires_at <= now:
+                del self._entries[user_id]
+                return default
+            self._entries.move_to_end(user_id)
+            return user
+
+    def set(self, user_id, user):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_rows = UserRowCache(
+    maxsize=getattr(settings, "USER_ROW_CACHE_MAXSIZE", 1024),
+    ttl=getattr(settings, "USER_ROW_CACHE_TTL", 60),
+)
+
+
+def get_cached_user(user_id):
+    """
+    Retorna o ``User`` completo pelo id, indo ao banco apenas quando a linha
+    não está no LRU (ou expirou). Retorna ``None`` se o usuário não existe.
+    """
+    user = user_rows.get(user_id)
+    if user is None:
+        from .models import User
+
+        user = User.objects.prefetch_related('groups').filter(pk=user_id).first()
+        if user is not None:
+            user_rows.set(user_id, user)
+    return user
+
+
+async def aget_cached_user(user_id):
+    """Versão assíncrona de ``get_cached_user``."""
+    user = user_rows.get(user_id)
+    if user is None:
+        from .models import User
+
+        user = await User.objects.prefetch_related('groups').filter(pk=user_id).afirst()
+        if user is not None:
+            user_rows.set(user_id, user)
+    return user
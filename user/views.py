@@ -1,42 +1,49 @@
-from django.http import HttpResponseRedirect
+from django.http import Http404, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
 from django.conf import settings
 from django.urls import reverse
-from django.shortcuts import get_object_or_404
-import requests
+from django.db import router
+from django.utils.http import parse_etags
 from urllib.parse import quote
-from django.contrib.auth.models import Group
 from django.contrib.auth import authenticate
+from django.views.decorators.http import require_safe
+from asgiref.sync import sync_to_async
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from .models import User
-from .serializers import UserSerializer
-
+from .serializers import UserSerializer, user_read_serializer
+from .claims import apply_claims, get_user_claims
+from .authentication import get_full_user
+from .permissions import IsOrganizerOrStaff
+from .detail_cache import get_user_detail
+from .pagination import CampusKeysetPagination
+from .matricula_index import matricula_index
+from .renderers import NDJSONRenderer, json_bytes, ndjson_line
+from .revocation import token_revocation
+from .signing import current_jwks
+from .suap import SuapUnavailable, get_suap_client, get_async_suap_client
+from .throttling import LoginRateThrottle
+
+from auth_service.db_router import is_pinned, replica_reads, use_primary
 from messaging import send_audit_log, build_log_payload
 
-from concurrent.futures import ThreadPoolExecutor
-
-from drf_spectacular.utils import extend_schema, OpenApiResponse, OpenApiExample
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse, OpenApiExample
 
-SUAP_TOKEN_URL = "https://suap.ifrn.edu.br/o/token/"
-SUAP_API_EU_URL = "https://suap.ifrn.edu.br/api/rh/eu"
-SUAP_API_MEUS_DADOS_URL = "https://suap.ifrn.edu.br/api/v2/minhas-informacoes/meus-dados/"
+# Usuários lidos por vez do cursor nas respostas em streaming
+BULK_LOOKUP_CHUNK_SIZE = 2000
 
 
 def get_tokens_for_user(user):
     refresh = RefreshToken.for_user(user)
 
-    access_token = refresh.access_token
-
-    access_token['matricula'] = user.matricula
-    access_token['nome'] = user.nome
-    access_token['campus'] = user.campus
-    access_token['groups'] = [group.name for group in user.groups.all()]
-    access_token['iss'] = 'ifsports-recomeco'
+    access_token = apply_claims(refresh.access_token, get_user_claims(user))
 
     return {
         'refresh': str(refresh),
@@ -44,51 +51,23 @@ def get_tokens_for_user(user):
     }
 
 
-@extend_schema(exclude=True)
-def suap_oauth_callback_view(request):
-    code = request.GET.get("code")
+def _frontend_urls():
     frontend_url_base = getattr(
         settings, "FRONTEND_APP_URL", "http://localhost:3000")
     frontend_success_path = getattr(
         settings, "FRONTEND_LOGIN_SUCCESS_PATH", "/auth/handle-token")
+    return frontend_url_base, frontend_success_path
 
-    request_data_token = {
-        "grant_type": "authorization_code", "code": code,
-        "client_id": settings.SUAP_CLIENT_ID, "client_secret": settings.SUAP_CLIENT_SECRET,
-        "scope": "identificacao email documentos_pessoais",
-    }
-    suap_token_response = requests.post(
-        SUAP_TOKEN_URL, data=request_data_token, timeout=15)
-    suap_token_response.raise_for_status()
-    suap_token_data = suap_token_response.json()
-    access_token_suap = suap_token_data.get("access_token")
-    headers_suap_api = {"Authorization": f"Bearer {access_token_suap}"}
-
-    data_suap = {}
-    data_eu = {}
-    with ThreadPoolExecutor() as executor:
-        future_meus_dados = executor.submit(
-            requests.get, SUAP_API_MEUS_DADOS_URL, headers=headers_suap_api, timeout=10)
-        future_eu = executor.submit(
-            requests.get, SUAP_API_EU_URL, headers=headers_suap_api, timeout=10)
-
-        try:
-            response_meus_dados = future_meus_dados.result()
-            if response_meus_dados.status_code == 200:
-                data_suap = response_meus_dados.json()
-        except Exception as e:
-            print(f"AVISO: Falha ao buscar dados da API MEUS_DADOS: {e}")
-
-        try:
-            response_eu = future_eu.result()
-            if response_eu.status_code == 200:
-                data_eu = response_eu.json()
-        except Exception as e:
-            print(f"AVISO: Falha ao buscar dados da API EU: {e}")
 
+def _extract_suap_user(data_suap, data_eu):
+    """
+    Monta a matrícula e os campos do usuário a partir das respostas do SUAP.
+    Retorna ``(matricula, user_defaults, erro)``; ``erro`` é o código enviado
+    ao frontend quando os dados obrigatórios não vieram.
+    """
     matricula_suap = data_suap.get('matricula')
     if not matricula_suap:
-        return HttpResponseRedirect(f"{frontend_url_base}/login?error=falha_suap")
+        return None, None, "falha_suap"
 
     vinculo_data = data_suap.get('vinculo', {})
 
@@ -101,7 +80,7 @@ def suap_oauth_callback_view(request):
     )
 
     if not email_suap:
-        return HttpResponseRedirect(f"{frontend_url_base}/login?error=email_nao_encontrado")
+        return matricula_suap, None, "email_nao_encontrado"
 
     user_defaults = {
         'email': email_suap,
@@ -114,22 +93,52 @@ def suap_oauth_callback_view(request):
         'situacao': vinculo_data.get('situacao'),
         'data_nascimento': data_suap.get('data_nascimento'),
     }
+    return matricula_suap, user_defaults, None
+
+
+def _fallback_matricula(data_suap, data_eu):
+    """
+    Matrícula do usuário quando só uma das buscas de perfil (``meus-dados`` ou
+    ``eu``) falhou; ``None`` quando as duas vieram ou as duas falharam.
+    """
+    if bool(data_suap) == bool(data_eu):
+        return None
+    return data_suap.get('matricula') or data_eu.get('identificacao')
+
+
+def _with_stored_profile(data_suap, data_eu, user):
+    """
+    Completa a parte do perfil que o SUAP não devolveu com os dados já
+    gravados do usuário, no mesmo formato das respostas do SUAP: com o perfil
+    inalterado, a impressão digital bate e o login não regrava a linha.
+    """
+    if user is None:
+        return data_suap, data_eu
+    print(f"AVISO: Perfil do SUAP incompleto; usando os dados gravados de {user.matricula}.")
+    stored_suap = {
+        'matricula': user.matricula,
+        'nome_usual': user.nome,
+        'url_foto_75x100': user.foto or '',
+        'tipo_vinculo': user.tipo_usuario,
+        'data_nascimento': user.data_nascimento.isoformat() if user.data_nascimento else None,
+        'vinculo': {'campus': user.campus, 'curso': user.curso, 'situacao': user.situacao},
+    }
+    stored_eu = {'identificacao': user.matricula, 'email': user.email, 'sexo': user.sexo}
+    return data_suap or stored_suap, data_eu or stored_eu
 
-    user, created = User.objects.update_or_create(
-        matricula=matricula_suap, defaults=user_defaults)
 
-    if not user.groups.exists():
-        try:
-            jogador_group = Group.objects.get(name='Jogador')
-            user.groups.add(jogador_group)
-        except Group.DoesNotExist:
-            print("AVISO: O grupo 'Jogador' não foi encontrado.")
+def _suap_unavailable_redirect(exc):
+    print(f"AVISO: SUAP indisponível no login: {exc}")
+    frontend_url_base, _ = _frontend_urls()
+    return HttpResponseRedirect(f"{frontend_url_base}/login?error=suap_indisponivel")
 
-    app_tokens = get_tokens_for_user(user)
+
+def _suap_success_redirect_url(matricula_suap, user_defaults, created, app_tokens):
+    frontend_url_base, frontend_success_path = _frontend_urls()
     nome_formatado = quote(user_defaults.get('nome') or '')
     email_formatado = quote(user_defaults.get('email') or '')
     foto_formatada = quote(user_defaults.get('foto') or '')
-    redirect_url = (
+    return (
         f"{frontend_url_base}{frontend_success_path}"
         f"?token={app_tokens['access']}&refresh_token={app_tokens['refresh']}"
         f"&user_created={str(created).lower()}&userId={matricula_suap}"
@@ -137,7 +146,9 @@ def suap_oauth_callback_view(request):
         f"&userImage={foto_formatada}"
     )
 
-    log_payload = build_log_payload(
+
+def _suap_login_log_payload(request, user):
+    return build_log_payload(
         request=request,
         user=user,
         event_type="auth.login",
@@ -145,13 +156,110 @@ def suap_oauth_callback_view(request):
         new_data={
             "message": f"Usuário {user.nome} ({user.matricula}) logou com sucesso via SUAP."}
     )
-    send_audit_log(log_payload)
+
+
+@extend_schema(exclude=True)
+def suap_oauth_callback_view(request):
+    code = request.GET.get("code")
+    frontend_url_base, _ = _frontend_urls()
+    if not code:
+        # Ex.: o usuário negou o acesso no SUAP (?error=access_denied).
+        return HttpResponseRedirect(f"{frontend_url_base}/login?error=falha_suap")
+
+    suap_client = get_suap_client()
+    try:
+        suap_token_data = suap_client.exchange_code(code)
+    except SuapUnavailable as exc:
+        return _suap_unavailable_redirect(exc)
+    access_token_suap = suap_token_data.get("access_token")
+
+    data_suap, data_eu = suap_client.fetch_profile(access_token_suap)
+    fallback_matricula = _fallback_matricula(data_suap, data_eu)
+    if fallback_matricula:
+        data_suap, data_eu = _with_stored_profile(
+            data_suap, data_eu, User.objects.filter(matricula=fallback_matricula).first())
+
+    matricula_suap, user_defaults, erro = _extract_suap_user(data_suap, data_eu)
+    if erro:
+        return HttpResponseRedirect(f"{frontend_url_base}/login?error={erro}")
+
+    user, created = User.objects.upsert_from_suap(
+        matricula_suap, user_defaults, default_group='Jogador')
+
+    app_tokens = get_tokens_for_user(user)
+    redirect_url = _suap_success_redirect_url(
+        matricula_suap, user_defaults, created, app_tokens)
+
+    send_audit_log(_suap_login_log_payload(request, user))
 
     return HttpResponseRedirect(redirect_url)
 
 
+@extend_schema(exclude=True)
+async def asuap_oauth_callback_view(request):
+    """
+    Versão assíncrona do callback do SUAP, usada quando o serviço roda sob
+    ASGI (``SUAP_CALLBACK_ASYNC=True``). Enquanto o SUAP responde, o worker
+    continua livre para atender outros logins.
+    """
+    code = request.GET.get("code")
+    frontend_url_base, _ = _frontend_urls()
+    if not code:
+        # Ex.: o usuário negou o acesso no SUAP (?error=access_denied).
+        return HttpResponseRedirect(f"{frontend_url_base}/login?error=falha_suap")
+
+    suap_client = get_async_suap_client()
+    try:
+        suap_token_data = await suap_client.exchange_code(code)
+    except SuapUnavailable as exc:
+        return _suap_unavailable_redirect(exc)
+    access_token_suap = suap_token_data.get("access_token")
+
+    data_suap, data_eu = await suap_client.fetch_profile(access_token_suap)
+    fallback_matricula = _fallback_matricula(data_suap, data_eu)
+    if fallback_matricula:
+        data_suap, data_eu = _with_stored_profile(
+            data_suap, data_eu, await User.objects.filter(matricula=fallback_matricula).afirst())
+
+    matricula_suap, user_defaults, erro = _extract_suap_user(data_suap, data_eu)
+    if erro:
+        return HttpResponseRedirect(f"{frontend_url_base}/login?error={erro}")
+
+    user, created = await User.objects.aupsert_from_suap(
+        matricula_suap, user_defaults, default_group='Jogador')
+
+    app_tokens = await sync_to_async(get_tokens_for_user)(user)
+    redirect_url = _suap_success_redirect_url(
+        matricula_suap, user_defaults, created, app_tokens)
+
+    await sync_to_async(send_audit_log)(_suap_login_log_payload(request, user))
+
+    return HttpResponseRedirect(redirect_url)
+
+
+class ReplicaReadMixin:
+    """
+    Views somente leitura: as consultas vão para a réplica (se configurada),
+    exceto para matrículas escritas há pouco, que continuam no primário.
+    """
+
+    def replica_pin_keys(self, request, *args, **kwargs):
+        return ()
+
+    def dispatch(self, request, *args, **kwargs):
+        with replica_reads():
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        keys = [str(key) for key in self.replica_pin_keys(request, *args, **kwargs) if key]
+        if is_pinned(*keys):
+            use_primary()
+
+
 class LoginView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [LoginRateThrottle]
 
     @extend_schema(
         tags=["Autenticação"],
@@ -180,7 +288,8 @@ Autentica um usuário (geralmente um organizador) com base na matrícula e senha
         responses={
             200: OpenApiResponse(description="Autenticação bem-sucedida. Retorna os tokens."),
             401: OpenApiResponse(description="Credenciais inválidas."),
-            403: OpenApiResponse(description="Esta conta está desativada.")
+            403: OpenApiResponse(description="Esta conta está desativada."),
+            429: OpenApiResponse(description="Tentativas demais; tente de novo após `Retry-After` segundos.")
         }
     )
     def post(self, request, *args, **kwargs):
@@ -221,20 +330,27 @@ class LogoutView(APIView):
 
     @extend_schema(
         tags=["Autenticação"],
-        summary="Registra o evento de logout do usuário.",
+        summary="Revoga os tokens do usuário e registra o logout.",
         description="""
-Este endpoint apenas registra a intenção de logout para fins de auditoria.
-O cliente (frontend) é responsável por apagar os tokens armazenados localmente para efetivar o logout.
+Revoga o access token usado na requisição e, se enviado no corpo, o refresh token
+da mesma sessão: a partir daí eles são recusados por este serviço até expirarem.
+O logout também é registrado para fins de auditoria.
+
+**Exemplo de Corpo da Requisição (opcional):**
+
+.. code-block:: json
 
-**Esta rota não recebe corpo na requisição.**
+   {
+     "refresh": "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9..."
+   }
 """,
-        request=None,
+        request={'application/json': {'type': 'object', 'properties': {'refresh': {'type': 'string'}}}},
         responses={
             200: OpenApiResponse(
-                description="Logout recebido. O cliente deve apagar os tokens.",
+                description="Logout concluído e tokens revogados.",
                 examples=[
                     OpenApiExample('Exemplo de Resposta', value={
-                                   'detail': 'Logout recebido. O cliente deve invalidar/remover os tokens JWT.'})
+                                   'detail': 'Logout concluído. Os tokens foram revogados.'})
                 ]
             ),
             401: OpenApiResponse(description="Não autenticado.")
@@ -242,6 +358,18 @@ O cliente (frontend) é responsável por apagar os tokens armazenados localmente
     )
     def post(self, request, *args, **kwargs):
         user = request.user
+        if request.auth is not None:
+            token_revocation.revoke_token(request.auth)
+        raw_refresh = request.data.get('refresh') if hasattr(request.data, 'get') else None
+        if raw_refresh:
+            try:
+                refresh = RefreshToken(raw_refresh)
+            except TokenError:
+                refresh = None
+            # Só revoga o refresh do próprio usuário.
+            if refresh is not None and str(refresh.get(jwt_settings.USER_ID_CLAIM)) == str(user.id):
+                token_revocation.revoke_token(refresh)
+
         log_payload = build_log_payload(
             request=request,
             user=user,
@@ -250,10 +378,65 @@ O cliente (frontend) é responsável por apagar os tokens armazenados localmente
             new_data={"message": f"Usuário {user.nome} solicitou logout."}
         )
         send_audit_log(log_payload)
-        return Response({"detail": "Logout recebido. O cliente deve invalidar/remover os tokens JWT."}, status=status.HTTP_200_OK)
+        return Response({"detail": "Logout concluído. Os tokens foram revogados."}, status=status.HTTP_200_OK)
+
+
+@require_safe
+def jwks_view(request):
+    """
+    Chaves públicas (JWKS) para que outros serviços validem os tokens
+    localmente, sem chamar este serviço a cada requisição.
+    """
+    return HttpResponse(
+        json_bytes(current_jwks()), content_type='application/json',
+        headers={'Cache-Control': f"public, max-age={getattr(settings, 'JWKS_MAX_AGE', 3600)}"})
+
+
+def _matriculas_para_validar(data):
+    """Retorna ``(conjunto de matrículas, erro)`` a partir do corpo da requisição."""
+    matriculas_para_validar = data.get('user_ids', []) if hasattr(data, 'get') else None
+
+    if not isinstance(matriculas_para_validar, list):
+        return None, {"error": "Entrada inválida. 'user_ids' (contendo matrículas) deve ser uma lista."}
+
+    try:
+        matriculas_para_validar_str = [
+            str(m) for m in matriculas_para_validar]
+    except ValueError:
+        return None, {"error": "Formato de matrícula inválido. Todas as matrículas devem ser conversíveis para string."}
+
+    return set(matriculas_para_validar_str), None
+
+
+def _resultado_validacao(matriculas_solicitadas_set, matriculas_existentes_no_db):
+    """Retorna ``(corpo, status)`` da resposta de validação de matrículas."""
+    if not matriculas_solicitadas_set:
+        return {"all_exist": True, "message": "Nenhuma matrícula fornecida para validação.", "valid_ids": [],
+                "invalid_ids": []}, status.HTTP_200_OK
+
+    matriculas_invalidas = list(
+        matriculas_solicitadas_set - matriculas_existentes_no_db)
+
+    matriculas_validas = list(
+        matriculas_existentes_no_db.intersection(matriculas_solicitadas_set))
+
+    if not matriculas_invalidas:
+        return {
+            "all_exist": True,
+            "message": "Todas as matrículas fornecidas são válidas.",
+            "valid_ids": matriculas_validas,
+            "invalid_ids": []
+        }, status.HTTP_200_OK
+    return {
+        "all_exist": False,
+        "message": f"As seguintes matrículas não foram encontradas: {', '.join(matriculas_invalidas)}",
+        "valid_ids": matriculas_validas,
+        "invalid_ids": matriculas_invalidas
+    }, status.HTTP_400_BAD_REQUEST
 
 
 class ValidateUsersByMatriculaView(APIView):
+    # Sem ReplicaReadMixin: o índice de matrículas é montado no primário.
     permission_classes = [AllowAny]
 
     @extend_schema(
@@ -287,63 +470,25 @@ Recebe uma lista de matrículas e retorna quais são válidas e quais são invá
         }
     )
     def post(self, request, *args, **kwargs):
-        matriculas_para_validar = request.data.get('user_ids', [])
-
-        if not isinstance(matriculas_para_validar, list):
-            return Response(
-                {"error": "Entrada inválida. 'user_ids' (contendo matrículas) deve ser uma lista."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        try:
-            matriculas_para_validar_str = [
-                str(m) for m in matriculas_para_validar]
-        except ValueError:
-            return Response(
-                {"error": "Formato de matrícula inválido. Todas as matrículas devem ser conversíveis para string."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        if not matriculas_para_validar_str:
-            return Response(
-                {"all_exist": True, "message": "Nenhuma matrícula fornecida para validação.", "valid_ids": [],
-                 "invalid_ids": []},
-                status=status.HTTP_200_OK
-            )
+        matriculas_solicitadas_set, erro = _matriculas_para_validar(request.data)
+        if erro:
+            return Response(erro, status=status.HTTP_400_BAD_REQUEST)
+        if not matriculas_solicitadas_set:
+            return Response(*_resultado_validacao(set(), set()))
 
-        usuarios_existentes_qs = User.objects.filter(
-            matricula__in=matriculas_para_validar_str)
+        # O índice em memória, sincronizado com os demais workers, responde
+        # sem consultar o banco.
+        matriculas_existentes_no_db, _ = matricula_index.partition(matriculas_solicitadas_set)
 
-        matriculas_existentes_no_db = set(
-            user.matricula for user in usuarios_existentes_qs)
+        return Response(*_resultado_validacao(matriculas_solicitadas_set, matriculas_existentes_no_db))
 
-        matriculas_solicitadas_set = set(matriculas_para_validar_str)
 
-        matriculas_invalidas = list(
-            matriculas_solicitadas_set - matriculas_existentes_no_db)
-
-        matriculas_validas = list(
-            matriculas_existentes_no_db.intersection(matriculas_solicitadas_set))
-
-        if not matriculas_invalidas:
-            return Response({
-                "all_exist": True,
-                "message": "Todas as matrículas fornecidas são válidas.",
-                "valid_ids": matriculas_validas,
-                "invalid_ids": []
-            }, status=status.HTTP_200_OK)
-        else:
-            return Response({
-                "all_exist": False,
-                "message": f"As seguintes matrículas não foram encontradas: {', '.join(matriculas_invalidas)}",
-                "valid_ids": matriculas_validas,
-                "invalid_ids": matriculas_invalidas
-            }, status=status.HTTP_400_BAD_REQUEST)
-
-
-class UserMeView(APIView):
+class UserMeView(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
 
+    def replica_pin_keys(self, request, *args, **kwargs):
+        return (getattr(request.user, 'matricula', None),)
+
     @extend_schema(
         tags=["Usuários"],
         summary="Retorna os dados do usuário atualmente autenticado.",
@@ -377,13 +522,75 @@ Utiliza o token de autenticação enviado no header para identificar o usuário.
         }
     )
     def get(self, request, *args, **kwargs):
-        serializer = UserSerializer(request.user)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        data = user_read_serializer.from_instance(get_full_user(request.user))
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class UserListView(ReplicaReadMixin, APIView):
+    # Traz e-mail, nascimento e curso de todos os usuários: só para organizadores.
+    permission_classes = [IsOrganizerOrStaff]
+    pagination_class = CampusKeysetPagination
+    filter_fields = ('campus', 'tipo_usuario', 'curso', 'situacao')
+
+    @extend_schema(
+        tags=["Usuários"],
+        summary="Lista usuários filtrando por campus, tipo, curso e situação.",
+        description="""
+Retorna os usuários ordenados por `campus` e `id`, em páginas navegadas por cursor.
+Restrito a organizadores (grupo `Organizador`) e à equipe (`is_staff`).
+Para obter a próxima página, basta seguir a URL de `next` (nula na última página).
+
+**Exemplo de Resposta:**
+
+.. code-block:: json
+
+   {
+     "next": "https://.../api/v1/auth/users/list/?campus=CN&cursor=WyJDTiIsIDQyXQ%3D%3D",
+     "results": [
+       {"id": "41", "matricula": "20221094040022", "nome": "Nome do Usuário", "campus": "CN", "...": "..."}
+     ]
+   }
+""",
+        parameters=[
+            OpenApiParameter("campus", str, description="Sigla do campus (ex.: CN)."),
+            OpenApiParameter("tipo_usuario", str, description="Tipo de vínculo (ex.: Aluno)."),
+            OpenApiParameter("curso", str),
+            OpenApiParameter("situacao", str),
+            OpenApiParameter("page_size", int, description="Itens por página (padrão 100, máximo 1000)."),
+            OpenApiParameter("cursor", str, description="Cursor opaco retornado em `next`."),
+        ],
+        responses={
+            200: UserSerializer(many=True),
+            400: OpenApiResponse(description="Cursor inválido."),
+            401: OpenApiResponse(description="Não autenticado."),
+            403: OpenApiResponse(description="Usuário não é organizador."),
+        }
+    )
+    def get(self, request, *args, **kwargs):
+        filters = {
+            field: request.query_params[field]
+            for field in self.filter_fields if request.query_params.get(field)
+        }
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(User.objects.filter(**filters), request, view=self)
+        return paginator.get_paginated_response(page)
 
 
-class UserDetailView(APIView):
+def _etag_matches(etag, if_none_match):
+    # If-None-Match usa comparação fraca: W/"x" também casa com "x".
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return etag in {tag.removeprefix('W/') for tag in parse_etags(if_none_match)}
+
+
+class UserDetailView(ReplicaReadMixin, APIView):
     permission_classes = [AllowAny]
 
+    def replica_pin_keys(self, request, *args, **kwargs):
+        return (kwargs.get('id'),)
+
     @extend_schema(
         tags=["Usuários"],
         summary="Busca os dados de um usuário específico por matrícula.",
@@ -413,17 +620,54 @@ Note que o `id` na URL corresponde à `matrícula` do usuário.
 """,
         responses={
             200: UserSerializer,
+            304: OpenApiResponse(description="O `ETag` enviado em `If-None-Match` ainda é o atual."),
             404: OpenApiResponse(description="Usuário com a matrícula especificada não foi encontrado.")
         }
     )
     def get(self, request, id, *args, **kwargs):
-        user = get_object_or_404(User, matricula=id)
-        serializer = UserSerializer(user)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        detail = get_user_detail(id)
+        if detail is None:
+            raise Http404("No User matches the given query.")
+        data, etag = detail
+        # Os clientes devem sempre revalidar; com o ETag a resposta costuma ser um 304.
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if _etag_matches(etag, request.headers.get('If-None-Match')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(data, status=status.HTTP_200_OK, headers=headers)
 
 
-class UsersByIdView(APIView):
+def _ids_para_busca(data):
+    """Retorna ``(matrículas sem repetição, erro)`` a partir do corpo da busca em lote."""
+    ids = data.get("ids", []) if hasattr(data, 'get') else None
+
+    if not isinstance(ids, list) or not ids:
+        return None, {"detail": "Uma lista de IDs é obrigatória."}
+    if any(isinstance(id_, bool) or not isinstance(id_, (str, int)) for id_ in ids):
+        return None, {"detail": "Cada ID deve ser uma matrícula (texto ou número)."}
+
+    return list(dict.fromkeys(str(id_) for id_ in ids)), None
+
+
+def _stream_users(users, line):
+    for data in user_read_serializer.iter_queryset(users, chunk_size=BULK_LOOKUP_CHUNK_SIZE):
+        yield line(data)
+
+
+def _stream_json_array(users):
+    yield b'['
+    separator = b''
+    for chunk in _stream_users(users, json_bytes):
+        yield separator + chunk
+        separator = b','
+    yield b']'
+
+
+class UsersByIdView(ReplicaReadMixin, APIView):
     permission_classes = [AllowAny]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+
+    def replica_pin_keys(self, request, *args, **kwargs):
+        return _ids_para_busca(request.data)[0] or ()
 
     @extend_schema(
         tags=["Usuários"],
@@ -431,6 +675,11 @@ class UsersByIdView(APIView):
         description="""
 Recebe uma lista de matrículas e retorna uma lista com os dados dos usuários encontrados.
 
+Para listas grandes, a resposta pode ser transmitida em streaming, com memória constante no servidor:
+
+- ``Accept: application/x-ndjson``: um usuário por linha (NDJSON);
+- ``?stream=true``: o mesmo array JSON, enviado em partes.
+
 **Exemplo de Corpo da Requisição (Payload):**
 
 .. code-block:: json
@@ -445,14 +694,24 @@ Recebe uma lista de matrículas e retorna uma lista com os dados dos usuários e
         }
     )
     def post(self, request, *args, **kwargs):
-        ids = request.data.get("ids", [])
-
-        if not isinstance(ids, list) or not ids:
-            return Response({
-                "detail": "Uma lista de IDs é obrigatória."
-            }, status=status.HTTP_400_BAD_REQUEST)
-
-        users = User.objects.filter(matricula__in=ids)
-        serializer = UserSerializer(users, many=True)
-
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        ids, erro = _ids_para_busca(request.data)
+        if erro:
+            return Response(erro, status=status.HTTP_400_BAD_REQUEST)
+
+        # As matrículas vão como um único parâmetro de array e os grupos de
+        # todos os usuários são carregados em uma consulta por lote.
+        # O streaming consulta o banco depois que a view retorna: fixa aqui o
+        # banco escolhido pelo roteador (réplica ou primário).
+        users = User.objects.filter(matricula__any=ids).using(
+            router.db_for_read(User))
+
+        if request.accepted_renderer.format == NDJSONRenderer.format:
+            return StreamingHttpResponse(
+                _stream_users(users, ndjson_line), content_type=NDJSONRenderer.media_type)
+        if request.query_params.get('stream', '').lower() == 'true':
+            return StreamingHttpResponse(
+                _stream_json_array(users), content_type='application/json')
+
+        data = user_read_serializer.many(users, chunk_size=BULK_LOOKUP_CHUNK_SIZE)
+
+        return Response(data, status=status.HTTP_200_OK)